@@ -0,0 +1,179 @@
+"""
+Side-by-side quality/throughput comparison of the NLLB backends on the
+bundled AD Topic texts.
+
+    python compare_nllb_backends.py --limit 200 \
+        --model-path torch-int8=models/nllb-200-1.3B-int8.pt \
+        --model-path ctranslate2=models/nllb-200-1.3B-ct2 --output nllb_backends.json
+
+Each backend runs in a fresh interpreter (so peak RSS is its own) over the
+same unique segments, batched exactly as script_ai_nllb.py does, bypassing
+the translation cache. Quality is chrF against the first backend (the
+full-precision reference) and against the existing Vietnamese translations
+(English lines of AD-ppt-vn paired with AD-ppt-vn-2 wherever a slide has
+the same number of lines in both).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.manifest import split_txt_slides
+from common.streaming import load_stage
+from common.translators import length_buckets
+
+SOURCE_FOLDER = os.path.join(ROOT, "ConvertEngToVN", "AD-ppt-vn")  # English, one line per segment
+REFERENCE_FOLDER = os.path.join(ROOT, "ConvertEngToVN", "AD-ppt-vn-2")  # the same decks in Vietnamese
+
+
+def load_segments(limit=None):
+    """Unique English segments of the AD Topic decks, with their existing Vietnamese when aligned."""
+    translate_stage = load_stage("ConvertEngToVN/script.py")
+    segments = {}
+    for file in sorted(os.listdir(SOURCE_FOLDER)):
+        if not file.lower().endswith(".txt"):
+            continue
+        source_slides = split_txt_slides(translate_stage.read_lines(os.path.join(SOURCE_FOLDER, file)))
+        reference_path = os.path.join(REFERENCE_FOLDER, file)
+        reference_slides = split_txt_slides(translate_stage.read_lines(reference_path)) if os.path.exists(reference_path) else []
+
+        for i, source_lines in enumerate(source_slides):
+            reference_lines = reference_slides[i] if i < len(reference_slides) else []
+            if len(reference_lines) != len(source_lines):
+                reference_lines = [""] * len(source_lines)
+            for line, reference in zip(source_lines, reference_lines):
+                text = translate_stage.translatable_text(line)
+                if text and text not in segments:
+                    segments[text] = translate_stage.translatable_text(reference) or None
+    items = list(segments.items())
+    return items[:limit] if limit else items
+
+
+def char_ngrams(text, n):
+    text = " ".join(text.split())
+    return Counter(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def chrf(hypothesis, reference, max_n=6, beta=2.0):
+    """Character n-gram F-score (chrF, 0-100) of one segment."""
+    precisions, recalls = [], []
+    for n in range(1, max_n + 1):
+        hyp, ref = char_ngrams(hypothesis, n), char_ngrams(reference, n)
+        if not hyp or not ref:
+            continue
+        overlap = sum((hyp & ref).values())
+        precisions.append(overlap / sum(hyp.values()))
+        recalls.append(overlap / sum(ref.values()))
+    if not precisions:
+        return 100.0 if hypothesis.strip() == reference.strip() else 0.0
+    precision, recall = sum(precisions) / len(precisions), sum(recalls) / len(recalls)
+    if precision + recall == 0:
+        return 0.0
+    return 100 * (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall)
+
+
+def corpus_chrf(hypotheses, references):
+    pairs = [(h, r) for h, r in zip(hypotheses, references) if r]
+    return round(sum(chrf(h, r) for h, r in pairs) / len(pairs), 2) if pairs else None
+
+
+def run_backend(backend, model_path, texts):
+    """Run inside the child interpreter: load one backend and translate `texts`."""
+    os.environ["NLLB_BACKEND"] = backend
+    if model_path:
+        os.environ["NLLB_MODEL_PATH"] = model_path
+    nllb = load_stage(".directTrans/script_ai_nllb.py")
+    peak_rss_mb = load_stage("Benchmarks/startup.py").peak_rss_mb
+
+    start = time.perf_counter()
+    engine = nllb.load_model()
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lengths = engine.token_lengths(texts)
+    translations = [None] * len(texts)
+    for batch in length_buckets(lengths, nllb.MAX_TOKENS_PER_BATCH, nllb.MAX_BATCH_SIZE):
+        for i, translated in zip(batch, engine.translate([texts[i] for i in batch])):
+            translations[i] = translated
+    translate_s = time.perf_counter() - start
+    rss = peak_rss_mb()
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "translate_s": round(translate_s, 2),
+        "segments_per_s": round(len(texts) / translate_s, 2) if translate_s else None,
+        "source_tokens_per_s": round(sum(lengths) / translate_s, 1) if translate_s else None,
+        "peak_rss_mb": rss and round(rss, 1),
+        "translations": translations,
+    }
+
+
+def run_child(backend, model_path, texts_path):
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", backend, "--texts", texts_path]
+        + (["--child-model-path", model_path] if model_path else []),
+        capture_output=True, text=True, encoding="utf-8",
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return {"backend": backend, "error": (completed.stderr or completed.stdout).strip()[-2000:]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "ctranslate2"],
+                        help="backends to compare; the first one is the quality reference")
+    parser.add_argument("--model-path", action="append", default=[], metavar="BACKEND=PATH",
+                        help="converted model for a backend (see convert_nllb.py)")
+    parser.add_argument("--limit", type=int, default=200, help="number of unique segments (0 = all)")
+    parser.add_argument("--output", help="write the report (with translations) to this JSON file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--child-model-path", help=argparse.SUPPRESS)
+    parser.add_argument("--texts", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with open(args.texts, "r", encoding="utf-8") as f:
+            texts = json.load(f)
+        print(json.dumps(run_backend(args.child, args.child_model_path, texts), ensure_ascii=False))
+        return
+
+    model_paths = dict(item.split("=", 1) for item in args.model_path)
+    segments = load_segments(args.limit)
+    texts = [text for text, _ in segments]
+    existing = [reference for _, reference in segments]
+    print(f"Comparing {len(args.backends)} backends on {len(texts)} unique AD Topic segments")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        texts_path = os.path.join(tmp, "texts.json")
+        with open(texts_path, "w", encoding="utf-8") as f:
+            json.dump(texts, f, ensure_ascii=False)
+        results = [run_child(backend, model_paths.get(backend), texts_path) for backend in args.backends]
+
+    reference = next((r["translations"] for r in results if "translations" in r), None)
+    print(f"{'backend':<12} {'load s':>7} {'seg/s':>7} {'tok/s':>8} {'RSS MB':>8} {'chrF ref':>9} {'chrF vn':>8}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['backend']:<12} failed: {result['error'].splitlines()[-1] if result['error'] else ''}")
+            continue
+        result["chrf_vs_reference"] = corpus_chrf(result["translations"], reference)
+        result["chrf_vs_existing_vn"] = corpus_chrf(result["translations"], existing)
+        print(f"{result['backend']:<12} {result['load_s']:>7} {result['segments_per_s']:>7} "
+              f"{result['source_tokens_per_s']:>8} {str(result['peak_rss_mb']):>8} "
+              f"{str(result['chrf_vs_reference']):>9} {str(result['chrf_vs_existing_vn']):>8}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"segments": texts, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Download the NLLB model (as pre-download.py does) and convert it for a
+lighter CPU backend of script_ai_nllb.py.
+
+    python convert_nllb.py --backend ctranslate2 --output models/nllb-200-1.3B-ct2
+    python convert_nllb.py --backend torch-int8 --output models/nllb-200-1.3B-int8.pt
+
+Then run the translation scripts with
+    NLLB_BACKEND=ctranslate2 NLLB_MODEL_PATH=models/nllb-200-1.3B-ct2
+
+The conversion itself needs the full-precision weights in memory once;
+the converted model is what the 8GB workers load afterwards.
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.nllb_backends import quantize_dynamic
+
+MODEL_NAME = "facebook/nllb-200-1.3B"
+
+
+def download(model_name):
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+    # Download and cache tokenizer & model
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    print(f"✅ {model_name} downloaded and cached!")
+    return tokenizer, model
+
+
+def convert_ctranslate2(model_name, output, quantization="int8", force=False):
+    import ctranslate2
+
+    download(model_name)  # the converter reads the files from the HF cache
+    converter = ctranslate2.converters.TransformersConverter(model_name)
+    converter.convert(output, quantization=quantization, force=force)
+    print(f"✅ CTranslate2 model ({quantization}) saved to {output}")
+
+
+def convert_torch_int8(model_name, output, force=False):
+    import torch
+
+    if os.path.exists(output) and not force:
+        raise FileExistsError(f"{output} already exists (use --force to overwrite)")
+    _, model = download(model_name)
+    model = quantize_dynamic(model.eval())
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    torch.save(model, output)
+    print(f"✅ int8 dynamically quantized model saved to {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["ctranslate2", "torch-int8"], default="ctranslate2")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--quantization", default="int8",
+                        help="CTranslate2 weight type: int8, int8_float32, int16, float32 ...")
+    parser.add_argument("--force", action="store_true", help="overwrite an existing output")
+    args = parser.parse_args()
+
+    if args.backend == "ctranslate2":
+        convert_ctranslate2(args.model, args.output, args.quantization, args.force)
+    else:
+        convert_torch_int8(args.model, args.output, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,67 @@
 import os
+import sys
 import json
-import win32com.client
 from deep_translator import GoogleTranslator
 
-def translate_ppt_text(input_ppt, output_ppt, target_lang="vi"):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.checkpoint import Checkpoint
+from common.dedup import plan_decks
+from common.folder_runner import run_folder
+from common import google_translate
+from common.google_translate import MODEL_NAME, REQUESTS_PER_MINUTE
+from common.instrumentation import span, traced
+from common.manifest import Manifest
+from common.powerpoint import init_worker_pool, open_application, pool_scope
+from common.rate_limit import shared_limiter
+from common.segmenter import apply_translations, deck_paragraphs, unique_segments
+from common.translation_cache import open_cache
+from common.translators import Capabilities, TranslationCore, Translator
+
+# Engine name in the manifest config and the run report counters
+ENGINE = "deep-translator-google"
+
+
+class DeepTranslatorEngine(Translator):
+    """deep_translator's GoogleTranslator, one segment per request."""
+    name = ENGINE
+    capabilities = Capabilities(max_batch_size=1, concurrency=4, retries=2, backoff=1.0)
+
+    def __init__(self):
+        # GoogleTranslator takes no URL: GOOGLE_TRANSLATE_URL (e.g. the local stand-in)
+        # is reached through common.google_translate, which speaks the same endpoint
+        self.driver = None
+        if google_translate.GOOGLE_TRANSLATE_URL != google_translate.DEFAULT_GOOGLE_TRANSLATE_URL:
+            self.driver = google_translate.GoogleTranslateDriver(base_url=google_translate.GOOGLE_TRANSLATE_URL,
+                                                                 use_memory=False)
+
+    @property
+    def rate_limiter(self):
+        # Same service as common.google_translate: the quota and its backoff are shared
+        return shared_limiter(MODEL_NAME, REQUESTS_PER_MINUTE)
+
+    def translate_batch(self, segments, src, tgt):
+        if self.driver is not None:
+            return self.driver.translate_batch(segments, src, tgt)
+        translator = GoogleTranslator(source=src, target=tgt)
+        return [translator.translate(segment) for segment in segments]
+
+
+def translate_segments(segments, target_lang="vi"):
+    """{segment: translation} for the segments that could be translated, each sent once."""
+    # Same endpoint as common.google_translate: the cached translations are shared with it
+    cache = open_cache().view("auto", target_lang, MODEL_NAME)
+    return TranslationCore(DeepTranslatorEngine(), "auto", target_lang, cache=cache).translate(segments)
+
+
+@traced("deck", file="input_ppt")
+def translate_ppt_text(input_ppt, output_ppt, target_lang="vi", pool=None, translations=None):
     """
     Translate all text in a PPT/PPTX presentation while keeping images, charts, and layouts intact.
+    `translations` ({segment: translation}, e.g. from the folder's dedup
+    plan) is used first; only the segments it lacks are sent.
+    Returns True when the deck was saved with every segment translated.
     """
-    # Open PowerPoint
-    ppt_app = win32com.client.Dispatch("PowerPoint.Application")
-    ppt_app.Visible = True  # Must be visible to avoid SaveAs errors
-
-    presentation = ppt_app.Presentations.Open(input_ppt, WithWindow=True)
-
-    # Iterate through all slides
-    for slide in presentation.Slides:
-        for shape in slide.Shapes:
-            if shape.HasTextFrame and shape.TextFrame.HasText:
-                original_text = shape.TextFrame.TextRange.Text.strip()
-                if original_text:
-                    try:
-                        translated_text = GoogleTranslator(source='auto', target=target_lang).translate(original_text)
-                        shape.TextFrame.TextRange.Text = translated_text
-                    except Exception as e:
-                        print(f"Warning: failed to translate '{original_text}': {e}")
-
-    # Save as PPT or PPTX
+    # Save as PPT or PPTX (checked before the deck is opened)
     if output_ppt.lower().endswith(".ppt"):
         file_format = 1  # PPT 97-2003
     elif output_ppt.lower().endswith(".pptx"):
@@ -33,23 +69,81 @@ def translate_ppt_text(input_ppt, output_ppt, target_lang="vi"):
     else:
         raise ValueError("Output file must end with .ppt or .pptx")
 
-    presentation.SaveAs(output_ppt, FileFormat=file_format)
-    presentation.Close()
-    ppt_app.Quit()
+    # Open PowerPoint (or the headless OOXML backend when both files are .pptx)
+    with open_application(input_ppt, output_ppt, pool=pool) as ppt_app:
+        ppt_app.Visible = True  # Must be visible to avoid SaveAs errors
+
+        with span("open", file=input_ppt):
+            presentation = ppt_app.Presentations.Open(input_ppt, WithWindow=True)
+
+        # Unique paragraph lines of the deck, each translated once
+        frames = deck_paragraphs(presentation)
+        segments, _ = unique_segments(frames)
+
+        translations = dict(translations or {})
+        translations.update(translate_segments([s for s in segments if s not in translations], target_lang))
+
+        # Back into the paragraphs (mixed formatting span by span);
+        # untranslated paragraphs keep the source text
+        missing = apply_translations(frames, translations)
+
+        with span("save", file=output_ppt):
+            presentation.SaveAs(output_ppt, FileFormat=file_format)
+        presentation.Close()
     print(f"Translated presentation saved to: {output_ppt}")
+    # A deck with segments left in English is translated again on the next run
+    return missing == 0
 
 
-def mass_translate_ppt(input_folder, output_folder, target_lang="vi"):
+def mass_translate_ppt(input_folder, output_folder, target_lang="vi", pool=None, workers=1, timeout=None, force=False):
     os.makedirs(output_folder, exist_ok=True)
 
-    for file_name in os.listdir(input_folder):
-        if file_name.lower().endswith((".ppt", ".pptx")):
-            input_path = os.path.join(input_folder, file_name)
-            output_path = os.path.join(output_folder, file_name)
-            print(f"Translating {input_path}...")
-            translate_ppt_text(input_path, output_path, target_lang)
-            print(f"Saved → {output_path}")
+    # Decks translated before with the same engine and language are skipped
+    config = {"engine": ENGINE, "target": target_lang}
+    manifest = Manifest(output_folder)
+    file_names = [f for f in os.listdir(input_folder) if f.lower().endswith((".ppt", ".pptx"))]
+    jobs = [(os.path.join(input_folder, f), os.path.join(output_folder, f), target_lang) for f in file_names]
+    jobs = manifest.pending(jobs, config, force)
+    if not jobs:
+        return
+
+    # Segments repeated across decks are translated once for the whole folder,
+    # then each deck gets the translations of its own segments. The checkpoint
+    # lets a crashed run resume without reading or translating anything again.
+    with Checkpoint(output_folder, config) as checkpoint:
+        if workers > 1:
+            with pool_scope(pool) as plan_pool:
+                plan = plan_decks([job[0] for job in jobs], pool=plan_pool, checkpoint=checkpoint)
+            plan.save(output_folder)
+            translations = translate_segments(plan.segments, target_lang)
+            jobs = [job + (None, plan.for_deck(job[0], translations)) for job in jobs]
+            # Each deck is recorded as soon as it is written, not once the folder is done
+            results = run_folder(translate_ppt_text, jobs, workers=workers, timeout=timeout, initializer=init_worker_pool,
+                                 on_result=lambda job, result: manifest.record_result(job, result, config))
+            # A deck left with untranslated segments is not ok: the journal stays for the resume
+            if all(result.ok for result in results):
+                checkpoint.finish()
+            return results
 
+        # One PowerPoint session for the whole folder instead of one per deck.
+        # The journal is kept while a deck has untranslated segments: the
+        # resume retries them without reading or translating the rest again.
+        complete = True
+        with pool_scope(pool) as pool:
+            plan = plan_decks([job[0] for job in jobs], pool=pool, checkpoint=checkpoint)
+            plan.save(output_folder)
+            translations = translate_segments(plan.segments, target_lang)
+            for input_path, output_path, _ in jobs:
+                print(f"Translating {input_path}...")
+                if translate_ppt_text(input_path, output_path, target_lang, pool=pool,
+                                      translations=plan.for_deck(input_path, translations)):
+                    manifest.record(input_path, output_path, config)
+                    manifest.save()
+                else:
+                    complete = False
+                print(f"Saved → {output_path}")
+        if complete:
+            checkpoint.finish()
 
 if __name__ == "__main__":
     INPUT_FOLDER = r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertPPTXToTXT\AD-ppt"
@@ -1,19 +1,27 @@
 import os
-import time
-import json
+import sys
 import re
 from dotenv import load_dotenv
-import google.generativeai as genai
-# Lưu ý: Yêu cầu cài đặt thư viện win32com.client (pywin32) trên Windows
-try:
-    import win32com.client
-except ImportError:
-    print("Warning: win32com.client not found. This script requires Windows and pywin32.")
-    win32com = None
+
+# Lưu ý: tệp .ppt cần win32com.client (pywin32) trên Windows; tệp .pptx được xử lý trực tiếp (OOXML)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import registry
+from common.checkpoint import Checkpoint
+from common.dedup import plan_decks
+from common.folder_runner import run_folder
+from common.instrumentation import span, traced
+from common.manifest import Manifest
+from common.powerpoint import init_worker_pool, open_application, pool_scope
+from common.segmenter import apply_translations, deck_paragraphs, unique_segments
+from common.translation_cache import open_cache
+from common.rate_limit import shared_limiter
+from common.translators import Capabilities, TranslationCore, Translator
 
 # ---------- CONFIGURATION AND AI SETUP ----------
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") 
+# Endpoint REST thay thế, ví dụ stand-in cục bộ (common.standin_servers) khi chạy offline
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
 
 # Hướng dẫn chi tiết cho mô hình để giữ nguyên định dạng và ID
 SYSTEM_INSTRUCTION = (
@@ -25,202 +33,276 @@ SYSTEM_INSTRUCTION = (
     "The output MUST only contain the translated text and the preserved identifiers, without extra explanations or remarks."
 )
 
-# Khởi tạo model/client (Sử dụng GenerativeModel như bạn đã xác nhận)
-client = None
+# Chia request theo ngân sách token (ước lượng ~4 ký tự / token) và gửi song song
+MAX_TOKENS_PER_REQUEST = 4000
+MAX_CONCURRENT_REQUESTS = 4
+# Quota của API key (ghi đè bằng GEMINI_RPM / GEMINI_TPM); bộ giới hạn tự giảm tốc khi gặp 429
+REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_RPM", "30"))
+TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TPM", "250000"))
+MAX_SEGMENTS_PER_REQUEST = 999  # ID có 3 chữ số: [TXT_001]..[TXT_999]
+RETRIES = 3  # Số vòng gửi lại các request lỗi và các ID bị thiếu trong phản hồi
+
 MODEL_NAME = "gemini-2.5-pro"
 
-try:
-    if not GEMINI_API_KEY:
-        raise ValueError("GEMINI_API_KEY not found in environment. Please check your .env file.")
-        
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel(MODEL_NAME)
-    client = model 
-    print("✅ Cấu hình Gemini bằng GenerativeModel thành công.")
-except Exception as e:
-    print(f"❌ Lỗi cấu hình Gemini: {e}. Vui lòng kiểm tra API Key và thư viện.")
-    client = None
-
-# ---------- CACHE SYSTEM (Dùng cho nội dung đã gán ID) ----------
-CACHE_FILE = "ppt_translation_cache.json"
-if os.path.exists(CACHE_FILE):
+RATE_LIMITER = shared_limiter(MODEL_NAME, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+
+def load_client():
+    """
+    Khởi tạo model/client (Sử dụng GenerativeModel như bạn đã xác nhận).
+    Được đăng ký lazy: chỉ chạy ở lần cache miss đầu tiên, trả về None nếu thất bại.
+    """
     try:
-        with open(CACHE_FILE, "r", encoding="utf-8") as f:
-            CACHE = json.load(f)
-    except json.JSONDecodeError:
-        print("⚠️ Cache file bị hỏng, tạo cache mới.")
-        CACHE = {}
-else:
-    CACHE = {}
+        if not GEMINI_API_KEY:
+            raise ValueError("GEMINI_API_KEY not found in environment. Please check your .env file.")
 
-def save_cache():
-    """Lưu toàn bộ cache"""
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(CACHE, f, ensure_ascii=False, indent=2)
+        import google.generativeai as genai
+        if GEMINI_API_ENDPOINT:
+            genai.configure(api_key=GEMINI_API_KEY, transport="rest",
+                            client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+        else:
+            genai.configure(api_key=GEMINI_API_KEY)
+        model = genai.GenerativeModel(MODEL_NAME)
+        print("✅ Cấu hình Gemini bằng GenerativeModel thành công.")
+        return model
+    except Exception as e:
+        print(f"❌ Lỗi cấu hình Gemini: {e}. Vui lòng kiểm tra API Key và thư viện.")
+        return None
+
+registry.register("gemini", load_client)
+
+def get_client():
+    return registry.get("gemini")
 
 # ---------- TRANSLATION CORE LOGIC ----------
+# Regex tìm: [TXT_XXX] + (bất kỳ nội dung nào, kể cả xuống dòng) + (cho đến ID tiếp theo hoặc END)
+CHUNK_PATTERN = re.compile(r'(\[TXT_\d+\])(.*?)(?=\[TXT_\d+\]|\[TXT_END\])', re.DOTALL)
 
-def translate_chunks_with_gemini(raw_text_with_ids, target_lang="vi", retries=3):
+def parse_chunks(raw_text):
     """
-    Gửi tất cả các đoạn văn bản (đã gán ID) đến Gemini để dịch.
+    Phân tích văn bản có ID và trả về từ điển {ID: nội dung}.
     """
-    if client is None:
-        return {} # Trả về từ điển rỗng
-
-    content_key = raw_text_with_ids.strip()
-    if content_key in CACHE:
-        # Tải bản dịch thô từ cache
-        translated_raw = CACHE[content_key]
-    else:
-        # Nếu chưa có trong cache, gọi API
-        for attempt in range(retries):
-            try:
-                # Gửi System Instruction và nội dung
-                response = client.generate_content(
-                    contents=[SYSTEM_INSTRUCTION, raw_text_with_ids],
-                    generation_config={"temperature": 0}
-                )
-                translated_raw = response.text
-                
-                if not translated_raw:
-                    raise Exception("API returned empty response.")
-                
-                CACHE[content_key] = translated_raw
-                save_cache()
-                break
-
-            except Exception as e:
-                print(f"⚠️ Dịch batch thất bại (thử {attempt+1}/{retries}).")
-                print(f"Lỗi: {e}")
-                time.sleep(2 * (attempt + 1))
-        else:
-            print("❌ Dịch batch thất bại sau nhiều lần thử, không thể dịch tệp.")
-            return {}
-            
-    # Phân tích cú pháp phản hồi và trả về từ điển {ID: Bản dịch}
-    # Sử dụng regex để tìm tất cả các ID [TXT_XXX] và văn bản theo sau
-    
     # Thêm ID giả ở cuối để đảm bảo đoạn cuối cùng được capture
-    translated_raw += "\n[TXT_END]" 
-    
-    # Regex tìm: [TXT_XXX] + (bất kỳ nội dung nào, kể cả xuống dòng) + (cho đến ID tiếp theo hoặc END)
-    pattern = re.compile(r'(\[TXT_\d+\])(.*?)(?=\[TXT_\d+\]|\[TXT_END\])', re.DOTALL)
-    
-    translated_chunks = {}
-    for match in pattern.finditer(translated_raw):
+    raw_text += "\n[TXT_END]"
+
+    chunks = {}
+    for match in CHUNK_PATTERN.finditer(raw_text):
         # match.group(1) là ID (e.g., [TXT_001])
-        # match.group(2) là nội dung dịch
+        # match.group(2) là nội dung
         chunk_id = match.group(1).strip()
         text = match.group(2).strip()
-        translated_chunks[chunk_id] = text
+        chunks[chunk_id] = text
+    return chunks
+
+
+def legacy_segment_pairs(legacy_cache):
+    """
+    Cache cũ lưu cả deck ("[TXT_001] ... [TXT_n]") làm khóa: tách khóa và
+    phản hồi theo ID để lấy lại từng cặp (đoạn gốc, bản dịch).
+    """
+    for raw_source, raw_translated in legacy_cache.items():
+        sources = parse_chunks(raw_source)
+        translations = parse_chunks(raw_translated)
+        for chunk_id, source_text in sources.items():
+            if source_text and translations.get(chunk_id):
+                yield source_text, translations[chunk_id]
+
+
+# ---------- CACHE SYSTEM (Cache theo từng đoạn văn bản) ----------
+# Kho cache append-only dùng chung với NLLB, khóa theo cặp ngôn ngữ và model
+LEGACY_CACHE_FILE = "ppt_translation_cache.json"
 
-    return translated_chunks
+def load_cache_store():
+    store = open_cache()
+    store.import_json(LEGACY_CACHE_FILE, "en", "vi", MODEL_NAME, pairs=legacy_segment_pairs)
+    return store
 
+registry.register("gemini-cache", load_cache_store)
 
-def translate_ppt_text(input_ppt, output_ppt, target_lang="vi"):
+def save_cache():
+    """Ghi các bản dịch mới vào log cache"""
+    registry.get("gemini-cache").flush()
+
+
+def translate_chunks_with_gemini(raw_text_with_ids, target_lang="vi"):
+    """
+    Gửi tất cả các đoạn văn bản (đã gán ID) đến Gemini để dịch.
+    Trả về từ điển {ID: Bản dịch}; lỗi API được ném ra để core thử lại.
+    """
+    # Gửi System Instruction và nội dung
+    response = get_client().generate_content(
+        contents=[SYSTEM_INSTRUCTION, raw_text_with_ids],
+        generation_config={"temperature": 0}
+    )
+    translated_raw = response.text
+    if not translated_raw:
+        raise Exception("API returned empty response.")
+
+    # Phân tích cú pháp phản hồi và trả về từ điển {ID: Bản dịch}
+    return parse_chunks(translated_raw)
+
+
+class GeminiEngine(Translator):
+    """
+    Gemini theo batch: mỗi request đánh số các đoạn [TXT_001]..[TXT_n], giữ
+    các đoạn của cùng một slide chung một request (ngữ cảnh cho model).
+    """
+    name = MODEL_NAME
+    capabilities = Capabilities(max_batch_size=MAX_SEGMENTS_PER_REQUEST, max_tokens_per_batch=MAX_TOKENS_PER_REQUEST,
+                                concurrency=MAX_CONCURRENT_REQUESTS, keep_slides=True, retries=RETRIES, backoff=2.0)
+
+    @property
+    def rate_limiter(self):
+        return RATE_LIMITER
+
+    def available(self):
+        # Client Gemini chỉ được khởi tạo khi có đoạn chưa nằm trong cache
+        return get_client() is not None
+
+    def translate_batch(self, segments, src, tgt):
+        ids = [f"[TXT_{i:03d}]" for i in range(1, len(segments) + 1)]
+        raw_text_with_ids = "\n\n".join(f"{chunk_id} {text}" for chunk_id, text in zip(ids, segments))
+        translated_chunks = translate_chunks_with_gemini(raw_text_with_ids, tgt)
+
+        results = []
+        for chunk_id in ids:
+            translated_text = translated_chunks.get(chunk_id)
+            # Nếu bản dịch vẫn chứa ID (lỗi parser), chỉ lấy phần văn bản sau ID
+            if translated_text and translated_text.startswith(chunk_id):
+                translated_text = translated_text[len(chunk_id):].lstrip()
+            results.append(translated_text or None)
+        return results
+
+
+def translate_segments_with_gemini(texts, target_lang="vi", slides=None):
+    """
+    Dịch danh sách đoạn văn bản, tra cache cho từng đoạn trước.
+    Các đoạn chưa có trong cache (đã khử trùng lặp) được chia thành nhiều
+    request theo ngân sách token, giữ nguyên slide (`slides` cho biết slide
+    của từng đoạn), rồi gửi song song. Request lỗi và ID bị thiếu trong phản
+    hồi được gửi lại tự động. Kết quả được lưu vào cache theo từng đoạn.
+    Trả về danh sách bản dịch (None nếu không dịch được).
+    """
+    cache = registry.get("gemini-cache").view("en", target_lang, MODEL_NAME)
+    return TranslationCore(GeminiEngine(), "en", target_lang, cache=cache).translate_list(texts, slides)
+
+
+@traced("deck", file="input_ppt")
+def translate_ppt_text(input_ppt, output_ppt, target_lang="vi", pool=None, translations=None):
     """
     Trích xuất, dịch batch và đưa văn bản dịch vào lại PPT.
+    Client Gemini chỉ được khởi tạo khi có đoạn chưa nằm trong cache.
+    `translations` ({đoạn: bản dịch}, từ kế hoạch khử trùng lặp của cả thư
+    mục) được dùng trước; chỉ các đoạn còn thiếu mới được gửi đi.
+    Trả về True khi tệp đích đã được lưu với đầy đủ bản dịch.
     """
-    if win32com is None:
-        print("Lỗi: win32com.client không khả dụng. Không thể tự động hóa PowerPoint.")
-        return
-    if client is None:
-        print("Lỗi: Gemini Model chưa được cấu hình. Dừng dịch.")
-        return
 
-    # 1. Trích xuất văn bản và tạo danh sách mapping
-    text_chunks_to_translate = []
-    shape_map = [] # Lưu trữ tham chiếu đến Shape để đưa văn bản dịch vào lại
-    text_id_counter = 1
+    # Định dạng lưu được kiểm tra trước khi mở deck
+    if output_ppt.lower().endswith(".ppt"):
+        file_format = 1
+    elif output_ppt.lower().endswith(".pptx"):
+        file_format = 24 # Use 24 (pptx file) instead of 12 for modern files
+    else:
+        raise ValueError("Output file must end with .ppt or .pptx")
 
-    ppt_app = win32com.client.Dispatch("PowerPoint.Application")
-    ppt_app.Visible = True 
-    
+    # Phiên PowerPoint được mượn từ pool (nếu có); lỗi COM sẽ đi qua lease để pool kiểm tra phiên
     try:
-        presentation = ppt_app.Presentations.Open(input_ppt, WithWindow=True)
-
-        for slide in presentation.Slides:
-            for shape in slide.Shapes:
-                if shape.HasTextFrame and shape.TextFrame.HasText:
-                    original_text = shape.TextFrame.TextRange.Text
-                    
-                    # Trích xuất văn bản thô, bao gồm khoảng trắng và ngắt dòng
-                    if original_text and original_text.strip():
-                        unique_id = f"[TXT_{text_id_counter:03d}]"
-                        
-                        text_chunks_to_translate.append(f"{unique_id} {original_text}")
-                        
-                        shape_map.append({
-                            "id": unique_id,
-                            "shape": shape,
-                            "original_text": original_text # Giữ nguyên text để tham chiếu
-                        })
-                        text_id_counter += 1
-
-        if not text_chunks_to_translate:
-            print("Không tìm thấy văn bản nào để dịch trong tệp.")
-            presentation.Close()
-            ppt_app.Quit()
-            return
-            
-        # 2. Dịch batch bằng Gemini
-        raw_text_with_ids = "\n\n".join(text_chunks_to_translate)
-        print(f"   -> Gửi {len(shape_map)} đoạn văn bản đến Gemini...")
-        
-        translated_chunks = translate_chunks_with_gemini(raw_text_with_ids, target_lang)
-
-        # 3. Chèn văn bản đã dịch vào lại PPT
-        if translated_chunks:
-            for item in shape_map:
-                translated_text = translated_chunks.get(item["id"])
-                
-                if translated_text:
-                    # Kiểm tra xem có chứa ID không (để tránh lỗi parser)
-                    # Nếu có, chỉ lấy phần văn bản sau ID
-                    if translated_text.startswith(item["id"]):
-                         translated_text = translated_text[len(item["id"]):].lstrip()
-                         
-                    item["shape"].TextFrame.TextRange.Text = translated_text
-                else:
-                    print(f"Warning: Không tìm thấy bản dịch cho ID {item['id']}. Giữ nguyên văn bản gốc.")
+        with open_application(input_ppt, output_ppt, pool=pool) as ppt_app:
+            ppt_app.Visible = True 
+            with span("open", file=input_ppt):
+                presentation = ppt_app.Presentations.Open(input_ppt, WithWindow=True)
 
+            # 1. Tách khung văn bản thành đoạn (paragraph) và dòng; mỗi dòng duy nhất là một segment
+            frames = deck_paragraphs(presentation)
+            segments, slides = unique_segments(frames)
+
+            if not segments:
+                # Deck không có chữ vẫn được lưu (không đổi) để manifest ghi nhận và không mở lại
+                print("Không tìm thấy văn bản nào để dịch trong tệp.")
+
+            # 2. Dịch batch bằng Gemini (chỉ các đoạn chưa có bản dịch và chưa có trong cache)
+            translations = {segment: text for segment, text in (translations or {}).items() if text}
+            pending = [(segment, slide) for segment, slide in zip(segments, slides) if segment not in translations]
+            if pending:
+                texts = [segment for segment, _ in pending]
+                results = translate_segments_with_gemini(texts, target_lang, slides=[slide for _, slide in pending])
+                translations.update((segment, text) for segment, text in zip(texts, results) if text)
+
+            # 3. Chèn bản dịch vào lại từng đoạn; đoạn có nhiều định dạng (đậm, màu, link) được
+            # dịch và ghi lại theo từng run. Đoạn thiếu bản dịch được giữ nguyên văn bản gốc
+            missing = apply_translations(frames, translations)
 
-        # 4. Lưu và đóng PPT
-        if output_ppt.lower().endswith(".ppt"):
-            file_format = 1 
-        elif output_ppt.lower().endswith(".pptx"):
-            file_format = 24 # Use 24 (pptx file) instead of 12 for modern files
-        else:
-            raise ValueError("Output file must end with .ppt or .pptx")
 
-        presentation.SaveAs(output_ppt, FileFormat=file_format)
-        presentation.Close()
+            # 4. Lưu và đóng PPT
+            with span("save", file=output_ppt):
+                presentation.SaveAs(output_ppt, FileFormat=file_format)
+            presentation.Close()
         
     except Exception as e:
+        # Các bản dịch đã nhận không mất theo: chúng nằm trong cache (và checkpoint
+        # của mass_translate_ppt), lần chạy lại chỉ mở lại deck rồi ghi vào
         print(f"Lỗi trong quá trình xử lý PowerPoint: {e}")
-    finally:
-        ppt_app.Quit()
+        return False
     
     print(f"Translated presentation saved to: {output_ppt}")
+    # Deck còn đoạn chưa dịch (ví dụ thiếu API key) sẽ được dịch lại ở lần chạy sau
+    return missing == 0
 
 
-def mass_translate_ppt(input_folder, output_folder, target_lang="vi"):
+def mass_translate_ppt(input_folder, output_folder, target_lang="vi", pool=None, workers=1, timeout=None, force=False):
     os.makedirs(output_folder, exist_ok=True)
 
-    for file_name in os.listdir(input_folder):
-        if file_name.lower().endswith((".ppt", ".pptx")):
-            input_path = os.path.join(input_folder, file_name)
-            output_path = os.path.join(output_folder, file_name)
-            print(f"Translating {input_path}...")
-            translate_ppt_text(input_path, output_path, target_lang)
-            print(f"Saved → {output_path}")
+    # Bỏ qua các deck không đổi kể từ lần chạy trước (cùng model, cùng ngôn ngữ).
+    # Deck đã đổi chỉ gửi lại các segment mới: phần còn lại lấy từ cache.
+    config = {"engine": MODEL_NAME, "target": target_lang}
+    manifest = Manifest(output_folder)
+    file_names = [f for f in os.listdir(input_folder) if f.lower().endswith((".ppt", ".pptx"))]
+    jobs = [(os.path.join(input_folder, f), os.path.join(output_folder, f), target_lang) for f in file_names]
+    jobs = manifest.pending(jobs, config, force)
+    if not jobs:
+        return
+
+    def translate_plan(plan):
+        translations = translate_segments_with_gemini(plan.segments, target_lang, slides=plan.slides)
+        return {segment: text for segment, text in zip(plan.segments, translations) if text}
+
+    # Các đoạn lặp lại giữa các deck chỉ được dịch một lần cho cả thư mục,
+    # sau đó mỗi deck nhận bản dịch của các đoạn của chính nó. Checkpoint giúp
+    # lần chạy lại sau sự cố tiếp tục đúng chỗ dừng: không đọc lại deck, không dịch lại đoạn nào.
+    with Checkpoint(output_folder, config) as checkpoint:
+        if workers > 1:
+            with pool_scope(pool) as plan_pool:
+                plan = plan_decks([job[0] for job in jobs], pool=plan_pool, checkpoint=checkpoint)
+            plan.save(output_folder)
+            translations = translate_plan(plan)
+            jobs = [job + (None, plan.for_deck(job[0], translations)) for job in jobs]
+            # Mỗi deck được ghi vào manifest ngay khi lưu xong, không đợi cả thư mục
+            results = run_folder(translate_ppt_text, jobs, workers=workers, timeout=timeout, initializer=init_worker_pool,
+                                 on_result=lambda job, result: manifest.record_result(job, result, config))
+            if all(result.ok and result.value is not False for result in results):
+                checkpoint.finish()
+            return results
 
+        # Dùng chung một phiên PowerPoint cho cả thư mục
+        complete = True
+        with pool_scope(pool) as pool:
+            plan = plan_decks([job[0] for job in jobs], pool=pool, checkpoint=checkpoint)
+            plan.save(output_folder)
+            translations = translate_plan(plan)
+            for input_path, output_path, _ in jobs:
+                print(f"Translating {input_path}...")
+                if translate_ppt_text(input_path, output_path, target_lang, pool=pool,
+                                      translations=plan.for_deck(input_path, translations)):
+                    manifest.record(input_path, output_path, config)
+                    manifest.save()
+                else:
+                    complete = False
+                print(f"Saved → {output_path}")
+        if complete:
+            checkpoint.finish()
 
 if __name__ == "__main__":
     INPUT_FOLDER = r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertPPTXToTXT\AD-ppt"
     OUTPUT_FOLDER = r"C:\Users\caoli\PycharmProjects\SlideConverter\TranslatedSlides"
-    
-    if client is not None:
-        mass_translate_ppt(INPUT_FOLDER, OUTPUT_FOLDER, target_lang="vi")
-    else:
-        print("❌ Dừng lại: Không thể chạy dịch thuật do Gemini Model chưa được cấu hình.")
\ No newline at end of file
+
+    # Client Gemini (và API key) chỉ cần khi có đoạn chưa nằm trong cache: GeminiEngine.available()
+    mass_translate_ppt(INPUT_FOLDER, OUTPUT_FOLDER, target_lang="vi")
\ No newline at end of file
@@ -1,20 +1,18 @@
 import os
-import json
-import win32com.client
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-
-# ---------------- CACHE SYSTEM ----------------
-CACHE_FILE = "translation_cache.json"
-if os.path.exists(CACHE_FILE):
-    with open(CACHE_FILE, "r", encoding="utf-8") as f:
-        CACHE = json.load(f)
-else:
-    CACHE = {}
-
-def save_cache():
-    """Save cached translations to JSON."""
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(CACHE, f, ensure_ascii=False, indent=2)
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import registry
+from common.checkpoint import Checkpoint
+from common.dedup import plan_decks
+from common.folder_runner import run_folder
+from common.instrumentation import span, traced
+from common.manifest import Manifest
+from common.nllb_backends import compute_type, load_backend, model_key
+from common.powerpoint import init_worker_pool, open_application, pool_scope
+from common.segmenter import apply_translations, deck_paragraphs, unique_segments
+from common.translation_cache import open_cache
+from common.translators import Capabilities, TranslationCore, Translator
 
 # ---------------- NLLB-200 MODEL SETUP ----------------
 # Model for offline translation
@@ -22,65 +20,95 @@ MODEL_NAME = "facebook/nllb-200-1.3B"
 SRC_LANG = "eng_Latn"  # English
 TGT_LANG = "vie_Latn"  # Vietnamese
 
-# Load tokenizer and model
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
-
 # Manual BOS token ID for Vietnamese (for older transformers without lang_code_to_id)
 FORCED_BOS_TOKEN_ID = 250004
 
-# ---------------- AI TRANSLATOR ----------------
-def translate_text(text: str) -> str:
+# Inference backend: "torch" (full precision), "torch-int8" or "ctranslate2".
+# NLLB_MODEL_PATH points at the output of convert_nllb.py for the last two.
+BACKEND = os.getenv("NLLB_BACKEND", "torch")
+MODEL_PATH = os.getenv("NLLB_MODEL_PATH")
+# Quantized output differs from full precision: cache entries are kept per backend
+CACHE_MODEL = model_key(MODEL_NAME, BACKEND)
+
+def load_model():
     """
-    Translate English text to Vietnamese using NLLB-200.
-    Uses cache to avoid repeated translation.
+    Load the tokenizer and model. Registered lazily: importing this script
+    is cheap, the weights are only loaded on the first cache miss.
     """
-    key = text.strip()
-    if not key:
-        return ""  # skip empty lines
+    print(f"🧠 Loading {MODEL_NAME} ({BACKEND})...")
+    with span("load_model", backend=BACKEND):
+        return load_backend(BACKEND, MODEL_NAME, SRC_LANG, TGT_LANG, FORCED_BOS_TOKEN_ID, MODEL_PATH)
 
-    if key in CACHE:
-        return CACHE[key]
+# ---------------- CACHE SYSTEM ----------------
+# Shared append-only store, keyed by language pair and model (and backend)
+LEGACY_CACHE_FILE = "translation_cache.json"
 
-    # Tokenize input text
-    inputs = tokenizer(key, return_tensors="pt")
+def load_cache():
+    cache = open_cache().view(SRC_LANG, TGT_LANG, CACHE_MODEL)
+    if CACHE_MODEL == MODEL_NAME:
+        # The legacy JSON cache was filled by the full-precision model
+        cache.import_json(LEGACY_CACHE_FILE)
+    return cache
 
-    # Generate translation, force Vietnamese output
-    translated_tokens = model.generate(
-        **inputs,
-        forced_bos_token_id=FORCED_BOS_TOKEN_ID
-    )
+registry.register("nllb", load_model)
+registry.register("nllb-cache", load_cache)
 
-    # Decode translation
-    translated_text = tokenizer.batch_decode(translated_tokens, skip_special_tokens=True)[0]
+def save_cache():
+    """Flush cached translations to the append-only log."""
+    registry.get("nllb-cache").flush()
+
+# Padded source tokens allowed in one model.generate() call (batch size x longest input)
+MAX_TOKENS_PER_BATCH = 2048
+MAX_BATCH_SIZE = 64
 
-    # Save to cache
-    CACHE[key] = translated_text
-    save_cache()
+# ---------------- AI TRANSLATOR ----------------
+class NllbEngine(Translator):
+    """The NLLB backend: length-bucketed, padded batches, one model.generate() call each."""
+    name = CACHE_MODEL
 
-    return translated_text
+    def __init__(self, max_tokens_per_batch=MAX_TOKENS_PER_BATCH):
+        # A local model: a failed batch will fail again, so no retries
+        self.capabilities = Capabilities(max_batch_size=MAX_BATCH_SIZE, max_tokens_per_batch=max_tokens_per_batch,
+                                         retries=0)
+
+    def token_lengths(self, segments):
+        return registry.get("nllb").token_lengths(segments)
+
+    def translate_batch(self, segments, src, tgt):
+        # Vietnamese output forced by the backend
+        return registry.get("nllb").translate(segments)
+
+
+def translate_batch(texts, max_tokens_per_batch=MAX_TOKENS_PER_BATCH):
+    """
+    Translate many strings with as few model.generate() calls as possible.
+    Cache hits are skipped, the misses are translated in length-bucketed,
+    padded batches. Returns translations aligned with `texts` (None for
+    those the model failed on).
+    """
+    core = TranslationCore(NllbEngine(max_tokens_per_batch), SRC_LANG, TGT_LANG,
+                           cache=registry.get("nllb-cache"), memory_lang="vi")
+    return core.translate_list(texts)
+
+
+def translate_text(text: str) -> str:
+    """
+    Translate English text to Vietnamese using NLLB-200.
+    Uses cache to avoid repeated translation.
+    """
+    return translate_batch([text])[0] or text
 
 # ---------------- PPT TRANSLATION ----------------
-def translate_ppt_text(input_ppt: str, output_ppt: str):
+@traced("deck", file="input_ppt")
+def translate_ppt_text(input_ppt: str, output_ppt: str, pool=None, translations=None):
     """
     Translate all text in a PPT/PPTX while keeping images, charts, and layouts.
+    Text frames are split into paragraphs, their unique lines translated as
+    one batch, then written back paragraph by paragraph. Lines already in
+    `translations` (the folder's dedup plan) are not batched again.
+    Returns True when the deck was saved with every line translated.
     """
-    ppt_app = win32com.client.Dispatch("PowerPoint.Application")
-    ppt_app.Visible = True
-    presentation = ppt_app.Presentations.Open(input_ppt, WithWindow=True)
-
-    for slide in presentation.Slides:
-        for shape in slide.Shapes:
-            if shape.HasTextFrame and shape.TextFrame.HasText:
-                original_text = shape.TextFrame.TextRange.Text.strip()
-                if original_text:
-                    try:
-                        translated_text = translate_text(original_text)
-                        shape.TextFrame.TextRange.Text = translated_text
-                    except Exception as e:
-                        print(f"⚠️ Warning: failed to translate '{original_text}': {e}")
-
-    # Save translated presentation
+    # Save as PPT or PPTX (checked before the deck is opened)
     if output_ppt.lower().endswith(".ppt"):
         file_format = 1  # PPT 97-2003
     elif output_ppt.lower().endswith(".pptx"):
@@ -88,25 +116,99 @@ def translate_ppt_text(input_ppt: str, output_ppt: str):
     else:
         raise ValueError("Output file must end with .ppt or .pptx")
 
-    presentation.SaveAs(output_ppt, FileFormat=file_format)
-    presentation.Close()
-    ppt_app.Quit()
+    with open_application(input_ppt, output_ppt, pool=pool) as ppt_app:
+        ppt_app.Visible = True
+        with span("open", file=input_ppt):
+            presentation = ppt_app.Presentations.Open(input_ppt, WithWindow=True)
+
+        # 1. Collect the paragraphs of every shape with text
+        frames = deck_paragraphs(presentation)
+        segments, _ = unique_segments(frames)
+
+        # 2. Translate all cache misses of the deck in batches
+        translations = dict(translations or {})
+        pending = [segment for segment in segments if segment not in translations]
+        try:
+            translations.update((segment, text) for segment, text in zip(pending, translate_batch(pending)) if text)
+        except Exception as e:
+            print(f"⚠️ Warning: batch translation failed, keeping original text: {e}")
+
+        # 3. Write translations back paragraph by paragraph (mixed formatting span
+        # by span); untranslated lines keep the source text
+        missing = apply_translations(frames, translations)
+
+        with span("save", file=output_ppt):
+            presentation.SaveAs(output_ppt, FileFormat=file_format)
+        presentation.Close()
     print(f"✅ Translated presentation saved to: {output_ppt}")
+    # A deck with lines left in English is translated again on the next run
+    return missing == 0
 
 # ---------------- MASS TRANSLATION ----------------
-def mass_translate_ppt(input_folder: str, output_folder: str):
+def mass_translate_ppt(input_folder: str, output_folder: str, pool=None, workers: int = 1, timeout=None, force: bool = False):
     """
-    Translate all PPT/PPTX files in a folder.
+    Translate all PPT/PPTX files in a folder, reusing one PowerPoint session.
+    A dedup plan of the whole folder comes first: every unique line is
+    translated once, in batches filled across files, and each deck then
+    only writes its translations back. With workers > 1 the write-back is
+    spread over processes; the model is only loaded by this one.
+    Decks unchanged since the last run (same model and languages) are
+    skipped; changed decks only send their new texts to the model.
     """
     os.makedirs(output_folder, exist_ok=True)
 
-    for file_name in os.listdir(input_folder):
-        if file_name.lower().endswith((".ppt", ".pptx")):
-            input_path = os.path.join(input_folder, file_name)
-            output_path = os.path.join(output_folder, file_name)
-            print(f"📄 Translating {input_path}...")
-            translate_ppt_text(input_path, output_path)
-            print(f"✅ Saved → {output_path}\n")
+    # Switching NLLB_BACKEND rebuilds the decks with the new backend
+    config = {"engine": MODEL_NAME, "backend": BACKEND, "compute_type": compute_type(BACKEND),
+              "src": SRC_LANG, "tgt": TGT_LANG}
+    manifest = Manifest(output_folder)
+    file_names = [f for f in os.listdir(input_folder) if f.lower().endswith((".ppt", ".pptx"))]
+    jobs = [(os.path.join(input_folder, f), os.path.join(output_folder, f)) for f in file_names]
+    jobs = manifest.pending(jobs, config, force)
+    if not jobs:
+        return
+
+    def translate_plan(plan):
+        print(f"🧠 Translating {len(plan.segments)} unique texts from {len(jobs)} files...")
+        try:
+            return {segment: text for segment, text in zip(plan.segments, translate_batch(plan.segments)) if text}
+        except Exception as e:
+            print(f"⚠️ Warning: folder batch failed, falling back to per-deck batches: {e}")
+            return {}
+
+    # A crashed run resumes from the checkpoint: no deck is read, no text translated twice
+    with Checkpoint(output_folder, config) as checkpoint:
+        if workers > 1:
+            with pool_scope(pool) as plan_pool:
+                plan = plan_decks([job[0] for job in jobs], pool=plan_pool, checkpoint=checkpoint)
+            plan.save(output_folder)
+            translations = translate_plan(plan)
+            jobs = [job + (None, plan.for_deck(job[0], translations)) for job in jobs]
+            results = run_folder(translate_ppt_text, jobs, workers=workers, timeout=timeout, initializer=init_worker_pool,
+                                 on_result=lambda job, result: manifest.record_result(job, result, config))
+            # A deck left with untranslated segments is not ok: the journal stays for the resume
+            if all(result.ok for result in results):
+                checkpoint.finish()
+            return results
+
+        # Decks with untranslated lines keep the journal for the resume
+        complete = True
+        with pool_scope(pool) as pool:
+            plan = plan_decks([job[0] for job in jobs], pool=pool, checkpoint=checkpoint)
+            plan.save(output_folder)
+            translations = translate_plan(plan)
+
+            for input_path, output_path in jobs:
+                print(f"📄 Translating {input_path}...")
+                if translate_ppt_text(input_path, output_path, pool=pool,
+                                      translations=plan.for_deck(input_path, translations)):
+                    manifest.record(input_path, output_path, config)
+                    manifest.save()
+                    print(f"✅ Saved → {output_path}\n")
+                else:
+                    print(f"⚠️ Saved with untranslated lines → {output_path}, retried next run\n")
+                    complete = False
+        if complete:
+            checkpoint.finish()
 
 # ---------------- MAIN ----------------
 if __name__ == "__main__":
@@ -0,0 +1,405 @@
+"""
+Throughput of every pipeline stage on a synthetic course, offline.
+
+    python Benchmarks/pipeline.py                                  # every stage, 12 decks x 24 slides
+    python Benchmarks/pipeline.py --decks 40 --slides 30 --repeats 5 --output bench.json
+    python Benchmarks/pipeline.py direct-nllb direct-gemini --latency 50
+    python Benchmarks/pipeline.py --compare bench-before.json
+
+The decks come from Benchmarks/synthetic.py and are served by
+common.fake_powerpoint, so the COM stages run on Linux without
+PowerPoint. The translators are deterministic fakes ("[vi] <text>"):
+Google Translate is the local HTTP stand-in for translate_file and a fake
+GoogleTranslator for .directTrans/script.py, NLLB and Gemini get fake
+engines through the registry (the Gemini rate limiter is lifted). --latency
+adds a fixed delay per translator request. The HTTP stand-in runs in the
+measured interpreter, so translate_file also pays for the server side.
+
+Each stage runs in a fresh interpreter (so its peak RSS is its own), in
+a temporary folder with an empty translation cache per repeat and the
+translation memory off. A sample is one deck: the report has the p50/p95
+latency per deck, segments per second (non-empty lines of the decks) and
+peak RSS for every stage, and --output saves it as JSON for comparing
+versions with --compare.
+"""
+import os
+import io
+import sys
+import json
+import time
+import types
+import shutil
+import platform
+import argparse
+import tempfile
+import traceback
+import subprocess
+import contextlib
+import importlib.util
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common import registry
+from common.fake_powerpoint import FakeApplication
+from common.powerpoint import PowerPointPool
+from common.standin_servers import fake_translation
+from common.streaming import load_stage
+
+TEMPLATE_NAME = "base_template.ppt"
+# Title slide, body slide and closing slide, each with a title and a content box
+TEMPLATE_DECK = [["Title", "Subtitle"], ["Title", "Content"], ["Title", "Content"]]
+
+DEFAULTS = {"decks": 12, "slides": 24, "bullets": 4, "words": 6, "repeat": 0.25, "seed": 0,
+            "repeats": 3, "latency": 0.0, "template": None}
+
+
+# ---------------- fake translators ----------------
+class FakeGoogleTranslator:
+    """deep_translator.GoogleTranslator without the network."""
+
+    latency = 0.0
+
+    def __init__(self, source="auto", target="vi"):
+        self.target = target
+
+    def translate(self, text):
+        time.sleep(self.latency)
+        return fake_translation(text, self.target)
+
+
+class FakeNllbEngine:
+    """The NLLB backend interface (common.nllb_backends) without a model."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.batches = 0
+
+    def token_lengths(self, texts):
+        return [len(text.split()) + 2 for text in texts]
+
+    def translate(self, texts):
+        self.batches += 1
+        time.sleep(self.latency)
+        return [fake_translation(text, "vi") for text in texts]
+
+
+class FakeGeminiModel:
+    """genai.GenerativeModel answering the [TXT_nnn] protocol of script_ai_gemini.py."""
+
+    def __init__(self, parse_chunks, latency=0.0):
+        self.parse_chunks = parse_chunks
+        self.latency = latency
+        self.requests = 0
+
+    def generate_content(self, contents, generation_config=None):
+        self.requests += 1
+        time.sleep(self.latency)
+        chunks = self.parse_chunks(contents[-1])
+        return types.SimpleNamespace(
+            text="\n\n".join(f"{chunk_id} {fake_translation(text, 'vi')}" for chunk_id, text in chunks.items())
+        )
+
+
+# ---------------- stages ----------------
+class Bench:
+    """One stage run: the corpus, its TXT/JSON forms on disk and a fake PowerPoint serving the decks."""
+
+    def __init__(self, config, workdir):
+        synthetic = load_stage("Benchmarks/synthetic.py")
+        self.config = config
+        self.workdir = workdir
+        self.decks = synthetic.synthetic_corpus(config["decks"], config["slides"], config["bullets"],
+                                                config["words"], config["repeat"], config["seed"])
+        self.segments = {name: synthetic.deck_segments(deck) for name, deck in self.decks.items()}
+        self.decks[TEMPLATE_NAME] = TEMPLATE_DECK
+        self.template = config["template"] or os.path.join(workdir, TEMPLATE_NAME)
+        for folder in ("ppt", "txt", "json", "out"):
+            os.makedirs(os.path.join(workdir, folder), exist_ok=True)
+
+    def path(self, folder, name, extension=None):
+        if extension:
+            name = os.path.splitext(name)[0] + extension
+        return os.path.join(self.workdir, folder, name)
+
+    def names(self):
+        return [name for name in self.decks if name != TEMPLATE_NAME]
+
+    def pool(self):
+        return PowerPointPool(factory=lambda: FakeApplication(self.decks))
+
+    def prepare_txt(self):
+        extract = load_stage("ConvertPPTXToTXT/script.py")
+        with self.pool() as pool:
+            for name in self.names():
+                extract.save_slide_txt(extract.extract_lines_from_ppt(self.path("ppt", name), pool=pool),
+                                       self.path("txt", name, ".txt"))
+
+    def prepare_json(self):
+        self.prepare_txt()
+        to_json = load_stage("ConvertTxtToJson/script.py")
+        for name in self.names():
+            to_json.save_json(to_json.convert_txt_to_json(self.path("txt", name, ".txt")),
+                              self.path("json", name, ".json"))
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def bench_extract(bench):
+    stage = load_stage("ConvertPPTXToTXT/script.py")
+
+    def run():
+        with bench.pool() as pool:
+            return [timed(stage.extract_lines_from_ppt, bench.path("ppt", name), pool=pool) for name in bench.names()]
+    return run
+
+
+def bench_translate_file(bench):
+    from common import google_translate
+    from common.standin_servers import google_translate_standin
+
+    stage = load_stage("ConvertEngToVN/script.py")
+    bench.prepare_txt()
+    latency = bench.config["latency"]
+
+    def translate(text, target):
+        time.sleep(latency)
+        return fake_translation(text, target)
+
+    def run():
+        with google_translate_standin(translate) as url:
+            google_translate.GOOGLE_TRANSLATE_URL = url
+            return [timed(stage.translate_file, bench.path("txt", name, ".txt"), bench.path("out", name, ".txt"))
+                    for name in bench.names()]
+    return run
+
+
+def bench_txt_to_json(bench):
+    stage = load_stage("ConvertTxtToJson/script.py")
+    bench.prepare_txt()
+
+    def run():
+        return [timed(stage.convert_txt_to_json, bench.path("txt", name, ".txt")) for name in bench.names()]
+    return run
+
+
+def bench_append_slides(bench):
+    stage = load_stage("ConvertBackToPPTWithExample/action_script.py")
+    bench.prepare_json()
+    extension = ".pptx" if bench.template.lower().endswith(".pptx") else ".ppt"
+
+    def run():
+        with bench.pool() as pool:
+            return [timed(stage.append_slides_from_json2, bench.template, bench.path("json", name, ".json"),
+                          bench.path("out", name, extension), pool=pool)
+                    for name in bench.names()]
+    return run
+
+
+def bench_engine(script, install):
+    def setup(bench):
+        module = load_stage(script)
+        install(module, bench.config["latency"])
+
+        def run():
+            with bench.pool() as pool:
+                return [timed(module.translate_ppt_text, bench.path("ppt", name), bench.path("out", name), pool=pool)
+                        for name in bench.names()]
+        return run
+    return setup
+
+
+def install_google(module, latency):
+    FakeGoogleTranslator.latency = latency
+    module.GoogleTranslator = FakeGoogleTranslator
+
+
+def install_nllb(module, latency):
+    registry.register("nllb", lambda: FakeNllbEngine(latency))
+
+
+def install_gemini(module, latency):
+    from common.rate_limit import RateLimiter
+    registry.register("gemini", lambda: FakeGeminiModel(module.parse_chunks, latency))
+    module.RATE_LIMITER = RateLimiter(0)
+
+
+def import_direct_google():
+    # The script imports deep_translator at the top; its translator is
+    # replaced by FakeGoogleTranslator anyway, so a missing package is fine
+    if importlib.util.find_spec("deep_translator") is None:
+        sys.modules["deep_translator"] = types.SimpleNamespace(GoogleTranslator=FakeGoogleTranslator)
+
+
+STAGES = {
+    "extract_lines_from_ppt": bench_extract,
+    "translate_file": bench_translate_file,
+    "convert_txt_to_json": bench_txt_to_json,
+    "append_slides_from_json2": bench_append_slides,
+    "direct-google": bench_engine(".directTrans/script.py", install_google),
+    "direct-nllb": bench_engine(".directTrans/script_ai_nllb.py", install_nllb),
+    "direct-gemini": bench_engine(".directTrans/script_ai_gemini.py", install_gemini),
+}
+
+# Cache entries to rebuild per repeat, so every repeat starts cold
+CACHE_ENTRIES = ("nllb-cache", "gemini-cache")
+
+
+# ---------------- measuring ----------------
+def percentile(values, q):
+    """Linear-interpolated q-quantile (0..1) of `values`, None when empty."""
+    values = sorted(values)
+    if not values:
+        return None
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def measure(stage, config):
+    """Run inside the child interpreter: set one stage up and time it `repeats` times."""
+    os.environ["TRANSLATION_MEMORY"] = "0"  # read when the stages import it
+    peak_rss_mb = load_stage("Benchmarks/startup.py").peak_rss_mb
+    if stage == "direct-google":
+        import_direct_google()
+
+    workdir = tempfile.mkdtemp(prefix="slides-bench-")
+    cwd = os.getcwd()
+    samples = []
+    try:
+        os.chdir(workdir)  # relative cache files (translation_cache.jsonl, legacy JSON) land here
+        with contextlib.redirect_stdout(io.StringIO()):
+            bench = Bench(config, workdir)
+            run = STAGES[stage](bench)
+            rss_before = peak_rss_mb()
+            for repeat in range(config["repeats"]):
+                run_dir = os.path.join(workdir, f"run{repeat}")
+                os.makedirs(run_dir)
+                os.chdir(run_dir)
+                for name in CACHE_ENTRIES:
+                    registry.unload(name)
+                samples.extend(run())
+        rss = peak_rss_mb()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    segments = sum(bench.segments.values()) * config["repeats"]
+    total = sum(samples)
+    return {
+        "stage": stage,
+        "decks": len(bench.segments),
+        "segments": sum(bench.segments.values()),
+        "samples": len(samples),
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+        "total_s": round(total, 4),
+        "segments_per_s": round(segments / total, 1) if total else None,
+        "peak_rss_before_mb": rss_before and round(rss_before, 1),
+        "peak_rss_mb": rss and round(rss, 1),
+    }
+
+
+def run_child(stage, config):
+    """Measure one stage in a fresh interpreter."""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", stage, "--config", json.dumps(config)],
+        capture_output=True, text=True, encoding="utf-8", cwd=os.getcwd(),
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return {"stage": stage, "error": (completed.stderr or completed.stdout).strip()[-2000:]}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Print the p50 and segments/s change of each stage against an earlier report."""
+    before = {row["stage"]: row for row in baseline.get("stages", []) if "error" not in row}
+    print(f"\nAgainst {baseline.get('commit') or 'baseline'} ({baseline.get('created', '?')}):")
+    for row in report["stages"]:
+        old = before.get(row["stage"])
+        if "error" in row or old is None:
+            continue
+        p50 = (row["p50_ms"] / old["p50_ms"] - 1) * 100 if old["p50_ms"] else 0.0
+        rate = (row["segments_per_s"] / old["segments_per_s"] - 1) * 100 if old["segments_per_s"] else 0.0
+        print(f"{row['stage']:>25}: p50 {p50:+.1f}%, segments/s {rate:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("stages", nargs="*", help=f"stages to measure (default: {', '.join(STAGES)})")
+    parser.add_argument("--decks", type=int, default=DEFAULTS["decks"])
+    parser.add_argument("--slides", type=int, default=DEFAULTS["slides"], help="slides per deck")
+    parser.add_argument("--bullets", type=int, default=DEFAULTS["bullets"], help="mean paragraphs per content box")
+    parser.add_argument("--words", type=int, default=DEFAULTS["words"], help="mean words per line")
+    parser.add_argument("--repeat", type=float, default=DEFAULTS["repeat"],
+                        help="share of lines repeated across the course")
+    parser.add_argument("--seed", type=int, default=DEFAULTS["seed"])
+    parser.add_argument("--repeats", type=int, default=DEFAULTS["repeats"], help="cold runs per stage")
+    parser.add_argument("--latency", type=float, default=DEFAULTS["latency"],
+                        help="milliseconds added to every fake translator request")
+    parser.add_argument("--template", help="template deck for append_slides_from_json2 (a .pptx uses the headless path)")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        try:
+            result = measure(args.child, json.loads(args.config))
+        except Exception:
+            result = {"stage": args.child, "error": traceback.format_exc()[-2000:]}
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    config = {name: getattr(args, name) for name in DEFAULTS}
+    config["latency"] = args.latency / 1000
+    config["template"] = args.template and os.path.abspath(args.template)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "stages": [],
+    }
+    print(f"{'stage':>25} {'p50 ms':>9} {'p95 ms':>9} {'seg/s':>10} {'RSS MB':>8}")
+    for stage in args.stages or STAGES:
+        row = run_child(stage, config)
+        report["stages"].append(row)
+        if "error" in row:
+            print(f"{stage:>25}: failed\n{row['error']}")
+            continue
+        print(f"{stage:>25} {row['p50_ms']:>9} {row['p95_ms']:>9} {str(row['segments_per_s']):>10} "
+              f"{str(row['peak_rss_mb']):>8}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Startup cost of each translation engine: import time, time to the first
+translation and peak RSS, each measured in a fresh interpreter.
+
+    python Benchmarks/startup.py                      # every engine, one cache-missing text
+    python Benchmarks/startup.py nllb --text "Agile"  # one engine, a given text
+    python Benchmarks/startup.py --output startup.json
+
+With a cached text the first translation should not load the model or
+build the API client; "engine_loaded" in the report says whether it did.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# engine -> (script, registry entry holding the model/client, how to translate one text)
+ENGINES = {
+    "nllb": (".directTrans/script_ai_nllb.py", "nllb", lambda module, text: module.translate_text(text)),
+    "gemini": (".directTrans/script_ai_gemini.py", "gemini",
+               lambda module, text: module.translate_segments_with_gemini([text])[0]),
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, None if it cannot be read."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def measure(engine, text):
+    """Run inside the child interpreter: import the script, translate `text` once."""
+    from common import registry
+    from common.streaming import load_stage
+
+    script, entry, translate = ENGINES[engine]
+    start = time.perf_counter()
+    module = load_stage(script)
+    import_s = time.perf_counter() - start
+    rss_after_import = peak_rss_mb()
+
+    start = time.perf_counter()
+    result = translate(module, text)
+    first_s = time.perf_counter() - start
+    rss = peak_rss_mb()
+
+    return {
+        "engine": engine,
+        "import_s": round(import_s, 4),
+        "first_translation_s": round(first_s, 4),
+        "engine_loaded": registry.is_loaded(entry),
+        "peak_rss_after_import_mb": rss_after_import and round(rss_after_import, 1),
+        "peak_rss_mb": rss and round(rss, 1),
+        "translated": bool(result),
+    }
+
+
+def run_child(engine, text):
+    """Measure one engine in a fresh interpreter so nothing is preloaded."""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", engine, "--text", text],
+        capture_output=True, text=True, encoding="utf-8", cwd=os.getcwd(),
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return {"engine": engine, "error": (completed.stderr or completed.stdout).strip()[-2000:]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("engines", nargs="*", help=f"engines to measure (default: {', '.join(ENGINES)})")
+    parser.add_argument("--text", default="Introduction to the Unit and an Overview of Agile")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.text), ensure_ascii=False))
+        return
+
+    unknown = set(args.engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"unknown engine(s): {', '.join(sorted(unknown))}")
+
+    report = [run_child(engine, args.text) for engine in args.engines or ENGINES]
+    for row in report:
+        if "error" in row:
+            print(f"{row['engine']:>8}: failed\n{row['error']}")
+            continue
+        print(f"{row['engine']:>8}: import {row['import_s']:.2f}s, first translation {row['first_translation_s']:.2f}s"
+              f" (engine loaded: {row['engine_loaded']}), peak RSS {row['peak_rss_mb']} MB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Synthetic decks shaped like the AD Topic lectures, for benchmarks.
+
+A deck is {path: [[shape text, ...], ...]} in the form common.fake_powerpoint
+takes: a title slide ("Agile Development" / "Topic N: \\r<name>"), a
+coverage slide, body slides with a title box and a content box of
+\\r-separated paragraphs (some with \\v line breaks), image credits on some
+slides and a closing "Any Questions?". The defaults follow the bundled
+decks: 16-31 slides, ~5-6 words per line, about a quarter of the lines
+repeated across the course. Everything is drawn from a seeded RNG, so the
+same arguments always give the same corpus.
+"""
+import random
+
+VOCABULARY = (
+    "agile", "development", "project", "team", "requirements", "business", "solution", "delivery",
+    "iterative", "incremental", "timebox", "workshop", "facilitator", "stakeholder", "prioritisation",
+    "modelling", "prototype", "feedback", "quality", "testing", "planning", "estimation", "risk",
+    "lifecycle", "foundations", "feasibility", "deployment", "evolutionary", "governance", "roles",
+    "responsibilities", "principles", "practices", "techniques", "value", "customer", "users",
+    "collaboration", "communication", "control", "change", "scope", "cost", "time", "sprint",
+    "backlog", "review", "retrospective", "increment", "release", "product", "owner", "coach",
+    "the", "of", "and", "to", "a", "in", "for", "is", "on", "with", "by", "are", "as", "each",
+)
+TOPIC_NAMES = (
+    "Introduction to the Unit and an Overview of Agile", "Requirements and User Stories", "Modelling",
+    "Facilitated Workshops", "MoSCoW Prioritisation", "Timeboxing", "Iterative Development",
+    "Estimating and Measurement", "Planning and Control", "Quality and Testing", "Roles and Responsibilities",
+    "Agile at Scale",
+)
+# Lines the real decks repeat on many slides and in every topic
+BOILERPLATE = (
+    "Source: Image from pixabay.com © 2016", "Source: Image from dsdm.org © 2016",
+    "© DSDM Consortium 2016", "Points to consider are:", "This topic will cover:",
+)
+
+
+def sentence(rng, words):
+    count = max(1, int(rng.gauss(words, words / 2)))
+    text = " ".join(rng.choice(VOCABULARY) for _ in range(count))
+    return text[0].upper() + text[1:]
+
+
+def synthetic_deck(topic, slides=24, bullets=4, words=6, repeat=0.25, seed=0):
+    """[[shape text, ...], ...] for one deck; `repeat` is the share of lines taken from a shared pool."""
+    rng = random.Random(f"{seed}:{topic}")
+    shared = random.Random(seed)  # the same pool of repeated lines for every deck
+    pool = list(BOILERPLATE) + [sentence(shared, words) for _ in range(40)]
+
+    def line():
+        return rng.choice(pool) if rng.random() < repeat else sentence(rng, words)
+
+    name = TOPIC_NAMES[(topic - 1) % len(TOPIC_NAMES)]
+    deck = [
+        ["Agile Development", f"Topic {topic}: \r{name}"],
+        [f"Topic {topic} Coverage", "This topic will cover:\r" + "\r".join(line() for _ in range(bullets))],
+    ]
+    for _ in range(max(0, slides - 3)):
+        paragraphs = []
+        for _ in range(max(1, int(rng.gauss(bullets, bullets / 2)))):
+            paragraph = line()
+            if rng.random() < 0.1:
+                paragraph += "\x0b" + line()  # soft line break inside a bullet
+            paragraphs.append(paragraph)
+        shapes = [sentence(rng, words), "\r".join(paragraphs)]
+        if rng.random() < 0.3:
+            shapes.append(rng.choice(BOILERPLATE[:2]))
+        if rng.random() < 0.2:
+            shapes.append(None)  # a picture: no text frame
+        deck.append(shapes)
+    deck.append(["Any Questions?", ""])
+    return deck[:slides] if slides < 3 else deck
+
+
+def synthetic_corpus(decks=12, slides=24, bullets=4, words=6, repeat=0.25, seed=0, extension=".ppt"):
+    """{file name: deck} for a course of `decks` topics."""
+    return {
+        f"Synthetic Topic {topic}{extension}": synthetic_deck(topic, slides, bullets, words, repeat, seed)
+        for topic in range(1, decks + 1)
+    }
+
+
+def deck_segments(deck):
+    """Number of non-empty lines (paragraphs split at \\v) in a deck: the work unit of every stage."""
+    return sum(
+        1
+        for shapes in deck for text in shapes if text
+        for paragraph in text.split("\r") for line in paragraph.split("\x0b") if line.strip()
+    )
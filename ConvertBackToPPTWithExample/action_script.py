@@ -1,173 +1,263 @@
 import os
+import sys
 import json
-import win32com.client
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import ooxml
+from common.folder_runner import run_folder
+from common.instrumentation import count, span, traced
+from common.manifest import Manifest, hash_file
+from common.powerpoint import count_calls, init_worker_pool, open_powerpoint, pool_scope
+from common.pptx_template import load_template
+
+# Per-deck COM call counts, written next to the generated decks
+COM_CALLS_NAME = "com_calls.json"
 
 def append_slides_from_json(template_path, json_path, output_path):
     """
     Reads .ppt template, appends slides according to JSON, 
     and outputs new .ppt with only the JSON slides.
     First and last slides use special layouts, the rest use master layout.
+    Starts (and quits) a PowerPoint session of its own.
     """
-    ppt = win32com.client.Dispatch("PowerPoint.Application")
-    ppt.Visible = True  # Make visible to avoid SaveAs errors with .ppt
-
-    # Open template
-    presentation = ppt.Presentations.Open(template_path, WithWindow=True)
-
+    return append_slides_from_json2(template_path, json_path, output_path)
+
+def iter_with_last(items):
+    """Yield (item, is_last) from any iterable, looking one item ahead."""
+    iterator = iter(items)
+    try:
+        previous = next(iterator)
+    except StopIteration:
+        return
+    for item in iterator:
+        yield previous, False
+        previous = item
+    yield previous, True
+
+
+def append_slides_from_json2(template_path, json_path, output_path, pool=None):
     # Load JSON
     with open(json_path, "r", encoding="utf-8") as f:
         slides_data = json.load(f)
 
-    slide_keys = list(slides_data.keys())
-    total_slides = len(slide_keys)
+    return build_slides_from_template(template_path, slides_data.values(), output_path, pool=pool)
 
-    # Remember template slides
-    first_slide_template = presentation.Slides(1)
-    master_slide_template = presentation.Slides(2)
-    last_slide_template = presentation.Slides(presentation.Slides.Count)
 
-    # Keep track of the insertion index
-    current_index = 1  # start after template slides (or 1 if template will be deleted)
+def text_boxes(slide):
+    """1-based indexes of the first two shapes with a text frame (title, content)."""
+    boxes = []
+    for index, shape in enumerate(slide.Shapes, start=1):
+        if shape.HasTextFrame:
+            boxes.append(index)
+            if len(boxes) == 2:
+                break
+    return boxes
 
-    # Duplicate slides in order
-    for idx, slide_key in enumerate(slide_keys):
-        slide_info = slides_data[slide_key]
-        title_text = slide_info.get("Title", "")
-        contents = slide_info.get("Contents", [])
 
-        # Choose template
-        if idx == 0:
-            base_slide = first_slide_template
-        elif idx == total_slides - 1:
-            base_slide = last_slide_template
-        else:
-            base_slide = master_slide_template
-
-        # Duplicate template slide at the end
-        dup_slide = base_slide.Duplicate()[0]
-
-        # Move duplicated slide to correct position
-        dup_slide.MoveTo(current_index)
-        current_index += 1  # next slide goes after this one
-
-        # Fill placeholders: first text box = title, second = content
-        title_filled = False
-        content_filled = False
-        for shape in dup_slide.Shapes:
-            if shape.HasTextFrame:
-                text_range = shape.TextFrame.TextRange
-                if not title_filled:
-                    text_range.Text = title_text
-                    title_filled = True
-                    continue
-                if not content_filled:
-                    text_range.Text = ""  # clear default content
-                    for line in contents:
-                        text_range.InsertAfter(line + "\r")
-                    content_filled = True
-
-    # Save as .ppt
-    if output_path.lower().endswith(".ppt"):
-        pp_format = 1  # PPT 97-2003
-    elif output_path.lower().endswith(".pptx"):
-        pp_format = 12  # OpenXML
-    else:
-        raise ValueError("Output path must end with .ppt or .pptx")
-
-    presentation.SaveAs(output_path, FileFormat=pp_format)
-    presentation.Close()
-    ppt.Quit()
-    print(f"Created PPT → {output_path}")
-
-    # Delete old template slides AFTER remembering them
-    for slide in reversed([first_slide_template, master_slide_template, last_slide_template]): slide.Delete()
-
-def append_slides_from_json2(template_path, json_path, output_path):
-    ppt = win32com.client.Dispatch("PowerPoint.Application")
-    ppt.Visible = True  # visible avoids some SaveAs .ppt issues
-
-    # Open template
-    presentation = ppt.Presentations.Open(template_path, WithWindow=True)
+def fill_slide(slide, boxes, title_text, contents):
+    """
+    Title into the first text box, content into the second: each box gets
+    its whole text in one assignment (paragraphs joined with \r) instead
+    of one InsertAfter call per content line. `boxes` comes from
+    text_boxes() of the template the slide was copied from, so copies are
+    not walked shape by shape again.
+    """
+    shapes = slide.Shapes
+    for index, text in zip(boxes, (title_text, "\r".join(contents))):
+        shapes(index).TextFrame.TextRange.Text = text
 
-    # Load JSON
-    with open(json_path, "r", encoding="utf-8") as f:
-        slides_data = json.load(f)
 
-    slide_keys = list(slides_data.keys())
-    total_slides = len(slide_keys)
+def in_place_layout(first_template, master_template, last_template):
+    """
+    True when the first, master and last templates are three slides in
+    that order: then a duplicate, which lands right after its source, is
+    already where the deck needs it. In a 1- or 2-slide template one slide
+    plays two parts (the last slide is also the master) and it is not.
+    """
+    return first_template.SlideIndex < master_template.SlideIndex < last_template.SlideIndex
 
-    # Remember template slides
-    first_slide_template = presentation.Slides(1)
-    master_slide_template = presentation.Slides(2)
-    last_slide_template = presentation.Slides(presentation.Slides.Count)
 
-    current_index = 1
+def duplicate_to_end(presentation, template):
+    """A copy of `template` moved to the end of the deck."""
+    copy = template.Duplicate()[0]
+    copy.MoveTo(presentation.Slides.Count)
+    return copy
 
-    # Duplicate slides in order
-    for idx, slide_key in enumerate(slide_keys):
-        slide_info = slides_data[slide_key]
-        title_text = slide_info.get("Title", "")
-        contents = slide_info.get("Contents", [])
 
-        # Select base template
-        if idx == 0:
-            base_slide = first_slide_template
-        elif idx == total_slides - 1:
-            base_slide = last_slide_template
+def duplicate_in_order(presentation, first_template, master_template, last_template, count):
+    """
+    Copies of the template slides for a deck of `count` slides, already in
+    final order, without MoveTo. A duplicate lands right after its source,
+    so the first copy sits before the master template, the body copies
+    grow as one block right after it (doubled with Slides.Range(...)
+    .Duplicate(), log2(count) calls) and the last copy follows the last
+    template. Templates without that layout (see in_place_layout) get one
+    Duplicate and MoveTo per slide instead. Returns the copies in deck order.
+    """
+    if not count:
+        return []
+    if not in_place_layout(first_template, master_template, last_template):
+        templates = [first_template] + [master_template] * (count - 2) + ([last_template] if count > 1 else [])
+        return [duplicate_to_end(presentation, template) for template in templates]
+    copies = [first_template.Duplicate()[0]]
+    body = count - 2
+    if body > 0:
+        start = master_template.SlideIndex + 1
+        master_template.Duplicate()
+        made = 1
+        while made < body:
+            batch = min(made, body - made)
+            presentation.Slides.Range(list(range(start, start + batch))).Duplicate()
+            made += batch
+        copies.extend(presentation.Slides.Range(list(range(start, start + body))))
+    if count > 1:
+        copies.append(last_template.Duplicate()[0])
+    return copies
+
+
+@traced("build", file="output_path")
+def build_slides_from_template(template_path, slides, output_path, pool=None):
+    """
+    Fill a copy of the template with `slides`, any iterable of
+    {"Title": ..., "Contents": [...]} dicts. Sized inputs (lists, dict
+    values) are duplicated in bulk up front; other iterables are consumed
+    one slide at a time, so a streaming producer can still be translating
+    later slides. Returns the number of COM calls made for the deck.
+
+    With a .pptx template and a .pptx output the template slides are cloned
+    directly in the zip (common.pptx_template): no PowerPoint, no COM calls.
+    """
+    if ooxml.is_pptx(template_path) and ooxml.is_pptx(output_path):
+        load_template(template_path).build(slides, output_path)
+        print(f"Created PPTX → {output_path}")
+        return 0
+
+    # Reuse a pooled PowerPoint session when mass-generating decks
+    with open_powerpoint(pool) as ppt:
+        ppt, counter = count_calls(ppt)
+        ppt.Visible = True  # visible avoids some SaveAs .ppt issues
+
+        # Open template
+        with span("open", file=template_path):
+            presentation = ppt.Presentations.Open(template_path, WithWindow=True)
+
+        # Remember template slides
+        first_slide_template = presentation.Slides(1)
+        master_slide_template = presentation.Slides(2)
+        last_slide_template = presentation.Slides(presentation.Slides.Count)
+
+        # Text boxes of each template, found once and reused for all its copies
+        boxes = {
+            "first": text_boxes(first_slide_template),
+            "master": text_boxes(master_slide_template),
+            "last": text_boxes(last_slide_template),
+        }
+
+        if hasattr(slides, "__len__"):
+            slides = list(slides)
+            copies = duplicate_in_order(presentation, first_slide_template, master_slide_template,
+                                        last_slide_template, len(slides))
+            for idx, (dup_slide, slide_info) in enumerate(zip(copies, slides)):
+                kind = "first" if idx == 0 else "last" if idx == len(slides) - 1 else "master"
+                fill_slide(dup_slide, boxes[kind], slide_info.get("Title", ""), slide_info.get("Contents", []))
         else:
-            base_slide = master_slide_template
-
-        # Duplicate and move to current index
-        dup_slide = base_slide.Duplicate()[0]
-        dup_slide.MoveTo(current_index)
-        current_index += 1
-
-        # Fill title and content
-        title_filled = False
-        content_filled = False
-        for shape in dup_slide.Shapes:
-            if shape.HasTextFrame:
-                text_range = shape.TextFrame.TextRange
-                if not title_filled:
-                    text_range.Text = title_text
-                    title_filled = True
-                    continue
-                if not content_filled:
-                    text_range.Text = ""
-                    for line in contents:
-                        text_range.InsertAfter(line + "\r")
-                    content_filled = True
-
-    # Delete original template slides in reverse order
-    for i in sorted([first_slide_template.SlideIndex, 
-                     master_slide_template.SlideIndex, 
-                     last_slide_template.SlideIndex], reverse=True):
-        if i <= presentation.Slides.Count:
+            # Streaming: each body slide duplicates the previous one, so it
+            # lands in place; both boxes are overwritten anyway. Templates
+            # that share slides move every copy to the end instead.
+            in_place = in_place_layout(first_slide_template, master_slide_template, last_slide_template)
+            previous_body = None
+            for idx, (slide_info, is_last) in enumerate(iter_with_last(slides)):
+                if idx == 0:
+                    kind, template = "first", first_slide_template
+                elif is_last:
+                    kind, template = "last", last_slide_template
+                else:
+                    kind, template = "master", (in_place and previous_body) or master_slide_template
+                dup_slide = template.Duplicate()[0] if in_place else duplicate_to_end(presentation, template)
+                if kind == "master":
+                    previous_body = dup_slide
+                fill_slide(dup_slide, boxes[kind], slide_info.get("Title", ""), slide_info.get("Contents", []))
+
+        # Delete original template slides (in reverse order) before saving
+        for i in sorted({first_slide_template.SlideIndex,
+                         master_slide_template.SlideIndex,
+                         last_slide_template.SlideIndex}, reverse=True):
             presentation.Slides(i).Delete()
 
-    # Save presentation
-    if output_path.lower().endswith(".ppt"):
-        pp_format = 1  # PPT 97-2003
-    else:
-        pp_format = 12  # PPTX
-
-    presentation.SaveAs(output_path, FileFormat=pp_format)
-    presentation.Close()
-    ppt.Quit()
-    print(f"Created PPT → {output_path}")
+        # Save presentation
+        if output_path.lower().endswith(".ppt"):
+            pp_format = 1  # PPT 97-2003
+        else:
+            pp_format = 12  # PPTX
+
+        with span("save", file=output_path):
+            presentation.SaveAs(output_path, FileFormat=pp_format)
+        presentation.Close()
+    count("com_calls", counter.calls)
+    print(f"Created PPT → {output_path} ({counter.calls} COM calls)")
+    return counter.calls
+
+
+def record_com_calls(output_folder, calls):
+    """Merge {output file: COM calls} into com_calls.json of the output folder."""
+    path = os.path.join(output_folder, COM_CALLS_NAME)
+    recorded = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            recorded = json.load(f)
+    recorded.update(calls)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(recorded, f, indent=1, sort_keys=True)
+
+
+def save_template_as_pptx(template_path, output_path, pool=None):
+    """One-off: save the .ppt template as .pptx (needs PowerPoint) for the headless generator."""
+    with open_powerpoint(pool) as ppt:
+        presentation = ppt.Presentations.Open(os.path.abspath(template_path), WithWindow=False)
+        presentation.SaveAs(os.path.abspath(output_path), FileFormat=24)  # ppSaveAsOpenXMLPresentation
+        presentation.Close()
+    print(f"Saved template → {output_path}")
+
+
+def mass_append_slides_from_json(template_path, json_folder, output_folder, pool=None, workers=1, timeout=None, force=False):
+    os.makedirs(output_folder, exist_ok=True)
+    # Editing the template rebuilds every deck
+    config = {"stage": "json-to-ppt", "template": hash_file(template_path)}
+    manifest = Manifest(output_folder)
+
+    # A .pptx template is filled headlessly and gives .pptx decks
+    extension = ".pptx" if ooxml.is_pptx(template_path) else ".ppt"
+    outputs = []
+    for json_file in os.listdir(json_folder):
+        if json_file.lower().endswith(".json"):
+            json_path = os.path.join(json_folder, json_file)
+            output_name = os.path.splitext(json_file)[0] + "_generated" + extension
+            outputs.append((json_path, os.path.join(output_folder, output_name)))
+
+    # JSON files unchanged since the last run are skipped
+    outputs = manifest.pending(outputs, config, force)
+
+    if workers > 1:
+        jobs = [(template_path, json_path, output_path) for json_path, output_path in outputs]
+        results = run_folder(append_slides_from_json2, jobs, workers=workers, timeout=timeout,
+                             initializer=init_worker_pool, labels=[os.path.basename(j) for j, _ in outputs])
+        manifest.record_results(outputs, results, config)
+        record_com_calls(output_folder, {os.path.basename(output_path): result.value
+                                         for (_, output_path), result in zip(outputs, results) if result.ok})
+        return results
+
+    with pool_scope(pool) as pool:
+        for json_path, output_path in outputs:
+            calls = append_slides_from_json2(template_path, json_path, output_path, pool=pool)
+            manifest.record(json_path, output_path, config)
+            manifest.save()
+            record_com_calls(output_folder, {os.path.basename(output_path): calls})
 
 
 if __name__ == "__main__":
+    # Point this at a .pptx copy of the template (save_template_as_pptx) to build without PowerPoint
     TEMPLATE_PPT = r"C:\Users\caoli\PycharmProjects\SlideConverter\Template\base_template.ppt"
     JSON_FOLDER = r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertTxtToJson\AD-Json"
     OUTPUT_FOLDER = r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertBackToPPTWithExample\JSON_to_PPT"
 
-    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-    for json_file in os.listdir(JSON_FOLDER):
-        if json_file.lower().endswith(".json"):
-            json_path = os.path.join(JSON_FOLDER, json_file)
-            output_name = os.path.splitext(json_file)[0] + "_generated.ppt"
-            output_path = os.path.join(OUTPUT_FOLDER, output_name)
-
-            append_slides_from_json2(TEMPLATE_PPT, json_path, output_path)
+    mass_append_slides_from_json(TEMPLATE_PPT, JSON_FOLDER, OUTPUT_FOLDER)
@@ -1,79 +1,161 @@
 import os
-from deep_translator import GoogleTranslator
+import re
+import sys
 
-def translate_file(input_path, output_path, target_lang="vi"):
-    # Read original text
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.dedup import DedupPlan
+from common.google_translate import GoogleTranslateDriver, MODEL_NAME
+from common.instrumentation import traced
+from common.manifest import Manifest, slide_hashes, split_txt_slides, translatable_text
+from common.translation_cache import open_cache
+
+
+def render_line(line, translations):
+    """Rebuild one line with its translation, keeping the 'Title:' / '- ' prefixes."""
+    text = translatable_text(line)
+    translated = translations.get(text) or text
+
+    if line.startswith("Slide ") or line.startswith("Contents:"):
+        return line
+    if line.startswith("Title:"):
+        return f"Title: {translated}"
+    if line.startswith("- "):
+        return f"- {translated}"
+    return translated
+
+
+def untranslated(lines, translations):
+    """The distinct translatable lines that have no translation (kept in the source language)."""
+    return {text for text in map(translatable_text, lines) if text and not translations.get(text)}
+
+
+def split_physical_lines(text):
+    # A TXT file read in text mode splits on \r, \n and \r\n alike
+    return re.split(r"\r\n|\r|\n", text)
+
+
+def slide_texts(slide):
+    """Every line of a slide record ({"slide_number", "title", "content"}) that gets translated."""
+    texts = []
+    for item in [slide["title"]] + list(slide["content"]):
+        texts.extend(line.strip() for line in split_physical_lines(item))
+    return [text for text in texts if text]
+
+
+def translate_slide(slide, translations):
+    """
+    Translated copy of a slide record, line by line as translate_file does
+    for the TXT form of the same slide.
+    """
+    def translate(item):
+        return "\n".join(
+            translations.get(line.strip()) or line.strip()
+            for line in split_physical_lines(item)
+        )
+
+    return {
+        "slide_number": slide["slide_number"],
+        "title": translate(slide["title"]),
+        "content": [translate(item) for item in slide["content"]],
+    }
+
+
+def make_driver(target_lang="vi"):
+    # Translations are shared with the other engines through the append-only cache
+    cache = open_cache().view("auto", target_lang, MODEL_NAME)
+    return GoogleTranslateDriver(source="auto", target=target_lang, cache=cache)
+
+
+@traced("read_txt", file="input_path")
+def read_lines(input_path):
     with open(input_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    translated_lines = []
-    for line in lines:
-        line = line.rstrip("\n")  # keep indentation but remove trailing newline
-
-        # Keep structural slide lines as is
-        if line.startswith("Slide ") or line.startswith("Contents:"):
-            translated_lines.append(line)
-
-        elif line.startswith("Title:"):
-            # Translate title text but keep "Title:" prefix
-            title_text = line[len("Title:"):].strip()
-            if title_text:
-                try:
-                    translated_title = GoogleTranslator(source='auto', target=target_lang).translate(title_text)
-                    if translated_title is None:
-                        translated_title = title_text
-                except Exception as e:
-                    print(f"Warning: failed to translate title '{title_text}': {e}")
-                    translated_title = title_text
-            else:
-                translated_title = ""
-            translated_lines.append(f"Title: {translated_title}")
-
-        elif line.startswith("- "):
-            # Translate content after "- "
-            content = line[2:].strip()
-            if content:
-                try:
-                    translated = GoogleTranslator(source='auto', target=target_lang).translate(content)
-                    if translated is None:
-                        translated = content
-                except Exception as e:
-                    print(f"Warning: failed to translate line '{content}': {e}")
-                    translated = content
-            else:
-                translated = content
-            translated_lines.append(f"- {translated}")
-
-        else:
-            # Translate any other non-empty line normally
-            if line.strip():
-                try:
-                    translated = GoogleTranslator(source='auto', target=target_lang).translate(line.strip())
-                    if translated is None:
-                        translated = line.strip()
-                except Exception as e:
-                    print(f"Warning: failed to translate line '{line.strip()}': {e}")
-                    translated = line.strip()
-                translated_lines.append(translated)
-            else:
-                translated_lines.append("")
+        return [line.rstrip("\n") for line in f]  # keep indentation but remove trailing newline
 
-    # Save translated file
+
+@traced("write_txt", file="output_path")
+def write_lines(output_path, lines):
     with open(output_path, "w", encoding="utf-8") as f:
-        for tline in translated_lines:
+        for tline in lines:
             f.write(tline + "\n")
 
 
-def mass_translate(input_folder, output_folder):
+@traced("translate_file", file="input_path")
+def translate_file(input_path, output_path, target_lang="vi", translations=None):
+    """
+    Translate one TXT file. Lines that could not be translated keep the
+    source text; returns True only when every line was translated.
+    """
+    # Read original text
+    lines = read_lines(input_path)
+
+    # Translate every distinct line of the file concurrently, unless the
+    # caller already translated them (mass_translate does it once per folder)
+    if translations is None:
+        with make_driver(target_lang) as driver:
+            translations = driver.translate_many(translatable_text(line) for line in lines)
+
+    translated_lines = [render_line(line, translations) for line in lines]
+
+    # Save translated file
+    write_lines(output_path, translated_lines)
+
+    missing = untranslated(lines, translations)
+    if missing:
+        print(f"⚠️ {len(missing)} line(s) of {output_path} left untranslated")
+    return not missing
+
+
+def mass_translate(input_folder, output_folder, target_lang="vi", force=False):
     os.makedirs(output_folder, exist_ok=True)
 
-    for file in os.listdir(input_folder):
-        if file.lower().endswith(".txt"):
-            input_path = os.path.join(input_folder, file)
-            output_path = os.path.join(output_folder, file)
-            print(f"Translating: {input_path}")
-            translate_file(input_path, output_path)
-            print(f"Saved → {output_path}")
+    # Files unchanged since the last run are skipped; in changed files,
+    # slides whose text is unchanged are copied from the previous output
+    config = {"engine": MODEL_NAME, "source": "auto", "target": target_lang}
+    manifest = Manifest(output_folder)
+    files = [file for file in os.listdir(input_folder) if file.lower().endswith(".txt")]
+    jobs = [(os.path.join(input_folder, file), os.path.join(output_folder, file)) for file in files]
+    jobs = manifest.pending(jobs, config, force)
+    if not jobs:
+        return
+
+    plans = {}
+    for input_path, output_path in jobs:
+        blocks = split_txt_slides(read_lines(input_path))
+        reused = [None] * len(blocks) if force else manifest.reuse_slides(input_path, output_path, config, blocks)
+        plans[input_path] = list(zip(blocks, reused))
+
+    # Dedupe lines of the remaining slides across the whole folder and translate each one once
+    dedup = DedupPlan()
+    for input_path, plan in plans.items():
+        dedup.add(input_path, [
+            (translatable_text(line), slide)
+            for slide, (block, previous) in enumerate(plan, start=1) if previous is None
+            for line in block if translatable_text(line)
+        ])
+    print(dedup.summary())
+    dedup.save(output_folder)
+    reused_count = sum(previous is not None for plan in plans.values() for _, previous in plan)
+    with make_driver(target_lang) as driver:
+        translations = driver.translate_many(dedup.segments)
+    print(f"Translated {len(dedup.segments)} unique lines, reused {reused_count} unchanged slides")
+
+    # Reassemble each file in its original order. A file with lines left
+    # untranslated (e.g. the service was down) is written but not recorded,
+    # so the next run translates it again.
+    for input_path, output_path in jobs:
+        print(f"Translating: {input_path}")
+        plan = plans[input_path]
+        lines = []
+        for block, previous in plan:
+            lines.extend(previous if previous is not None else (render_line(line, translations) for line in block))
+        write_lines(output_path, lines)
+        missing = untranslated([line for block, previous in plan if previous is None for line in block], translations)
+        if missing:
+            print(f"⚠️ {len(missing)} line(s) left untranslated, {output_path} will be retried next run")
+            continue
+        manifest.record(input_path, output_path, config, slides=slide_hashes([block for block, _ in plan]))
+        manifest.save()
+        print(f"Saved → {output_path}")
 
 
 if __name__ == "__main__":
@@ -1,105 +1,119 @@
 import os
-import time
+import sys
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.folder_runner import run_folder
+from common.instrumentation import traced
+from common.manifest import Manifest, translatable_text
+from common.rate_limit import shared_limiter
+from common.translation_cache import open_cache
+from common.translators import Capabilities, TranslationCore, Translator
+
 # --- CẤU HÌNH GEMINI CLIENT VÀ CACHE ---
 # Tải biến môi trường (ví dụ: GEMINI_API_KEY từ tệp .env)
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Endpoint REST thay thế, ví dụ stand-in cục bộ (common.standin_servers) khi chạy offline
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
 # print(f"Key loaded: {bool(os.getenv('GEMINI_API_KEY'))}")
+MODEL_NAME = "gemini-1.5-flash"
+# Quota của API key (ghi đè bằng GEMINI_RPM / GEMINI_TPM); bộ giới hạn tự giảm tốc khi gặp 429
+REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_RPM", "15"))
+TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TPM", "1000000"))
 
 try:
     # Khởi tạo Gemini Client
-    genai.configure(api_key=GEMINI_API_KEY)
+    if GEMINI_API_ENDPOINT:
+        genai.configure(api_key=GEMINI_API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+    else:
+        genai.configure(api_key=GEMINI_API_KEY)
     CLIENT = genai.Client()
-    MODEL_NAME = "gemini-1.5-flash"
 except Exception as e:
     print(f"❌ Lỗi khi khởi tạo Gemini Client: {e}")
     CLIENT = None # Đặt CLIENT thành None nếu thất bại
 
+# Cache append-only dùng chung với các engine trong .directTrans
+CACHE_STORE = open_cache()
+
 # --- HÀM DỊCH BẰNG GEMINI ---
-def ai_translate_text(text, target_lang="vi", retries=3):
+class GeminiFlashEngine(Translator):
+    """Gemini 1.5 Flash, mỗi request một dòng; nhịp gửi do bộ giới hạn theo quota quyết định."""
+    name = MODEL_NAME
+    capabilities = Capabilities(max_batch_size=1, concurrency=4, retries=2, backoff=1.0)
+    rate_limiter = shared_limiter(MODEL_NAME, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+
+    def available(self):
+        return CLIENT is not None
+
+    def translate_batch(self, segments, src, tgt):
+        return [self.translate_line(text, tgt) for text in segments]
+
+    def translate_line(self, text, target_lang):
+        prompt = (
+            f"Translate the following text to {target_lang} "
+            f"without adding extra text, explanations, or prefixes (like 'Title:' or '- '): \n\n{text}"
+        )
+        response = CLIENT.models.generate_content(
+            model=MODEL_NAME,
+            contents=prompt,
+            generation_config={"temperature": 0}
+        )
+        # Kết quả rỗng được coi là thất bại và gửi lại
+        return response.text.strip() or None
+
+
+def translate_texts(texts, target_lang="vi"):
+    """{dòng: bản dịch} cho các dòng dịch được; cache và translation memory được tra trước."""
+    cache = CACHE_STORE.view("en", target_lang, MODEL_NAME)
+    return TranslationCore(GeminiFlashEngine(), "en", target_lang, cache=cache).translate(texts)
+
+
+def ai_translate_text(text, target_lang="vi"):
     """
-    Dịch một đoạn văn bản bằng Gemini 1.5 Flash.
+    Dịch một đoạn văn bản bằng Gemini 1.5 Flash (trả về bản gốc nếu thất bại).
     """
-    if CLIENT is None:
-        print("❌ Gemini Client chưa được khởi tạo. Bỏ qua dịch.")
-        return text
-    
     # Bỏ qua nếu văn bản rỗng
     if not text.strip():
         return text
-
-    for attempt in range(retries):
-        try:
-            prompt = (
-                f"Translate the following text to {target_lang} "
-                f"without adding extra text, explanations, or prefixes (like 'Title:' or '- '): \n\n{text}"
-            )
-
-            response = CLIENT.models.generate_content(
-                model=MODEL_NAME,
-                contents=prompt,
-                generation_config={"temperature": 0}
-            )
-            
-            translated = response.text.strip()
-            
-            # Đảm bảo kết quả không rỗng
-            if translated:
-                return translated
-            
-        except Exception as e:
-            print(f"⚠️ Dịch thất bại (thử {attempt+1}/{retries}) cho '{text[:50]}...': {e}")
-            time.sleep(1) # Chờ một chút trước khi thử lại
-
-    print(f"❌ Thất bại hoàn toàn khi dịch, trả về bản gốc: {text}")
-    return text
+    return translate_texts([text], target_lang).get(text.strip(), text)
 
 # --- LOGIC DỊCH FILE ---
+@traced("translate_file", file="input_path")
 def translate_file(input_path, output_path, target_lang="vi"):
     """
-    Dịch một tệp văn bản dòng theo dòng, giữ lại cấu trúc slide.
+    Dịch một tệp văn bản, giữ lại cấu trúc slide. Các dòng của cả tệp
+    được gửi cùng lúc (mỗi dòng duy nhất một lần) rồi ghép lại theo thứ tự.
+    Trả về True khi mọi dòng đều đã được dịch.
     """
     print(f"📄 Đang dịch: {os.path.basename(input_path)}")
     
     with open(input_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+        lines = [line.rstrip("\n") for line in f]  # Giữ lại khoảng trắng đầu dòng nhưng loại bỏ xuống dòng
+
+    translations = translate_texts([translatable_text(line) for line in lines], target_lang)
 
     translated_lines = []
-    
+    missing = 0
     for line in lines:
-        line = line.rstrip("\n")  # Giữ lại khoảng trắng đầu dòng nhưng loại bỏ xuống dòng
-        original_text = line.strip()
-
-        # Giữ nguyên các dòng cấu trúc và dòng trống
-        if line.startswith("Slide ") or line.startswith("Contents:") or not original_text:
+        text = translatable_text(line)
+        if not text:
             translated_lines.append(line)
             continue
-        
-        # Xử lý các dòng Title
+
+        translated = translations.get(text)
+        if translated is None:
+            print(f"❌ Thất bại hoàn toàn khi dịch, trả về bản gốc: {text}")
+            translated = text
+            missing += 1
+
+        # Thêm lại prefix "Title: " / "- "
         if line.startswith("Title:"):
-            # Lấy văn bản tiêu đề (loại bỏ "Title:")
-            title_text = line[len("Title:"):].strip()
-            # Dịch
-            translated_title = ai_translate_text(title_text, target_lang)
-            # Thêm lại prefix "Title: "
-            translated_lines.append(f"Title: {translated_title}")
-            
-        # Xử lý các dòng nội dung có dấu gạch ngang
+            translated_lines.append(f"Title: {translated}")
         elif line.startswith("- "):
-            # Lấy nội dung (loại bỏ "- ")
-            content_text = line[2:].strip()
-            # Dịch
-            translated_content = ai_translate_text(content_text, target_lang)
-            # Thêm lại prefix "- "
-            translated_lines.append(f"- {translated_content}")
-
-        # Xử lý các dòng nội dung khác
+            translated_lines.append(f"- {translated}")
         else:
-            # Dịch dòng
-            translated = ai_translate_text(line.strip(), target_lang)
             translated_lines.append(translated)
 
     # Lưu file đã dịch
@@ -108,8 +122,11 @@ def translate_file(input_path, output_path, target_lang="vi"):
         for tline in translated_lines:
             f.write(tline + "\n")
 
+    # Tệp còn dòng chưa dịch (ví dụ API tạm lỗi) sẽ được dịch lại ở lần chạy sau
+    return missing == 0
+
 # --- LOGIC DỊCH HÀNG LOẠT ---
-def mass_translate(input_folder, output_folder):
+def mass_translate(input_folder, output_folder, workers=1, timeout=None, force=False):
     os.makedirs(output_folder, exist_ok=True)
 
     txt_files = [f for f in os.listdir(input_folder) if f.lower().endswith(".txt")]
@@ -117,11 +134,25 @@ def mass_translate(input_folder, output_folder):
         print("⚠️ Không tìm thấy tệp .txt nào trong thư mục đầu vào.")
         return
 
-    for file in txt_files:
-        input_path = os.path.join(input_folder, file)
-        output_path = os.path.join(output_folder, file)
-        
-        translate_file(input_path, output_path)
+    # Bỏ qua các tệp không đổi kể từ lần chạy trước; trong tệp đã đổi,
+    # các dòng cũ được lấy từ cache nên chỉ dòng mới được gửi tới Gemini
+    config = {"engine": MODEL_NAME, "target": "vi"}
+    manifest = Manifest(output_folder)
+    jobs = [(os.path.join(input_folder, f), os.path.join(output_folder, f)) for f in txt_files]
+    jobs = manifest.pending(jobs, config, force)
+
+    # Chia các tệp cho nhiều tiến trình (mỗi tiến trình có Gemini client riêng)
+    if workers > 1:
+        results = run_folder(translate_file, jobs, workers=workers, timeout=timeout)
+        manifest.record_results(jobs, results, config)
+        return results
+
+    for input_path, output_path in jobs:
+        if not translate_file(input_path, output_path):
+            print(f"⚠️ Còn dòng chưa dịch, {output_path} sẽ được dịch lại ở lần chạy sau\n")
+            continue
+        manifest.record(input_path, output_path, config)
+        manifest.save()
         print(f"✅ Đã lưu → {output_path}\n")
 
 # --- CHẠY CHÍNH ---
@@ -1,42 +1,72 @@
 import os
-import win32com.client
-
-def extract_lines_from_ppt(input_path):
-    powerpoint = win32com.client.Dispatch("PowerPoint.Application")
-    # powerpoint.Visible = 0
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import ppt_binary
+from common.folder_runner import run_folder
+from common.instrumentation import span, traced
+from common.manifest import Manifest
+from common.powerpoint import init_worker_pool, open_application, pool_scope
+
+def text_lines(text):
+    """The non-empty lines of a shape's text, stripped."""
+    return [line.strip() for line in text.strip().split("\n") if line.strip()]
+
+MSO_GROUP = 6
+
+def text_frame_shapes(shapes):
+    """Shapes with a text frame, in z-order; a group's items stand in for the group, as ppt_binary reads them."""
+    for shape in shapes:
+        if getattr(shape, "Type", None) == MSO_GROUP:
+            yield from text_frame_shapes(shape.GroupItems)
+        elif shape.HasTextFrame:
+            yield shape
+
+def slide_entry(idx, all_lines):
+    return {
+        "slide_number": idx,
+        "title": all_lines[0] if all_lines else "",    # First line becomes the title
+        "content": all_lines[1:]                       # Rest go into contents
+    }
+
+def extract_lines_from_binary_ppt(input_path):
+    """extract_lines_from_ppt() of a binary .ppt, read natively (no PowerPoint)."""
+    slides_data = []
+    for idx, texts in enumerate(ppt_binary.slide_texts(input_path), start=1):
+        slides_data.append(slide_entry(idx, [line for text in texts for line in text_lines(text)]))
+    return slides_data
 
+@traced("extract", file="input_path")
+def extract_lines_from_ppt(input_path, pool=None):
+    # .pptx is read straight from the zip and .ppt from its binary records;
+    # PowerPoint (leased from `pool` when given, so mass runs don't relaunch
+    # it per file) only opens the decks the native reader cannot parse
     input_path = os.path.abspath(input_path)
-    presentation = powerpoint.Presentations.Open(input_path, WithWindow=False)
 
-    slides_data = []
+    if ppt_binary.is_ppt(input_path) and ppt_binary.is_compound_file(input_path):
+        try:
+            with span("read_binary", file=input_path):
+                return extract_lines_from_binary_ppt(input_path)
+        except ppt_binary.PptFormatError as e:
+            print(f"⚠️ {os.path.basename(input_path)}: {e}, opening it in PowerPoint")
+
+    with open_application(input_path, pool=pool) as powerpoint:
+        # powerpoint.Visible = 0
+        with span("open", file=input_path):
+            presentation = powerpoint.Presentations.Open(input_path, WithWindow=False)
 
-    for idx, slide in enumerate(presentation.Slides, start=1):
-        title = None
-        content = []
-
-        # Collect all lines in order
-        all_lines = []
-        for shape in slide.Shapes:
-            if shape.HasTextFrame:
-                text = shape.TextFrame.TextRange.Text.strip()
-                if text:
-                    for line in text.split("\n"):
-                        line = line.strip()
-                        if line:
-                            all_lines.append(line)
-
-        if all_lines:
-            title = all_lines[0]            # First line becomes the title
-            content = all_lines[1:]         # Rest go into contents
-
-        slides_data.append({
-            "slide_number": idx,
-            "title": title if title else "",
-            "content": content
-        })
-
-    presentation.Close()
-    powerpoint.Quit()
+        slides_data = []
+
+        for idx, slide in enumerate(presentation.Slides, start=1):
+            # Collect all lines in order
+            all_lines = []
+            with span("slide", slide=idx):
+                for shape in text_frame_shapes(slide.Shapes):
+                    all_lines.extend(text_lines(shape.TextFrame.TextRange.Text))
+
+            slides_data.append(slide_entry(idx, all_lines))
+
+        presentation.Close()
     return slides_data
 
     # lines = []
@@ -61,32 +91,56 @@ def save_lines_to_txt(lines, output_path):
         for line in lines:
             f.write(line + "\n")
 
+def format_slide_txt(slide):
+    lines = [f"Slide {slide['slide_number']}:\n", f"Title: {slide['title']}\n", "Contents:\n"]
+    for line in slide['content']:
+        lines.append(f"- {line}\n")
+    lines.append("\n")  # blank line between slides
+    return "".join(lines)
+
+@traced("write_txt", file="output_path")
 def save_slide_txt(slides_data, output_path):
     with open(output_path, "w", encoding="utf-8") as f:
         for slide in slides_data:
-            f.write(f"Slide {slide['slide_number']}:\n")
-            f.write(f"Title: {slide['title']}\n")
-            f.write("Contents:\n")
-            for line in slide['content']:
-                f.write(f"- {line}\n")
-            f.write("\n")  # blank line between slides
-
-def mass_convert(input_folder, output_folder):
+            f.write(format_slide_txt(slide))
+
+def convert_file(input_path, output_path, pool=None):
+    print(f"Reading: {input_path}")
+
+    lines = extract_lines_from_ppt(input_path, pool=pool)
+
+    # save_lines_to_txt(lines, output_path)
+    save_slide_txt(lines, output_path)
+    print(f"Saved → {output_path}")
+
+# Recorded in the output folder manifest; bump when the TXT format changes
+MANIFEST_CONFIG = {"stage": "pptx-to-txt"}
+
+def mass_convert(input_folder, output_folder, pool=None, workers=1, timeout=None, force=False):
     os.makedirs(output_folder, exist_ok=True)
+    manifest = Manifest(output_folder)
 
+    jobs = []
     for file in os.listdir(input_folder):
         if file.lower().endswith((".ppt", ".pptx")):
             input_path = os.path.join(input_folder, file)
-            print(f"Reading: {input_path}")
-
-            lines = extract_lines_from_ppt(input_path)
-
             output_name = os.path.splitext(file)[0] + ".txt"
-            output_path = os.path.join(output_folder, output_name)
-
-            # save_lines_to_txt(lines, output_path)
-            save_slide_txt(lines, output_path)
-            print(f"Saved → {output_path}")
+            jobs.append((input_path, os.path.join(output_folder, output_name)))
+
+    # Decks unchanged since the last run are skipped
+    jobs = manifest.pending(jobs, MANIFEST_CONFIG, force)
+
+    # Fan files out to worker processes, each with its own PowerPoint session
+    if workers > 1:
+        results = run_folder(convert_file, jobs, workers=workers, timeout=timeout, initializer=init_worker_pool)
+        manifest.record_results(jobs, results, MANIFEST_CONFIG)
+        return results
+
+    with pool_scope(pool) as pool:
+        for input_path, output_path in jobs:
+            convert_file(input_path, output_path, pool=pool)
+            manifest.record(input_path, output_path, MANIFEST_CONFIG)
+            manifest.save()
 
 if __name__ == "__main__":
     INPUT = r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertPPTXToTXT\AD-ppt"
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.slidepack import EXTENSION, SlidePack, deck_from_files, write_pack
+
+def pack_folder(input_folder, output_path, target_folder=None):
+    """
+    Pack every TXT/JSON file of a folder into one slide pack. With
+    `target_folder`, the file of the same name there (the translation) fills
+    the target column of each deck.
+    """
+    decks = []
+    for file in sorted(os.listdir(input_folder)):
+        if not file.lower().endswith((".txt", ".json")):
+            continue
+        target_path = os.path.join(target_folder, file) if target_folder else None
+        deck = deck_from_files(file, os.path.join(input_folder, file),
+                               target_path if target_path and os.path.exists(target_path) else None)
+        if target_path and "target" not in deck["layouts"]:
+            print(f"Warning: {file}: the translation has different slides/paragraphs, target column left empty")
+        decks.append(deck)
+    write_pack(output_path, decks)
+    rows = sum(len(deck["rows"]) for deck in decks)
+    print(f"Packed {len(decks)} files ({rows} paragraphs) → {output_path}")
+
+def unpack_folder(pack_path, output_folder, column="source"):
+    """Write the decks of a pack back as the TXT/JSON files they came from."""
+    os.makedirs(output_folder, exist_ok=True)
+    with SlidePack(pack_path) as pack:
+        for name, deck in pack.decks.items():
+            if column not in deck["layouts"]:
+                print(f"Skipping {name}: no {column} text in the pack")
+                continue
+            output_path = os.path.join(output_folder, name)
+            with open(output_path, "w", encoding="utf-8", newline="") as f:
+                f.write(pack.render(name, column))
+            print(f"Saved → {output_path}")
+
+def load_library(pack_path):
+    """{file: [(slide number, title, [content rows])]} of every deck, with the load time."""
+    start = time.perf_counter()
+    with SlidePack(pack_path) as pack:
+        library = {name: pack.slides(name) for name in pack.decks}
+    print(f"Loaded {len(library)} decks from {pack_path} in {time.perf_counter() - start:.4f}s")
+    return library
+
+if __name__ == "__main__":
+    TXT_FOLDER = r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertEngToVN\AD-ppt-vn"
+    VN_FOLDER = r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertEngToVN\AD-ppt-vn-2"
+    PACK = r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertSlidePack\AD" + EXTENSION
+
+    pack_folder(TXT_FOLDER, PACK, target_folder=VN_FOLDER)
+    unpack_folder(PACK, r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertSlidePack\AD-txt-roundtrip")
@@ -1,6 +1,14 @@
 import os
+import re
+import sys
 import json
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.folder_runner import run_folder
+from common.instrumentation import traced
+from common.manifest import Manifest
+
+@traced("txt_to_json", file="input_path")
 def convert_txt_to_json(input_path):
     slides_dict = {}
     with open(input_path, "r", encoding="utf-8") as f:
@@ -46,21 +54,62 @@ def convert_txt_to_json(input_path):
 
     return slides_dict
 
+def split_physical_lines(text):
+    # Reading a TXT file in text mode splits on \r, \n and \r\n alike
+    return re.split(r"\r\n|\r|\n", text)
+
+def slides_to_json(slides):
+    """
+    In-memory equivalent of save_slide_txt + convert_txt_to_json for a
+    stream of slide records ({"slide_number", "title", "content"}): yields
+    ("Slide N", {"Title", "Contents"}) pairs exactly as the TXT round-trip
+    would produce them.
+    """
+    for slide_num, slide in enumerate(slides, start=1):
+        title = split_physical_lines(slide["title"])[0].strip()
+        content_lines = [
+            line.strip()
+            for item in slide["content"]
+            for line in split_physical_lines(item)
+        ]
+        content_lines.append("")  # blank separator line is read as content
+        yield f"Slide {slide_num}", {"Title": title, "Contents": content_lines}
+
+@traced("write_json", file="output_path")
 def save_json(data, output_path):
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
-def mass_convert_txt_to_json(input_folder, output_folder):
+def convert_file(input_path, output_path):
+    print(f"Processing: {input_path}")
+    slides_data = convert_txt_to_json(input_path)
+    save_json(slides_data, output_path)
+    print(f"Saved → {output_path}")
+
+# Recorded in the output folder manifest; bump when the JSON layout changes
+MANIFEST_CONFIG = {"stage": "txt-to-json"}
+
+def mass_convert_txt_to_json(input_folder, output_folder, workers=1, timeout=None, force=False):
     os.makedirs(output_folder, exist_ok=True)
+    manifest = Manifest(output_folder)
+    jobs = []
     for file in os.listdir(input_folder):
         if file.lower().endswith(".txt"):
             input_path = os.path.join(input_folder, file)
-            print(f"Processing: {input_path}")
-            slides_data = convert_txt_to_json(input_path)
             output_name = os.path.splitext(file)[0] + ".json"
-            output_path = os.path.join(output_folder, output_name)
-            save_json(slides_data, output_path)
-            print(f"Saved → {output_path}")
+            jobs.append((input_path, os.path.join(output_folder, output_name)))
+
+    jobs = manifest.pending(jobs, MANIFEST_CONFIG, force)
+
+    if workers > 1:
+        results = run_folder(convert_file, jobs, workers=workers, timeout=timeout)
+        manifest.record_results(jobs, results, MANIFEST_CONFIG)
+        return results
+
+    for input_path, output_path in jobs:
+        convert_file(input_path, output_path)
+        manifest.record(input_path, output_path, MANIFEST_CONFIG)
+        manifest.save()
 
 if __name__ == "__main__":
     INPUT_FOLDER = r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertEngToVN\AD-ppt-vn"
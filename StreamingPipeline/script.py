@@ -0,0 +1,100 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.powerpoint import pool_scope
+from common.streaming import background, load_stage
+
+# The four legacy stages, used here without their intermediate files
+extract_stage = load_stage("ConvertPPTXToTXT/script.py")
+translate_stage = load_stage("ConvertEngToVN/script.py")
+json_stage = load_stage("ConvertTxtToJson/script.py")
+build_stage = load_stage("ConvertBackToPPTWithExample/action_script.py")
+
+
+# ---------------- STAGES ----------------
+def translate_slides(slides, driver):
+    """Translate slide records one slide at a time (lines of a slide go out concurrently)."""
+    for slide in slides:
+        translations = driver.translate_many(translate_stage.slide_texts(slide))
+        yield translate_stage.translate_slide(slide, translations)
+
+
+# ---------------- AUDIT TAPS ----------------
+def txt_tap(slides, output_path):
+    """Pass slide records through, writing them in the AD-txt / AD-ppt-vn format."""
+    with open(output_path, "w", encoding="utf-8") as f:
+        for slide in slides:
+            f.write(extract_stage.format_slide_txt(slide))
+            yield slide
+
+
+def json_tap(json_slides, output_path):
+    """Pass ("Slide N", data) pairs through, saving them in the AD-Json format at the end."""
+    data = {}
+    for key, slide in json_slides:
+        data[key] = slide
+        yield key, slide
+    json_stage.save_json(data, output_path)
+
+
+# ---------------- RUNNER ----------------
+def run_pipeline(input_path, template_path, output_path, driver, pool=None,
+                 txt_path=None, vn_txt_path=None, json_path=None, buffer_size=4):
+    """
+    PPT → TXT → VN → JSON → PPT for one deck with in-memory slide records.
+    Translation runs on a background thread, so slide N is being filled in
+    PowerPoint while slide N+1 is still being translated. The *_path
+    arguments optionally write the legacy intermediate files for auditing.
+    """
+    slides = extract_stage.extract_lines_from_ppt(input_path, pool=pool)
+    if txt_path:
+        slides = txt_tap(slides, txt_path)
+
+    translated = translate_slides(slides, driver)
+    if vn_txt_path:
+        translated = txt_tap(translated, vn_txt_path)
+    translated = background(translated, buffer_size)
+
+    json_slides = json_stage.slides_to_json(translated)
+    if json_path:
+        json_slides = json_tap(json_slides, json_path)
+
+    build_stage.build_slides_from_template(
+        template_path, (slide for _, slide in json_slides), output_path, pool=pool
+    )
+
+
+def mass_run_pipeline(input_folder, template_path, output_folder, audit_folder=None, target_lang="vi", pool=None):
+    os.makedirs(output_folder, exist_ok=True)
+    if audit_folder:
+        for sub in ("AD-txt", "AD-ppt-vn", "AD-Json"):
+            os.makedirs(os.path.join(audit_folder, sub), exist_ok=True)
+
+    with pool_scope(pool) as pool, translate_stage.make_driver(target_lang) as driver:
+        for file in os.listdir(input_folder):
+            if not file.lower().endswith((".ppt", ".pptx")):
+                continue
+            input_path = os.path.join(input_folder, file)
+            base = os.path.splitext(file)[0]
+            output_path = os.path.join(output_folder, base + "_generated" + os.path.splitext(template_path)[1])
+
+            audit = {}
+            if audit_folder:
+                audit = {
+                    "txt_path": os.path.join(audit_folder, "AD-txt", base + ".txt"),
+                    "vn_txt_path": os.path.join(audit_folder, "AD-ppt-vn", base + ".txt"),
+                    "json_path": os.path.join(audit_folder, "AD-Json", base + ".json"),
+                }
+
+            print(f"Processing: {input_path}")
+            run_pipeline(input_path, template_path, output_path, driver, pool=pool, **audit)
+
+
+if __name__ == "__main__":
+    INPUT_FOLDER = r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertPPTXToTXT\AD-ppt"
+    TEMPLATE_PPT = r"C:\Users\caoli\PycharmProjects\SlideConverter\Template\base_template.ppt"
+    OUTPUT_FOLDER = r"C:\Users\caoli\PycharmProjects\SlideConverter\ConvertBackToPPTWithExample\JSON_to_PPT"
+    AUDIT_FOLDER = None  # e.g. r"...\StreamingPipeline\audit" to also write AD-txt / AD-ppt-vn / AD-Json
+
+    mass_run_pipeline(INPUT_FOLDER, TEMPLATE_PPT, OUTPUT_FOLDER, AUDIT_FOLDER)
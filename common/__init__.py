@@ -0,0 +1 @@
+"""Shared helpers used by the slide conversion and translation scripts."""
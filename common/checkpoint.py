@@ -0,0 +1,149 @@
+"""
+Durable checkpoint of an interrupted mass_translate_ppt run.
+
+The manifest already skips the decks a run has written. What a crash loses
+on top of that is the work done for the decks still pending: the segments
+read from every deck for the dedup plan, and the translations of the
+segments that never reach the shared cache (translation-memory hits, runs
+without a cache). The checkpoint keeps both in a JSON-lines journal in the
+output folder (.checkpoint.jsonl), appended and fsync'ed as the run goes:
+
+    {"extracted": "Topic 9.pptx", "input": {"stat", "hash"}, "occurrences": [[segment, slide], ...]}
+    {"m": model, "t": target, "k": segment, "v": translation}
+
+    with Checkpoint(output_folder, config) as checkpoint:
+        plan = plan_decks(paths, pool, checkpoint=checkpoint)
+        ...translate and write the decks...
+        checkpoint.finish()
+
+A rerun with the same config reads a deck's segments from the journal
+instead of opening it in PowerPoint (unless the deck changed since), and
+while the checkpoint is open every TranslationCore of the process answers
+from it before the engine and journals what it gets, round by round. A
+torn last line from a crash is ignored. finish() deletes the journal once
+every deck is written with all its segments translated: a deck that kept
+source text after an engine error leaves the journal in place, and the
+resume sends only its missing segments again. A journal left by another
+config is discarded.
+"""
+import os
+import json
+import threading
+
+from common.manifest import fingerprint, unchanged
+
+CHECKPOINT_NAME = ".checkpoint.jsonl"
+
+_active = None  # the Checkpoint of the run in progress, consulted by TranslationCore
+
+
+def active():
+    """The open Checkpoint of this process, None outside a checkpointed run."""
+    return _active
+
+
+class Checkpoint:
+    def __init__(self, folder, config, name=CHECKPOINT_NAME):
+        self.path = os.path.join(folder, name)
+        self.config = json.loads(json.dumps(config, sort_keys=True))  # as it reads back from the journal
+        self.extracted = {}  # deck name -> {"input", "occurrences"}
+        self.translations = {}  # (model, target, segment) -> translation
+        self._pending = []
+        self._lock = threading.Lock()
+        if self._load():
+            print(f"Resuming from {self.path}: {len(self.extracted)} deck(s) read, "
+                  f"{len(self.translations)} translation(s) kept")
+        else:
+            self._append({"config": self.config})
+            self.flush()
+
+    @staticmethod
+    def key(input_path):
+        return os.path.basename(input_path)
+
+    # ---------------- LOAD ----------------
+    def _load(self):
+        """Read a journal left by an interrupted run of the same config; False if there is none."""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            records = []
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # torn line from an interrupted write
+        if not records or records[0].get("config") != self.config:
+            print(f"⚠️ Discarding {self.path}: left by a run with another config.")
+            os.remove(self.path)
+            return False
+        for record in records[1:]:
+            if "extracted" in record:
+                self.extracted[record["extracted"]] = record
+            elif "k" in record:
+                self.translations[(record["m"], record["t"], record["k"])] = record["v"]
+        return True
+
+    # ---------------- DECKS ----------------
+    def occurrences(self, input_path):
+        """The (segment, slide) occurrences journaled for a deck, None if it was not read or changed since."""
+        record = self.extracted.get(self.key(input_path))
+        if record is None or not unchanged(input_path, record["input"]):
+            return None
+        return [tuple(occurrence) for occurrence in record["occurrences"]]
+
+    def record_occurrences(self, input_path, occurrences):
+        record = {"extracted": self.key(input_path), "input": fingerprint(input_path),
+                  "occurrences": [list(occurrence) for occurrence in occurrences]}
+        with self._lock:
+            self.extracted[record["extracted"]] = record
+            self._append(record)
+        self.flush()
+
+    # ---------------- TRANSLATIONS ----------------
+    def get(self, model, target, segment):
+        return self.translations.get((model, target, segment))
+
+    def record_translations(self, model, target, translations):
+        """Journal {segment: translation} results of `model`; call flush() to make them durable."""
+        with self._lock:
+            for segment, translation in translations.items():
+                key = (model, target, segment)
+                if self.translations.get(key) != translation:
+                    self.translations[key] = translation
+                    self._append({"m": model, "t": target, "k": segment, "v": translation})
+
+    # ---------------- FILE ----------------
+    def _append(self, record):
+        self._pending.append(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        """Write pending lines with a single append and fsync them."""
+        with self._lock:
+            if not self._pending:
+                return
+            data = "".join(self._pending).encode("utf-8")
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._pending = []
+
+    def finish(self):
+        """The run is complete: drop the journal."""
+        with self._lock:
+            self._pending = []
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def __enter__(self):
+        global _active
+        _active = self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = None
+        self.flush()  # no-op after finish()
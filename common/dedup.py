@@ -0,0 +1,127 @@
+"""
+Folder-wide deduplication plan for the translation engines.
+
+The course decks repeat many strings verbatim: unit titles, image
+credits, "Any Questions?", agenda headings. Instead of each deck being
+translated on its own, the mass_translate* loops first read every pending
+file, count how often each segment occurs across the folder, send each
+unique segment to the engine exactly once and then hand every file the
+translations of its own segments.
+
+    plan = plan_decks(paths, pool)
+    translations = translate(plan.segments)
+    for path in paths:
+        write(path, plan.for_deck(path, translations))
+
+The plan's report (segment references, unique segments, dedup ratio and
+the most repeated strings) is printed and saved as dedup_plan.json in the
+output folder.
+"""
+import os
+import json
+from collections import Counter
+
+from common import instrumentation
+from common.instrumentation import span
+from common.powerpoint import open_application
+from common.segmenter import deck_paragraphs, segment_occurrences
+
+PLAN_NAME = "dedup_plan.json"
+
+
+class DedupPlan:
+    def __init__(self):
+        self.references = Counter()  # segment -> occurrences across the folder, in first-seen order
+        self.first_slide = {}  # segment -> (file number, slide) where it first occurs
+        self.files = {}  # path -> the file's unique segments, in order
+
+    def add(self, path, occurrences):
+        """Record the (segment, slide) occurrences of one file."""
+        number = len(self.files)
+        segments = []
+        for segment, slide in occurrences:
+            self.references[segment] += 1
+            self.first_slide.setdefault(segment, (number, slide))
+            segments.append(segment)
+        self.files[path] = list(dict.fromkeys(segments))
+
+    @property
+    def segments(self):
+        """Each segment of the folder once."""
+        return list(self.references)
+
+    @property
+    def slides(self):
+        """Slide key of each of `segments`, for engines that keep a slide's segments together."""
+        return [self.first_slide[segment] for segment in self.references]
+
+    @property
+    def total(self):
+        return sum(self.references.values())
+
+    @property
+    def ratio(self):
+        """References per unique segment (1.0: nothing repeats)."""
+        return self.total / len(self.references) if self.references else 1.0
+
+    def for_deck(self, path, translations):
+        """The translations of one file's segments."""
+        return {segment: translations[segment] for segment in self.files[path] if segment in translations}
+
+    def report(self, top=20):
+        return {
+            "files": len(self.files),
+            "references": self.total,
+            "unique": len(self.references),
+            "dedup_ratio": round(self.ratio, 3),
+            "saved": round(1 - len(self.references) / self.total, 3) if self.total else 0.0,
+            "per_file": {os.path.basename(path): len(segments) for path, segments in self.files.items()},
+            "most_repeated": [[segment, count] for segment, count in self.references.most_common(top) if count > 1],
+        }
+
+    def summary(self):
+        saved = 1 - len(self.references) / self.total if self.total else 0.0
+        return (f"Dedup plan: {self.total} segments in {len(self.files)} files, {len(self.references)} unique "
+                f"(ratio {self.ratio:.2f}x, {saved:.0%} fewer to translate)")
+
+    def save(self, folder):
+        path = os.path.join(folder, PLAN_NAME)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+def read_occurrences(input_path, pool=None):
+    """Every (segment, slide) of a deck, as the deck translators segment it."""
+    with open_application(input_path, pool=pool) as app:
+        presentation = app.Presentations.Open(input_path, WithWindow=False)
+        occurrences = segment_occurrences(deck_paragraphs(presentation))
+        presentation.Close()
+    return occurrences
+
+
+def plan_decks(paths, pool=None, checkpoint=None):
+    """
+    DedupPlan of a list of decks, read once each. With a
+    common.checkpoint.Checkpoint, decks read by an interrupted run are taken
+    from it and the others are journaled as soon as they are read.
+    """
+    plan = DedupPlan()
+    resumed = 0
+    with span("plan", files=len(paths)) as attrs:
+        for path in paths:
+            occurrences = checkpoint.occurrences(path) if checkpoint is not None else None
+            if occurrences is None:
+                occurrences = read_occurrences(path, pool=pool)
+                if checkpoint is not None:
+                    checkpoint.record_occurrences(path, occurrences)
+            else:
+                resumed += 1
+            plan.add(path, occurrences)
+        attrs.update(references=plan.total, unique=len(plan.references), resumed=resumed)
+    if resumed:
+        print(f"{resumed}/{len(paths)} decks taken from the checkpoint, not read again")
+    instrumentation.count("plan.references", plan.total)
+    instrumentation.count("plan.unique", len(plan.references))
+    print(plan.summary())
+    return plan
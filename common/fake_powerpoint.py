@@ -0,0 +1,238 @@
+"""
+In-memory stand-in for the PowerPoint COM object model.
+
+Lets the pool and the shape walks run on Linux: decks are given as
+{path: [[shape text, ...], ...]} (one inner list per slide), or read from a
+real .pptx through common.ooxml. Crashes can be injected to exercise the
+pool's recovery path.
+"""
+import os
+
+from common import ooxml
+
+
+class FakeComError(Exception):
+    """Raised where pywintypes.com_error would be (e.g. RPC server unavailable)."""
+
+
+class FakeFont:
+    Bold = Italic = Underline = 0
+    Size = 18
+    Name = "Calibri"
+
+
+class FakeRangeList:
+    def __init__(self, count):
+        self.Count = count
+
+
+class FakeTextRange:
+    def __init__(self, text=""):
+        self.Text = text
+        self.Font = FakeFont()
+
+    def InsertAfter(self, text):
+        self.Text += text
+        return self
+
+    def _spans(self):
+        """(start, end) of each paragraph, the \r mark included as over COM."""
+        spans, start = [], 0
+        for piece in self.Text.split("\r"):
+            end = min(start + len(piece) + 1, len(self.Text))
+            spans.append((start, end))
+            start = end
+        return spans
+
+    def Paragraphs(self, Start=-1, Length=-1):
+        if Start < 1:
+            return FakeRangeList(len(self._spans()))
+        return FakeSubRange(self, *self._spans()[Start - 1])
+
+    Runs = Paragraphs  # plain text: a run can only be as long as its paragraph
+
+
+class FakeSubRange:
+    """A character range of a FakeTextRange (one paragraph, with a single run)."""
+
+    def __init__(self, owner, start, end):
+        self._owner = owner
+        self._start = start
+        self._end = end
+        self.Font = owner.Font
+
+    @property
+    def Text(self):
+        return self._owner.Text[self._start:self._end]
+
+    @Text.setter
+    def Text(self, value):
+        text = self._owner.Text
+        self._owner.Text = text[:self._start] + value + text[self._end:]
+        self._end = self._start + len(value)
+
+    def Runs(self, Start=-1, Length=-1):
+        return FakeRangeList(1) if Start < 1 else self
+
+
+class FakeTextFrame:
+    def __init__(self, text):
+        self.TextRange = FakeTextRange(text)
+
+    @property
+    def HasText(self):
+        return bool(self.TextRange.Text)
+
+
+class FakeShape:
+    def __init__(self, text=None):
+        self.HasTextFrame = text is not None
+        self.TextFrame = FakeTextFrame(text) if text is not None else None
+
+
+class FakeShapes(list):
+    def __call__(self, index):
+        return self[index - 1]
+
+    @property
+    def Count(self):
+        return len(self)
+
+
+class FakeSlide:
+    def __init__(self, presentation, texts):
+        self._presentation = presentation
+        self.Shapes = FakeShapes(FakeShape(text) for text in texts)
+
+    @property
+    def SlideIndex(self):
+        return self._presentation.Slides.index(self) + 1
+
+    def texts(self):
+        return [shape.TextFrame.TextRange.Text for shape in self.Shapes if shape.HasTextFrame]
+
+    def Duplicate(self):
+        copy = FakeSlide(self._presentation, self.texts())
+        self._presentation.Slides.insert(self.SlideIndex, copy)
+        return [copy]
+
+    def MoveTo(self, index):
+        slides = self._presentation.Slides
+        slides.remove(self)
+        slides.insert(index - 1, self)
+
+    def Delete(self):
+        self._presentation.Slides.remove(self)
+
+
+class FakeSlides(list):
+    def __call__(self, index):
+        return self[index - 1]
+
+    def index(self, slide):
+        for i, item in enumerate(self):
+            if item is slide:
+                return i
+        raise ValueError("slide not in presentation")
+
+    def remove(self, slide):
+        del self[self.index(slide)]
+
+    @property
+    def Count(self):
+        return len(self)
+
+    def Range(self, indexes):
+        return FakeSlideRange([self[i - 1] for i in indexes])
+
+
+class FakeSlideRange(FakeSlides):
+    """Slides.Range([...]): duplicating it inserts the copies after its last slide."""
+
+    def Duplicate(self):
+        slides = self[-1]._presentation.Slides
+        at = slides.index(self[-1]) + 1
+        copies = FakeSlideRange(FakeSlide(slide._presentation, slide.texts()) for slide in self)
+        slides[at:at] = copies
+        return copies
+
+
+class FakePresentation:
+    def __init__(self, app, path, slides):
+        self._app = app
+        self.FullName = path
+        self.Slides = FakeSlides()
+        for texts in slides:
+            self.Slides.append(FakeSlide(self, texts))
+
+    def SaveAs(self, output_path, FileFormat=None):
+        self._app._check()
+        self._app.saved[output_path] = [slide.texts() for slide in self.Slides]
+
+    def Close(self):
+        self._app._check()
+        self._app.Presentations.open.remove(self)
+
+
+class FakePresentations:
+    def __init__(self, app):
+        self._app = app
+        self.open = []
+
+    @property
+    def Count(self):
+        self._app._check()
+        return len(self.open)
+
+    def __call__(self, index):
+        self._app._check()
+        return self.open[index - 1]
+
+    def __iter__(self):
+        self._app._check()
+        return iter(list(self.open))
+
+    def Open(self, path, WithWindow=False, **kwargs):
+        app = self._app
+        app._check()
+        app.opens += 1
+        if app.crash_after is not None and app.opens > app.crash_after:
+            app.crashed = True
+            raise FakeComError("The RPC server is unavailable.")
+        presentation = FakePresentation(app, path, app.load_deck(path))
+        self.open.append(presentation)
+        return presentation
+
+
+class FakeApplication:
+    """Drop-in for win32com.client.Dispatch("PowerPoint.Application")."""
+
+    launches = 0
+
+    def __init__(self, decks=None, crash_after=None):
+        FakeApplication.launches += 1
+        self.decks = decks or {}
+        self.crash_after = crash_after
+        self.crashed = False
+        self.quit = False
+        self.opens = 0
+        self.saved = {}
+        self.Visible = False
+        self.Presentations = FakePresentations(self)
+
+    def _check(self):
+        if self.crashed or self.quit:
+            raise FakeComError("The RPC server is unavailable.")
+
+    def load_deck(self, path):
+        for key in (path, os.path.abspath(path), os.path.basename(path)):
+            if key in self.decks:
+                return self.decks[key]
+        if ooxml.is_pptx(path) and os.path.exists(path):
+            deck = ooxml.Presentation(path)
+            return [[shape.TextFrame.TextRange.Text for shape in slide.Shapes if shape.HasTextFrame]
+                    for slide in deck.Slides]
+        raise FakeComError(f"PowerPoint can't open {path}.")
+
+    def Quit(self):
+        self.quit = True
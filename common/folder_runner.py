@@ -0,0 +1,211 @@
+"""
+Process-pool driver shared by the mass_* entry points.
+
+Files are fanned out to `workers` long-lived processes. Each worker runs the
+optional initializer once (e.g. to load the NLLB model or open its own
+PowerPoint pool) and keeps that state for every file it handles. A file
+running longer than `timeout` seconds gets its worker killed and replaced.
+Progress is printed in input order, followed by a summary of failures.
+
+Functions are sent to the workers as (source file, name) and re-imported
+there by path, so stage scripts that all live in files named script.py
+work with both fork and spawn start methods. The rate limiters of the API
+services are shared with the workers for the run (common.rate_limit), so
+the pool as a whole stays within each quota.
+"""
+import os
+import time
+import queue
+import inspect
+import traceback
+import multiprocessing
+from importlib import util as importlib_util
+
+from common import rate_limit
+
+_MODULES = {}
+
+
+def _ref(func):
+    if not func:
+        return None
+    # The file that defines the function, not that of a decorator (e.g. @traced) wrapping it
+    code = inspect.unwrap(func).__code__
+    return (os.path.abspath(code.co_filename), func.__name__)
+
+
+def _resolve(ref):
+    path, name = ref
+    module = _MODULES.get(path)
+    if module is None:
+        module_name = "folder_runner_" + os.path.splitext(os.path.basename(path))[0] + f"_{len(_MODULES)}"
+        spec = importlib_util.spec_from_file_location(module_name, path)
+        module = importlib_util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _MODULES[path] = module
+    return getattr(module, name)
+
+
+def _worker_main(tasks, results, func_ref, init_ref, initargs):
+    cleanup = None
+    try:
+        if init_ref:
+            cleanup = _resolve(init_ref)(*initargs)
+        func = _resolve(func_ref)
+    except BaseException:
+        results.put(("init-failed", os.getpid(), traceback.format_exc()))
+        return
+    results.put(("ready", os.getpid(), None))
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            index, args = task
+            try:
+                value = func(*args)
+                results.put(("done", os.getpid(), (index, value, None)))
+            except BaseException as e:
+                results.put(("done", os.getpid(), (index, None, f"{type(e).__name__}: {e}")))
+    finally:
+        if callable(cleanup):
+            cleanup()
+
+
+class FolderResult:
+    def __init__(self, label, value=None, error=None, seconds=0.0):
+        self.label = label
+        self.value = value
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def run_folder(func, jobs, workers=None, timeout=None, initializer=None, initargs=(), labels=None, on_result=None):
+    """
+    Call func(*args) for every args tuple in `jobs` across `workers`
+    processes (default: CPU count). Returns one FolderResult per job, in
+    input order. `initializer(*initargs)` runs once per worker and may
+    return a cleanup callable run when the worker exits. A job whose func
+    returns False (e.g. a deck saved with text left untranslated) is not
+    done: it is reported and counted as a failure.
+    """
+    # One request/token quota and one circuit breaker per service for the whole pool
+    with rate_limit.share_state():
+        return _run_folder(func, jobs, workers, timeout, initializer, initargs, labels, on_result)
+
+
+def _run_folder(func, jobs, workers, timeout, initializer, initargs, labels, on_result):
+    jobs = [tuple(args) for args in jobs]
+    labels = labels or [os.path.basename(str(args[0])) if args else str(i) for i, args in enumerate(jobs)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+
+    ctx = multiprocessing.get_context()
+    results = ctx.Queue()
+    pending = list(range(len(jobs)))[::-1]  # popped from the end, in input order
+
+    func_ref, init_ref = _ref(func), _ref(initializer)
+    processes = {}  # pid -> (process, its own task queue)
+    assigned = {}  # pid -> (index, start time)
+
+    def spawn():
+        tasks = ctx.Queue()
+        process = ctx.Process(target=_worker_main, args=(tasks, results, func_ref, init_ref, initargs), daemon=True)
+        process.start()
+        processes[process.pid] = (process, tasks)
+
+    def assign(pid):
+        # Jobs are handed out one at a time by the parent, so it always knows
+        # which file a worker holds even if the worker dies without a word
+        if pending and pid in processes:
+            index = pending.pop()
+            processes[pid][1].put((index, jobs[index]))
+            assigned[pid] = (index, time.monotonic())
+
+    def retire(pid, kill=False):
+        process, tasks = processes.pop(pid)
+        if kill:
+            process.kill()
+        tasks.close()
+        tasks.cancel_join_thread()
+
+    for _ in range(workers):
+        spawn()
+
+    outcomes = [None] * len(jobs)
+    next_report = 0
+    total = len(jobs)
+
+    def finish(index, result):
+        outcomes[index] = result
+        if on_result is not None:
+            on_result(jobs[index], result)
+
+    def report():
+        nonlocal next_report
+        while next_report < total and outcomes[next_report] is not None:
+            result = outcomes[next_report]
+            status = "OK  " if result.ok else "FAIL"
+            print(f"[{next_report + 1}/{total}] {status} {result.label} ({result.seconds:.1f}s)"
+                  + ("" if result.ok else f" - {result.error}"))
+            next_report += 1
+
+    try:
+        while next_report < total:
+            try:
+                kind, pid, payload = results.get(timeout=0.2)
+            except queue.Empty:
+                kind = None
+
+            if kind == "ready":
+                assign(pid)
+            elif kind == "done":
+                index, value, error = payload
+                if error is None and value is False:
+                    error = "incomplete, retried next run"
+                _, start = assigned.pop(pid, (index, time.monotonic()))
+                finish(index, FolderResult(labels[index], value, error, time.monotonic() - start))
+                assign(pid)
+            elif kind == "init-failed":
+                raise RuntimeError(f"worker initializer failed:\n{payload}")
+
+            # Kill and replace workers stuck past the per-file timeout
+            now = time.monotonic()
+            if timeout:
+                for pid, (index, start) in list(assigned.items()):
+                    if now - start > timeout:
+                        retire(pid, kill=True)
+                        del assigned[pid]
+                        finish(index, FolderResult(labels[index], None, f"timed out after {timeout}s", now - start))
+                        if pending:
+                            spawn()
+
+            # Replace workers that died without reporting (crash, OOM kill);
+            # only once the result queue is drained, so no report is pending
+            if kind is None:
+                for pid, (process, _) in list(processes.items()):
+                    if not process.is_alive():
+                        retire(pid)
+                        if pid in assigned:
+                            index, start = assigned.pop(pid)
+                            finish(index, FolderResult(labels[index], None, f"worker exited with code {process.exitcode}", now - start))
+                        if pending:
+                            spawn()
+
+            report()
+    finally:
+        for _, tasks in processes.values():
+            tasks.put(None)
+        for process, _ in processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+
+    failures = [result for result in outcomes if not result.ok]
+    print(f"Done: {total - len(failures)} succeeded, {len(failures)} failed.")
+    for result in failures:
+        print(f"   ✗ {result.label}: {result.error}")
+    return outcomes
@@ -0,0 +1,140 @@
+"""
+Concurrent Google Translate driver.
+
+Speaks the same endpoint as deep_translator.GoogleTranslator
+(GET translate.google.com/m?sl=..&tl=..&q=..), but over one pooled
+requests.Session shared by a bounded thread pool. It is a Translator
+engine (one segment per request); deduplication, the shared cache, the
+translation memory and the retries of 429/5xx answers and network errors
+come from the TranslationCore that translate_many() runs it in, paced by
+the process-wide rate limiter of the service (GOOGLE_TRANSLATE_RPM, no
+quota by default: it then only backs off on 429s).
+"""
+import os
+from html import unescape
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from common import instrumentation
+from common.rate_limit import Throttled, parse_retry_after, shared_limiter
+from common.translators import Capabilities, TranslationCore, Translator
+
+DEFAULT_GOOGLE_TRANSLATE_URL = "https://translate.google.com/m"
+# Set to the local stand-in (common.standin_servers) for offline runs
+GOOGLE_TRANSLATE_URL = os.getenv("GOOGLE_TRANSLATE_URL", DEFAULT_GOOGLE_TRANSLATE_URL)
+MODEL_NAME = "google-translate"
+MAX_CHARS = 5000  # same limit deep_translator enforces
+REQUESTS_PER_MINUTE = int(os.getenv("GOOGLE_TRANSLATE_RPM", "0"))
+
+
+class TranslationError(Exception):
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class _ResultParser(HTMLParser):
+    """Collects the text of <div class="t0"> / <div class="result-container">."""
+
+    CLASSES = ("t0", "result-container")
+
+    def __init__(self):
+        super().__init__()
+        self.depth = 0
+        self.parts = []
+        self.found = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.depth:
+            if tag == "div":
+                self.depth += 1
+        elif tag == "div" and not self.found and dict(attrs).get("class") in self.CLASSES:
+            self.depth = 1
+            self.found = True
+
+    def handle_endtag(self, tag):
+        if self.depth and tag == "div":
+            self.depth -= 1
+
+    def handle_data(self, data):
+        if self.depth:
+            self.parts.append(data)
+
+
+def parse_result(html_text):
+    parser = _ResultParser()
+    parser.feed(html_text)
+    if not parser.found:
+        return None
+    return unescape("".join(parser.parts)).strip()
+
+
+class GoogleTranslateDriver(Translator):
+    name = MODEL_NAME
+
+    def __init__(self, source="auto", target="vi", base_url=None, max_workers=8,
+                 retries=4, backoff=0.5, timeout=15, cache=None, use_memory=True):
+        self.source = source
+        self.target = target
+        self.base_url = base_url or GOOGLE_TRANSLATE_URL
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.use_memory = use_memory
+        self.capabilities = Capabilities(max_batch_size=1, concurrency=max_workers, retries=retries, backoff=backoff)
+        # Shared with the deep_translator path of .directTrans/script.py: one quota per process
+        self.rate_limiter = shared_limiter(MODEL_NAME, REQUESTS_PER_MINUTE)
+
+        # One keep-alive connection per worker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def translate(self, text, source=None, target=None):
+        """Translate one string with one request (retries come from the core)."""
+        text = text.strip()
+        if not text:
+            return text
+        if len(text) > MAX_CHARS:
+            raise TranslationError(f"text longer than {MAX_CHARS} characters", retryable=False)
+
+        params = {"sl": source or self.source, "tl": target or self.target, "q": text}
+        with instrumentation.span("segment", engine=MODEL_NAME, chars=len(text)):
+            response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        if response.status_code == 200:
+            translated = parse_result(response.text)
+            if translated is None:
+                raise TranslationError(f"failed to translate '{text[:50]}': translation not found in response")
+            return translated
+        if response.status_code == 429:
+            raise Throttled(f"failed to translate '{text[:50]}': HTTP 429",
+                            retry_after=parse_retry_after(response.headers.get("Retry-After")))
+        raise TranslationError(f"failed to translate '{text[:50]}': HTTP {response.status_code}",
+                               retryable=response.status_code >= 500)
+
+    def translate_batch(self, segments, src, tgt):
+        return [self.translate(segment, src, tgt) for segment in segments]
+
+    def translate_many(self, texts):
+        """
+        Translate every distinct text once, concurrently.
+        Returns {text: translation}; texts that still fail after the retries
+        are left out, so the caller can keep the source and retry them later.
+        """
+        texts = [text.strip() for text in texts if text and text.strip()]
+        core = TranslationCore(self, self.source, self.target, cache=self.cache, use_memory=self.use_memory)
+        return core.translate(texts)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,280 @@
+"""
+Timing spans and counters for a run, written as a JSON-lines report.
+
+    RUN_REPORT=run.jsonl python .directTrans/script_ai_nllb.py
+    python -m common.instrumentation run.jsonl      # where did the time go?
+
+The scripts wrap their units of work in spans: a file (deck, TXT, JSON),
+a slide of a deck, a segment sent on its own, and the parts that cost
+time inside them (opening/saving over COM, model batches, API requests,
+cache flushes). Spans nest per thread; each one is a line of the report
+with its parent, duration and attributes. Counters add up cache hits and
+misses, retries, tokens sent and characters translated; they are written
+with a per-span summary when the process exits. Worker processes of
+run_folder inherit RUN_REPORT and append to the same file (records carry
+the pid).
+
+Without RUN_REPORT (and RUN_PROFILE) a span is a bare context manager
+and nothing is written. RUN_PROFILE=name[,name...] (or "all") runs cProfile inside
+spans of those names and dumps the aggregated stats to
+profile-<name>-<pid>.prof in RUN_PROFILE_DIR; RUN_PYSPY=out.svg attaches
+`py-spy record` to the process for the whole run.
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import inspect
+import cProfile
+import functools
+import itertools
+import threading
+import subprocess
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+REPORT_PATH = os.getenv("RUN_REPORT")
+PROFILE = {name.strip() for name in os.getenv("RUN_PROFILE", "").split(",") if name.strip()}
+PROFILE_DIR = os.getenv("RUN_PROFILE_DIR", ".")
+PYSPY_OUTPUT = os.getenv("RUN_PYSPY")
+
+_counters = Counter()
+_lock = threading.Lock()
+_local = threading.local()
+_ids = itertools.count(1)
+_report = None
+_profiles = {}
+
+
+class RunReport:
+    """The JSON-lines file of one process, with the running totals of its spans."""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self.totals = defaultdict(lambda: [0, 0.0, 0.0])  # span name -> [count, total s, max s]
+        self.write({"type": "run", "argv": sys.argv, "started": time.time()})
+
+    def write(self, record):
+        record["pid"] = os.getpid()
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with _lock:
+            self.file.write(line)
+
+    def span(self, name, span_id, parent, start, seconds, attrs):
+        with _lock:
+            totals = self.totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+        self.write({"type": "span", "name": name, "id": span_id, "parent": parent,
+                    "start": round(start, 6), "ms": round(seconds * 1000, 3), **attrs})
+
+    def close(self):
+        for name, (count, total, longest) in sorted(self.totals.items()):
+            self.write({"type": "summary", "name": name, "count": count, "total_s": round(total, 4),
+                        "mean_ms": round(total / count * 1000, 3), "max_ms": round(longest * 1000, 3)})
+        self.write({"type": "counters", "counters": dict(_counters)})
+        self.file.close()
+
+
+def start_report(path):
+    """Write the spans and counters of this process to `path` (JSON lines, appended)."""
+    global _report
+    if _report is None:
+        _report = RunReport(path)
+        atexit.register(stop_report)
+    return _report
+
+
+def stop_report():
+    global _report
+    report, _report = _report, None
+    if report is not None:
+        report.close()
+
+
+def enabled():
+    return _report is not None
+
+
+# ---------------- counters ----------------
+def count(name, value=1):
+    """Add `value` to a counter (e.g. "cache.hits", "retries.google")."""
+    if value:
+        with _lock:
+            _counters[name] += value
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+def cache_lookups(engine, hits, misses):
+    count(f"cache.hits.{engine}", hits)
+    count(f"cache.misses.{engine}", misses)
+
+
+def sent(engine, texts, tokens=None):
+    """Record texts about to be translated by `engine`: characters, and tokens when known."""
+    count(f"chars.{engine}", sum(len(text) for text in texts))
+    count(f"segments.{engine}", len(texts))
+    if tokens:
+        count(f"tokens.{engine}", tokens)
+
+
+# ---------------- spans ----------------
+def _profiled(name):
+    return (name in PROFILE or "all" in PROFILE) and not getattr(_local, "profiling", False)
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time the body as a span called `name`. Yields the attribute dict, so
+    the body can add what it only learns on the way (segment counts...).
+    """
+    if _report is None and not PROFILE:
+        yield attrs
+        return
+
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    span_id = next(_ids)
+    parent = stack[-1] if stack else None
+    stack.append(span_id)
+
+    profile = None
+    if _profiled(name):
+        with _lock:
+            profile = _profiles.setdefault(name, cProfile.Profile())
+        _local.profiling = True
+        profile.enable()
+
+    wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        if profile is not None:
+            profile.disable()
+            _local.profiling = False
+        stack.pop()
+        if _report is not None:
+            _report.span(name, span_id, parent, wall, seconds, attrs)
+
+
+def bind(function):
+    """
+    `function` with the caller's current span as the parent of the spans
+    it opens, for work handed to a thread pool (stacks are per thread).
+    """
+    stack = getattr(_local, "stack", None)
+    parent = stack[-1] if stack else None
+    if parent is None:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(parent)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stack.pop()
+    return wrapper
+
+
+def traced(name, **arg_attrs):
+    """
+    Decorator: run the function in a span. `arg_attrs` maps span
+    attributes to parameter names, e.g. @traced("deck", file="input_ppt").
+    """
+    def decorate(function):
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            attrs = {}
+            if arg_attrs:
+                bound = signature.bind_partial(*args, **kwargs).arguments
+                attrs = {attr: bound.get(param) for attr, param in arg_attrs.items()}
+            with span(name, **attrs):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ---------------- profilers ----------------
+def dump_profiles():
+    """Write the cProfile stats gathered in RUN_PROFILE spans."""
+    for name, profile in _profiles.items():
+        path = os.path.join(PROFILE_DIR, f"profile-{name}-{os.getpid()}.prof")
+        profile.dump_stats(path)
+        print(f"cProfile stats of '{name}' spans → {path}")
+
+
+def attach_pyspy(output):
+    """Sample this process with py-spy until it exits (py-spy must be on PATH)."""
+    executable = shutil.which("py-spy")
+    if executable is None:
+        print("Warning: RUN_PYSPY is set but py-spy is not installed.")
+        return None
+    recorder = subprocess.Popen([executable, "record", "--pid", str(os.getpid()), "--output", output],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    atexit.register(recorder.wait, timeout=30)  # py-spy writes the output once the process is gone
+    return recorder
+
+
+if REPORT_PATH:
+    start_report(REPORT_PATH)
+if PROFILE:
+    atexit.register(dump_profiles)
+if PYSPY_OUTPUT:
+    attach_pyspy(PYSPY_OUTPUT)
+
+
+# ---------------- reading a report ----------------
+def summarize(path):
+    """(span totals, counters) of a report, summed over its processes: ({name: [count, total s, max ms]}, {})."""
+    spans = defaultdict(lambda: [0, 0.0, 0.0])
+    totals = Counter()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("type") == "span":
+                row = spans[record["name"]]
+                row[0] += 1
+                row[1] += record["ms"] / 1000
+                row[2] = max(row[2], record["ms"])
+            elif record.get("type") == "counters":
+                totals.update(record["counters"])
+    return dict(spans), dict(totals)
+
+
+def main(path):
+    spans, totals = summarize(path)
+    print(f"{'span':<20} {'count':>7} {'total s':>10} {'mean ms':>10} {'max ms':>10}")
+    for name, (calls, total, longest) in sorted(spans.items(), key=lambda item: -item[1][1]):
+        print(f"{name:<20} {calls:>7} {total:>10.3f} {total / calls * 1000:>10.3f} {longest:>10.3f}")
+    if totals:
+        print()
+        for name, value in sorted(totals.items()):
+            print(f"{name:<30} {value:>12}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else REPORT_PATH or "run.jsonl")
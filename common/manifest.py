@@ -0,0 +1,179 @@
+"""
+Content-hash manifest for incremental folder runs.
+
+Every output folder keeps a `.manifest.json` recording, per input file, the
+hash of its bytes, the hash of the output it produced, the engine/config
+used and optionally one hash per slide. A rerun skips a file whose input,
+output and config are all unchanged; for a changed file the slide hashes
+tell which slides can be reused from the previous output.
+
+Size and mtime are stored next to each hash, so unchanged files are
+recognised without being read again.
+"""
+import os
+import json
+import hashlib
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def split_txt_slides(lines):
+    """Group the lines of an AD-txt style file into per-slide blocks ("Slide N:" starts one)."""
+    blocks = []
+    for line in lines:
+        if line.startswith("Slide ") or not blocks:
+            blocks.append([])
+        blocks[-1].append(line)
+    return blocks
+
+
+def translatable_text(line):
+    """The part of an AD-txt style line that gets translated ("" for structural and empty lines)."""
+    # Keep structural slide lines as is
+    if line.startswith("Slide ") or line.startswith("Contents:"):
+        return ""
+    if line.startswith("Title:"):
+        return line[len("Title:"):].strip()
+    if line.startswith("- "):
+        return line[2:].strip()
+    return line.strip()
+
+
+def slide_hashes(blocks):
+    return [hash_text("\n".join(block)) for block in blocks]
+
+
+def _stat(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def fingerprint(path):
+    """{"stat", "hash"} of a file, as the manifest records it."""
+    return {"stat": _stat(path), "hash": hash_file(path)}
+
+
+def unchanged(path, record):
+    """True if `path` still has the content recorded as {"stat", "hash"}."""
+    if not record or not os.path.exists(path):
+        return False
+    stat = _stat(path)
+    if stat == record.get("stat"):
+        return True
+    if hash_file(path) != record.get("hash"):
+        return False
+    record["stat"] = stat  # touched but identical: remember the new mtime
+    return True
+
+
+def _normalize(config):
+    # Compare configs the way they come back from JSON (tuples become lists)
+    return json.loads(json.dumps(config, sort_keys=True))
+
+
+class Manifest:
+    def __init__(self, folder, name=MANIFEST_NAME):
+        self.path = os.path.join(folder, name)
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.entries = data.get("files", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable manifest {self.path}: {e}")
+
+    @staticmethod
+    def key(input_path):
+        return os.path.basename(input_path)
+
+    def is_current(self, input_path, output_path, config):
+        entry = self.entries.get(self.key(input_path))
+        return (
+            entry is not None
+            and entry.get("config") == _normalize(config)
+            and unchanged(input_path, entry.get("input"))
+            and unchanged(output_path, entry.get("output"))
+        )
+
+    def slides(self, input_path, config):
+        """Slide hashes recorded for the previous output, [] if the config changed."""
+        entry = self.entries.get(self.key(input_path))
+        if not entry or entry.get("config") != _normalize(config):
+            return []
+        return entry.get("slides", [])
+
+    def reuse_slides(self, input_path, output_path, config, blocks):
+        """
+        For each slide block of a changed TXT input, the matching block of
+        the previous output if that slide's text did not change, else None.
+        """
+        hashes = self.slides(input_path, config)
+        reused = [None] * len(blocks)
+        if not hashes or not os.path.exists(output_path):
+            return reused
+        with open(output_path, "r", encoding="utf-8") as f:
+            previous_blocks = split_txt_slides([line.rstrip("\n") for line in f])
+        if len(previous_blocks) != len(hashes):
+            return reused  # output no longer lines up with the recorded slides
+        previous = dict(zip(hashes, previous_blocks))
+        for i, (block, digest) in enumerate(zip(blocks, slide_hashes(blocks))):
+            candidate = previous.get(digest)
+            if candidate is not None and len(candidate) == len(block):
+                reused[i] = candidate
+        return reused
+
+    def record(self, input_path, output_path, config, slides=None):
+        entry = {
+            "config": _normalize(config),
+            "input": fingerprint(input_path),
+            "output": fingerprint(output_path),
+        }
+        if slides is not None:
+            entry["slides"] = list(slides)
+        self.entries[self.key(input_path)] = entry
+
+    def pending(self, jobs, config, force=False):
+        """
+        The (input_path, output_path, ...) jobs that need to run; the rest
+        are reported as unchanged and skipped.
+        """
+        if force:
+            return list(jobs)
+        todo = [job for job in jobs if not self.is_current(job[0], job[1], config)]
+        skipped = len(jobs) - len(todo)
+        if skipped:
+            print(f"Skipping {skipped} unchanged file(s), {len(todo)} to process")
+            self.save()  # keep refreshed mtimes
+        return todo
+
+    def record_results(self, jobs, results, config):
+        """Record the jobs of a run_folder() call that succeeded (and did not return False)."""
+        for job, result in zip(jobs, results):
+            if result.ok and result.value is not False and os.path.exists(job[1]):
+                self.record(job[0], job[1], config)
+        self.save()
+
+    def record_result(self, job, result, config):
+        """record_results() for one job, saved at once: the run_folder() on_result of an interruptible run."""
+        self.record_results([job], [result], config)
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,99 @@
+"""
+Offline mock engines, for load tests without the network or model weights.
+
+    MOCK_TRANSLATOR=echo python .directTrans/script_ai_gemini.py
+    MOCK_TRANSLATOR=glossary.json MOCK_LATENCY_MS=40 MOCK_ERROR_RATE=0.05 python ConvertEngToVN/script.py
+
+With MOCK_TRANSLATOR set, every TranslationCore swaps its engine for a
+DictionaryEngine that keeps the real engine's name and capabilities (batch
+sizes, concurrency, retries, slide grouping, rate limiter), so batching,
+dedup and retry behave as they would against the service. "echo" answers
+"[<target>] <segment>"; a JSON file {source: translation} answers from the
+dictionary and echoes the rest. MOCK_LATENCY_MS delays every batch and
+MOCK_ERROR_RATE makes a share of the batches fail. Unless
+TRANSLATION_CACHE_FILE points at a scratch cache, the mock runs uncached so
+its output never lands in the real cache.
+
+The other mocks sit where the real engines plug in:
+common.standin_servers (local HTTP Google Translate and Gemini, selected
+with GOOGLE_TRANSLATE_URL / GEMINI_API_ENDPOINT) and the "mock" NLLB
+backend of common.nllb_backends (NLLB_BACKEND=mock).
+"""
+import os
+import copy
+import json
+import time
+import random
+import threading
+
+from common.standin_servers import fake_translation
+from common.translators import Translator
+
+MOCK_TRANSLATOR = os.getenv("MOCK_TRANSLATOR")
+MOCK_LATENCY = float(os.getenv("MOCK_LATENCY_MS", "0")) / 1000
+MOCK_ERROR_RATE = float(os.getenv("MOCK_ERROR_RATE", "0"))
+
+_engines = {}  # MOCK_TRANSLATOR value -> DictionaryEngine shared by the cores of the process
+_engines_lock = threading.Lock()
+
+
+class MockEngineError(Exception):
+    pass
+
+
+def load_dictionary(path):
+    """{source: translation} from a JSON object file."""
+    with open(path, "r", encoding="utf-8") as f:
+        dictionary = json.load(f)
+    if not isinstance(dictionary, dict):
+        raise ValueError(f"{path} must hold a JSON object {{source: translation}}")
+    return dictionary
+
+
+class DictionaryEngine(Translator):
+    """
+    Translates from a {source: translation} dictionary; segments it lacks
+    are echoed as "[<target>] <segment>", or left untranslated when `echo`
+    is False. `latency` (seconds per batch) and `error_rate` (share of
+    batches that raise) come from a seeded RNG, so runs are repeatable.
+    """
+    name = "mock-dictionary"
+
+    def __init__(self, translations=None, echo=True, latency=0.0, error_rate=0.0, seed=0):
+        self.translations = dict(translations or {})
+        self.echo = echo
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.batches = 0
+
+    def translate_batch(self, segments, src, tgt):
+        with self.lock:
+            self.batches += 1
+            fail = self.rng.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise MockEngineError("injected failure")
+        return [self.translations.get(segment) or (fake_translation(segment, tgt) if self.echo else None)
+                for segment in segments]
+
+
+def mock_engine(spec=MOCK_TRANSLATOR, latency=MOCK_LATENCY, error_rate=MOCK_ERROR_RATE):
+    """The DictionaryEngine described by a MOCK_TRANSLATOR value ("echo" or a JSON path)."""
+    translations = None if spec == "echo" else load_dictionary(spec)
+    return DictionaryEngine(translations, latency=latency, error_rate=error_rate)
+
+
+def impersonate(translator, spec=MOCK_TRANSLATOR):
+    """A mock engine standing in for `translator`: same name, capabilities and rate limiter."""
+    with _engines_lock:
+        if spec not in _engines:
+            _engines[spec] = mock_engine(spec)
+    # A shallow copy shares the dictionary, RNG and lock of the process-wide engine
+    engine = copy.copy(_engines[spec])
+    engine.name = translator.name
+    engine.capabilities = translator.capabilities
+    engine.rate_limiter = translator.rate_limiter
+    return engine
@@ -0,0 +1,153 @@
+"""
+Inference backends for the NLLB-200 scripts.
+
+    torch        full-precision AutoModelForSeq2SeqLM (the original setup)
+    torch-int8   the same model with int8 dynamic quantization of its Linear
+                 layers; loads the pre-quantized checkpoint written by
+                 .directTrans/convert_nllb.py when `model_path` is given, so
+                 the fp32 weights never have to fit in memory
+    ctranslate2  a CTranslate2 export (int8 by default) written by
+                 convert_nllb.py; the smallest and fastest option on CPU
+    mock         no weights: a tiny NLLB-shaped model for offline load
+                 tests (see MockBackend)
+
+Every backend exposes token_lengths(texts), used for length bucketing, and
+translate(texts), which translates one padded batch. Quantized backends do
+not produce the same text as full precision, so the scripts key their cache
+entries and manifest config by backend and compute type (model_key()).
+"""
+import os
+import time
+
+
+class TorchBackend:
+    name = "torch"
+    compute_type = "float32"
+
+    def __init__(self, model_name, src_lang, tgt_lang, forced_bos_token_id, model_path=None):
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.src_lang = src_lang
+        self.tgt_lang = tgt_lang
+        self.forced_bos_token_id = forced_bos_token_id
+        self.model_path = model_path
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = self._load_model()
+
+    def _load_model(self):
+        from transformers import AutoModelForSeq2SeqLM
+        return AutoModelForSeq2SeqLM.from_pretrained(self.model_path or self.model_name)
+
+    def token_lengths(self, texts):
+        return [len(ids) for ids in self.tokenizer(list(texts))["input_ids"]]
+
+    def translate(self, texts):
+        # Tokenize the whole batch, padded to its longest member
+        inputs = self.tokenizer(list(texts), return_tensors="pt", padding=True)
+
+        # Generate translation, force the target language
+        translated_tokens = self.model.generate(**inputs, forced_bos_token_id=self.forced_bos_token_id)
+        return self.tokenizer.batch_decode(translated_tokens, skip_special_tokens=True)
+
+
+class TorchInt8Backend(TorchBackend):
+    name = "torch-int8"
+    compute_type = "int8"
+
+    def _load_model(self):
+        import torch
+
+        if self.model_path:
+            # Whole quantized module saved by convert_nllb.py
+            model = torch.load(self.model_path, weights_only=False)
+        else:
+            model = quantize_dynamic(super()._load_model())
+        model.eval()
+        return model
+
+
+def quantize_dynamic(model):
+    """int8 weights for every Linear layer; activations are quantized on the fly."""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class CTranslate2Backend(TorchBackend):
+    name = "ctranslate2"
+    compute_type = "int8"
+
+    def _load_model(self):
+        import ctranslate2
+
+        if not self.model_path or not os.path.isdir(self.model_path):
+            raise FileNotFoundError(
+                "The ctranslate2 backend needs a converted model directory "
+                "(python .directTrans/convert_nllb.py --backend ctranslate2)."
+            )
+        return ctranslate2.Translator(self.model_path, device="cpu", compute_type=self.compute_type)
+
+    def translate(self, texts):
+        source = [self.tokenizer.convert_ids_to_tokens(self.tokenizer.encode(text)) for text in texts]
+        results = self.model.translate_batch(source, target_prefix=[[self.tgt_lang]] * len(source))
+        translated = []
+        for result in results:
+            tokens = result.hypotheses[0][1:]  # drop the forced target-language token
+            translated.append(self.tokenizer.decode(self.tokenizer.convert_tokens_to_ids(tokens), skip_special_tokens=True))
+        return translated
+
+
+class MockBackend:
+    """
+    Tiny NLLB-shaped model: whitespace tokens (plus BOS/EOS), deterministic
+    "[vie_Latn] <text>" output, and a generate() cost that grows with the
+    padded batch (batch size x longest input) like the real model's.
+    MOCK_NLLB_LOAD_S is the load time, MOCK_NLLB_MS_PER_TOKEN the cost of
+    one padded token.
+    """
+    name = "mock"
+    compute_type = None
+
+    def __init__(self, model_name, src_lang, tgt_lang, forced_bos_token_id, model_path=None):
+        self.model_name = model_name
+        self.src_lang = src_lang
+        self.tgt_lang = tgt_lang
+        self.ms_per_token = float(os.getenv("MOCK_NLLB_MS_PER_TOKEN", "0.05"))
+        time.sleep(float(os.getenv("MOCK_NLLB_LOAD_S", "0")))
+
+    def token_lengths(self, texts):
+        return [len(text.split()) + 2 for text in texts]
+
+    def translate(self, texts):
+        from common.standin_servers import fake_translation
+
+        lengths = self.token_lengths(texts)
+        time.sleep(len(texts) * max(lengths, default=0) * self.ms_per_token / 1000)
+        return [fake_translation(text, self.tgt_lang) for text in texts]
+
+
+BACKENDS = {backend.name: backend for backend in (TorchBackend, TorchInt8Backend, CTranslate2Backend, MockBackend)}
+
+
+def compute_type(name):
+    """The precision backend `name` runs the model in (None for the mock or an unknown name)."""
+    return getattr(BACKENDS.get(name), "compute_type", None)
+
+
+def model_key(model_name, name):
+    """
+    Cache key of `model_name` translated by backend `name`. Full-precision
+    torch keeps the bare model name, so the entries of the original setup
+    stay valid; the other backends get their own entries.
+    """
+    if name == TorchBackend.name:
+        return model_name
+    return ":".join(part for part in (model_name, name, compute_type(name)) if part)
+
+
+def load_backend(name, model_name, src_lang, tgt_lang, forced_bos_token_id, model_path=None):
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown NLLB backend {name!r}, expected one of: {', '.join(BACKENDS)}") from None
+    return backend(model_name, src_lang, tgt_lang, forced_bos_token_id, model_path)
@@ -0,0 +1,455 @@
+"""
+Pure-Python reader/writer for .pptx packages.
+
+Exposes a small subset of the PowerPoint COM object model (Application,
+Presentations.Open, Slides, Shapes, TextFrame.TextRange.Text with its
+Paragraphs/Runs/Font, SaveAs, Close, Quit) on top of the raw OOXML zip so the existing shape walks can run
+headless, without starting PowerPoint.
+"""
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+from io import BytesIO
+
+NS = {
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+for _prefix in ("a", "p", "r"):
+    ET.register_namespace(_prefix, NS[_prefix])
+
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+
+# PowerPoint separates paragraphs with \r and soft line breaks with \v
+PARAGRAPH_SEP = "\r"
+LINE_BREAK = "\x0b"
+
+
+def _q(tag):
+    prefix, local = tag.split(":")
+    return f"{{{NS[prefix]}}}{local}"
+
+
+def is_pptx(path):
+    return str(path).lower().endswith(".pptx")
+
+
+# ---------------- XML PARTS ----------------
+def parse_part(data):
+    """Parse an XML part, remembering its namespace declarations."""
+    namespaces = []
+    for event, item in ET.iterparse(BytesIO(data), events=("start-ns",)):
+        namespaces.append(item)
+    for prefix, uri in namespaces:
+        if prefix:
+            ET.register_namespace(prefix, uri)
+    root = ET.fromstring(data)
+    return root, namespaces
+
+
+def serialize_part(root, namespaces):
+    """
+    Serialize a part back to bytes.
+
+    ElementTree drops declarations for prefixes that only appear inside
+    attribute values (mc:Ignorable="p14 v"), which PowerPoint refuses to
+    open, so any missing declaration is put back on the root element.
+    """
+    body = ET.tostring(root, encoding="unicode")
+    end = body.index(">")
+    if body[end - 1] == "/":
+        end -= 1
+    start_tag = body[:end]
+    missing = []
+    for prefix, uri in namespaces:
+        attr = f"xmlns:{prefix}" if prefix else "xmlns"
+        if f"{attr}=" not in start_tag:
+            missing.append(f' {attr}="{uri}"')
+    body = start_tag + "".join(missing) + body[end:]
+    return XML_DECLARATION + body.encode("utf-8")
+
+
+def read_rels(package, part_name):
+    """Return {rId: absolute target part name} for a part's relationships."""
+    folder, name = part_name.rsplit("/", 1) if "/" in part_name else ("", part_name)
+    rels_name = f"{folder}/_rels/{name}.rels" if folder else f"_rels/{name}.rels"
+    if rels_name not in package:
+        return {}
+    root = ET.fromstring(package[rels_name])
+    rels = {}
+    for rel in root.findall(_q("rel:Relationship")):
+        if rel.get("TargetMode") == "External":
+            continue
+        rels[rel.get("Id")] = resolve_target(folder, rel.get("Target"))
+    return rels
+
+
+def resolve_target(folder, target):
+    if target.startswith("/"):
+        return target.lstrip("/")
+    parts = folder.split("/") if folder else []
+    for piece in target.split("/"):
+        if piece == "..":
+            if parts:
+                parts.pop()
+        elif piece and piece != ".":
+            parts.append(piece)
+    return "/".join(parts)
+
+
+def presentation_part(package):
+    root = ET.fromstring(package["_rels/.rels"])
+    for rel in root.findall(_q("rel:Relationship")):
+        if rel.get("Type", "").endswith("/officeDocument"):
+            return resolve_target("", rel.get("Target"))
+    return "ppt/presentation.xml"
+
+
+def slide_part_names(package):
+    """Slide part names in presentation order (p:sldIdLst), not zip order."""
+    pres_name = presentation_part(package)
+    rels = read_rels(package, pres_name)
+    root = ET.fromstring(package[pres_name])
+    sld_id_lst = root.find(_q("p:sldIdLst"))
+    if sld_id_lst is None:
+        return []
+    return [rels[sld.get(_q("r:id"))] for sld in sld_id_lst.findall(_q("p:sldId"))]
+
+
+# ---------------- TEXT ----------------
+def paragraph_text(paragraph):
+    pieces = []
+    for child in paragraph:
+        if child.tag in (_q("a:r"), _q("a:fld")):
+            t = child.find(_q("a:t"))
+            if t is not None and t.text:
+                pieces.append(t.text)
+        elif child.tag == _q("a:br"):
+            pieces.append(LINE_BREAK)
+    return "".join(pieces)
+
+
+def get_text(tx_body):
+    return PARAGRAPH_SEP.join(paragraph_text(p) for p in tx_body.findall(_q("a:p")))
+
+
+def _first_run_props(paragraph):
+    for child in paragraph:
+        if child.tag in (_q("a:r"), _q("a:fld")):
+            r_pr = child.find(_q("a:rPr"))
+            return r_pr
+    return paragraph.find(_q("a:endParaRPr"))
+
+
+def _make_run(text, r_pr):
+    run = ET.Element(_q("a:r"))
+    if r_pr is not None:
+        props = _copy(r_pr)
+        props.tag = _q("a:rPr")
+        run.append(props)
+    t = ET.SubElement(run, _q("a:t"))
+    t.text = text
+    return run
+
+
+def fill_paragraph(paragraph, text, r_pr):
+    """Replace the runs of a paragraph, keeping its a:pPr and a:endParaRPr."""
+    for child in list(paragraph):
+        if child.tag not in (_q("a:pPr"), _q("a:endParaRPr")):
+            paragraph.remove(child)
+    end = paragraph.find(_q("a:endParaRPr"))
+    insert_at = list(paragraph).index(end) if end is not None else len(paragraph)
+    for i, line in enumerate(text.split(LINE_BREAK)):
+        if i:
+            br = ET.Element(_q("a:br"))
+            if r_pr is not None:
+                br.append(ET.Element(_q("a:rPr"), dict(r_pr.attrib)))
+            paragraph.insert(insert_at, br)
+            insert_at += 1
+        if line:
+            paragraph.insert(insert_at, _make_run(line, r_pr))
+            insert_at += 1
+
+
+def set_text(tx_body, text):
+    """
+    Same semantics as assigning TextRange.Text over COM: one paragraph per
+    \\r-separated line, each taking the formatting of the first run of the
+    paragraph it replaces (or of the last existing paragraph).
+    """
+    text = text.replace("\r\n", PARAGRAPH_SEP).replace("\n", PARAGRAPH_SEP)
+    paragraphs = tx_body.findall(_q("a:p"))
+    lines = text.split(PARAGRAPH_SEP)
+    if not paragraphs:
+        paragraphs = [ET.SubElement(tx_body, _q("a:p"))]
+
+    previous = None
+    for i, line in enumerate(lines):
+        if i < len(paragraphs):
+            paragraph = paragraphs[i]
+        else:
+            template = paragraphs[-1]
+            paragraph = ET.Element(_q("a:p"))
+            p_pr = template.find(_q("a:pPr"))
+            if p_pr is not None:
+                paragraph.append(_copy(p_pr))
+            end = template.find(_q("a:endParaRPr"))
+            if end is not None:
+                paragraph.append(_copy(end))
+            tx_body.insert(list(tx_body).index(previous) + 1, paragraph)
+        previous = paragraph
+        source = paragraphs[min(i, len(paragraphs) - 1)]
+        fill_paragraph(paragraph, line, _first_run_props(source))
+
+    for paragraph in paragraphs[len(lines):]:
+        tx_body.remove(paragraph)
+
+
+def _copy(element):
+    return ET.fromstring(ET.tostring(element))
+
+
+def _runs(paragraph):
+    return [child for child in paragraph if child.tag in (_q("a:r"), _q("a:fld"))]
+
+
+# ---------------- COM-LIKE OBJECT MODEL ----------------
+MSO_TRUE = -1
+MSO_FALSE = 0
+
+
+class ColorFormat:
+    def __init__(self, rgb):
+        self.RGB = rgb
+
+
+class Font:
+    """
+    Read-only view of a run's a:rPr. Only explicit attributes are seen:
+    values inherited from the placeholder or master read as the default.
+    """
+
+    def __init__(self, r_pr):
+        self._r_pr = r_pr if r_pr is not None else ET.Element(_q("a:rPr"))
+
+    def _flag(self, name):
+        return MSO_TRUE if self._r_pr.get(name) in ("1", "true") else MSO_FALSE
+
+    @property
+    def Bold(self):
+        return self._flag("b")
+
+    @property
+    def Italic(self):
+        return self._flag("i")
+
+    @property
+    def Underline(self):
+        return MSO_TRUE if self._r_pr.get("u", "none") != "none" else MSO_FALSE
+
+    @property
+    def Size(self):
+        size = self._r_pr.get("sz")
+        return int(size) / 100 if size else None
+
+    @property
+    def Name(self):
+        latin = self._r_pr.find(_q("a:latin"))
+        return latin.get("typeface") if latin is not None else None
+
+    @property
+    def Color(self):
+        fill = self._r_pr.find(_q("a:solidFill"))
+        if fill is None or not len(fill):
+            return ColorFormat(None)
+        color = fill[0]
+        value = color.get("val")
+        if color.tag == _q("a:srgbClr") and value:
+            red, green, blue = int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+            return ColorFormat(red + (green << 8) + (blue << 16))  # COM packs RGB as BGR
+        return ColorFormat(value)  # scheme/preset colour name
+
+
+class RangeList:
+    """What Paragraphs()/Runs() return without an index: the count of items."""
+
+    def __init__(self, items):
+        self._items = items
+
+    @property
+    def Count(self):
+        return len(self._items)
+
+    @property
+    def Text(self):
+        return "".join(item.Text for item in self._items)
+
+
+class RunRange:
+    """One a:r (or a:fld) of a paragraph, like TextRange.Runs(i) over COM."""
+
+    def __init__(self, run, slide):
+        self._run = run
+        self._slide = slide
+
+    @property
+    def Text(self):
+        t = self._run.find(_q("a:t"))
+        return (t.text or "") if t is not None else ""
+
+    @Text.setter
+    def Text(self, value):
+        t = self._run.find(_q("a:t"))
+        if t is None:
+            t = ET.SubElement(self._run, _q("a:t"))
+        t.text = (value or "").rstrip(PARAGRAPH_SEP)
+        self._slide.dirty = True
+
+    @property
+    def Font(self):
+        return Font(self._run.find(_q("a:rPr")))
+
+
+class ParagraphRange:
+    """
+    One a:p, like TextRange.Paragraphs(i) over COM, except that the text
+    never carries the trailing paragraph mark.
+    """
+
+    def __init__(self, paragraph, slide):
+        self._paragraph = paragraph
+        self._slide = slide
+
+    @property
+    def Text(self):
+        return paragraph_text(self._paragraph)
+
+    @Text.setter
+    def Text(self, value):
+        value = (value or "").rstrip(PARAGRAPH_SEP)
+        fill_paragraph(self._paragraph, value, _first_run_props(self._paragraph))
+        self._slide.dirty = True
+
+    @property
+    def Font(self):
+        return Font(_first_run_props(self._paragraph))
+
+    def Runs(self, Start=-1, Length=-1):
+        runs = [RunRange(run, self._slide) for run in _runs(self._paragraph)]
+        return runs[Start - 1] if Start > 0 else RangeList(runs)
+
+
+class TextRange:
+    def __init__(self, tx_body, slide):
+        self._tx_body = tx_body
+        self._slide = slide
+
+    @property
+    def Text(self):
+        return get_text(self._tx_body)
+
+    @Text.setter
+    def Text(self, value):
+        set_text(self._tx_body, value or "")
+        self._slide.dirty = True
+
+    def Paragraphs(self, Start=-1, Length=-1):
+        paragraphs = [ParagraphRange(p, self._slide) for p in self._tx_body.findall(_q("a:p"))]
+        return paragraphs[Start - 1] if Start > 0 else RangeList(paragraphs)
+
+
+class TextFrame:
+    def __init__(self, tx_body, slide):
+        self.TextRange = TextRange(tx_body, slide)
+
+    @property
+    def HasText(self):
+        return bool(self.TextRange.Text)
+
+
+class Shape:
+    def __init__(self, element, slide):
+        self.element = element
+        self._tx_body = element.find(_q("p:txBody"))
+        self.HasTextFrame = self._tx_body is not None
+        self.TextFrame = TextFrame(self._tx_body, slide) if self.HasTextFrame else None
+
+    @property
+    def Name(self):
+        c_nv_pr = self.element.find(f"{_q('p:nvSpPr')}/{_q('p:cNvPr')}")
+        return c_nv_pr.get("name", "") if c_nv_pr is not None else ""
+
+
+class Slide:
+    def __init__(self, package, part_name, index):
+        self.part_name = part_name
+        self.SlideIndex = index
+        self.root, self.namespaces = parse_part(package[part_name])
+        self.dirty = False
+        sp_tree = self.root.find(f"{_q('p:cSld')}/{_q('p:spTree')}")
+        # Only top-level shapes, like slide.Shapes over COM
+        self.Shapes = [Shape(sp, self) for sp in sp_tree.findall(_q("p:sp"))] if sp_tree is not None else []
+
+
+class Slides:
+    def __init__(self, slides):
+        self._slides = slides
+
+    def __iter__(self):
+        return iter(self._slides)
+
+    def __len__(self):
+        return len(self._slides)
+
+    def __call__(self, index):
+        return self._slides[index - 1]
+
+    @property
+    def Count(self):
+        return len(self._slides)
+
+
+class Presentation:
+    def __init__(self, path):
+        self.FullName = os.path.abspath(path)
+        with zipfile.ZipFile(self.FullName) as zf:
+            self._infos = zf.infolist()
+            self.package = {info.filename: zf.read(info.filename) for info in self._infos}
+        names = slide_part_names(self.package)
+        self.Slides = Slides([Slide(self.package, name, i) for i, name in enumerate(names, start=1)])
+
+    def SaveAs(self, output_path, FileFormat=None):
+        if not is_pptx(output_path):
+            raise ValueError("The OOXML backend can only save .pptx files")
+        for slide in self.Slides:
+            if slide.dirty:
+                self.package[slide.part_name] = serialize_part(slide.root, slide.namespaces)
+        tmp_path = output_path + ".tmp"
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for info in self._infos:
+                zf.writestr(info, self.package[info.filename])
+        os.replace(tmp_path, output_path)
+
+    def Save(self):
+        self.SaveAs(self.FullName)
+
+    def Close(self):
+        self.package = {}
+
+
+class Presentations:
+    def Open(self, path, WithWindow=False, **kwargs):
+        return Presentation(path)
+
+
+class Application:
+    """Headless stand-in for win32com.client.Dispatch("PowerPoint.Application")."""
+
+    def __init__(self):
+        self.Visible = False
+        self.Presentations = Presentations()
+
+    def Quit(self):
+        pass
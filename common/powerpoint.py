@@ -0,0 +1,269 @@
+"""
+Chooses the backend that opens a presentation: the pure-Python OOXML reader
+for .pptx files, PowerPoint over COM for everything else (.ppt), optionally
+leased from a pool of long-lived sessions.
+"""
+import queue
+import inspect
+import threading
+from contextlib import contextmanager
+
+from common import ooxml
+from common.instrumentation import span
+
+try:
+    import win32com.client
+except ImportError:
+    win32com = None
+
+
+def get_application(*paths):
+    """
+    Return an object with the PowerPoint.Application interface able to
+    open/save every path given.
+    """
+    if paths and all(ooxml.is_pptx(p) for p in paths):
+        return ooxml.Application()
+    return dispatch_powerpoint()
+
+
+def dispatch_powerpoint():
+    if win32com is None:
+        raise RuntimeError("win32com.client is not available: .ppt files need PowerPoint on Windows (pywin32).")
+    return win32com.client.Dispatch("PowerPoint.Application")
+
+
+def is_alive(app):
+    """Cheap round-trip to check that a COM session still answers."""
+    try:
+        app.Presentations.Count
+        return True
+    except Exception:
+        return False
+
+
+def open_documents(app):
+    """FullName of every presentation open in the session."""
+    return {presentation.FullName for presentation in app.Presentations}
+
+
+def close_documents(app, keep=()):
+    """Close the presentations of the session not named in `keep`; False if the session does not answer."""
+    try:
+        for presentation in list(app.Presentations):
+            if presentation.FullName not in keep:
+                presentation.Close()
+        return True
+    except Exception:
+        return False
+
+
+class PowerPointPool:
+    """
+    Long-lived PowerPoint sessions shared by the mass_* loops, so a folder of
+    decks pays for one application launch instead of one per file.
+
+    A session that raises and no longer answers (PowerPoint crashed or hung
+    up) is quit and dropped; the next lease starts a fresh one. A session
+    that still answers goes back to the pool without the presentations the
+    lease left open (a deck that raised before its Close()), so the next
+    deck does not find a stale document in Presentations. `factory`
+    builds a session: PowerPoint over COM by default, or a stand-in such as
+    common.fake_powerpoint.FakeApplication for tests on Linux. Note that
+    PowerPoint itself is single-instance per desktop session, so size > 1
+    only helps with factories that really start separate processes.
+    """
+
+    def __init__(self, size=1, factory=None):
+        self.size = size
+        self.factory = factory or dispatch_powerpoint
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._sessions = set()
+        self.launches = 0
+        self.discarded = 0
+
+    def _start(self):
+        with self._lock:
+            if len(self._sessions) >= self.size:
+                return None
+            self.launches += 1
+        try:
+            with span("launch"):
+                app = self.factory()
+        except Exception:
+            with self._lock:
+                self.launches -= 1
+            raise
+        with self._lock:
+            self._sessions.add(app)
+        return app
+
+    def acquire(self, timeout=None):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        app = self._start()
+        if app is not None:
+            return app
+        return self._idle.get(timeout=timeout)
+
+    def release(self, app, healthy=True):
+        if healthy:
+            self._idle.put(app)
+            return
+        self.discard(app)
+
+    def discard(self, app):
+        with self._lock:
+            self._sessions.discard(app)
+            self.discarded += 1
+        try:
+            app.Quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def lease(self):
+        app = self.acquire()
+        kept = ()
+        try:
+            # Presentations open before the lease (PowerPoint may be the user's own) stay open
+            kept = open_documents(app)
+            yield app
+        except Exception:
+            self.release(app, healthy=is_alive(app) and close_documents(app, kept))
+            raise
+        else:
+            self.release(app, healthy=close_documents(app, kept))
+
+    def close(self):
+        while True:
+            try:
+                app = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                app.Quit()
+            except Exception:
+                pass
+        with self._lock:
+            self._sessions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextmanager
+def open_application(*paths, pool=None):
+    """
+    Yield an application able to handle `paths`: the OOXML backend for .pptx,
+    a session leased from `pool` when one is given, otherwise a fresh
+    PowerPoint that is quit on exit (the original one-launch-per-file path).
+    """
+    if paths and all(ooxml.is_pptx(p) for p in paths):
+        yield ooxml.Application()
+        return
+    with open_powerpoint(pool) as app:
+        yield app
+
+
+# Set in folder_runner worker processes, which cannot share the parent's pool
+WORKER_POOL = None
+
+
+def init_worker_pool(size=1):
+    """folder_runner initializer: give this worker process its own PowerPointPool."""
+    global WORKER_POOL
+    WORKER_POOL = PowerPointPool(size)
+    return WORKER_POOL.close
+
+
+@contextmanager
+def open_powerpoint(pool=None):
+    """Yield a real PowerPoint session, leased from `pool` or launched (and quit) here."""
+    pool = pool or WORKER_POOL
+    if pool is not None:
+        with pool.lease() as app:
+            yield app
+        return
+    with span("launch"):
+        app = dispatch_powerpoint()
+    try:
+        yield app
+    finally:
+        app.Quit()
+
+
+@contextmanager
+def pool_scope(pool=None):
+    """Yield `pool`, or a new PowerPointPool closed on exit when none is given."""
+    if pool is not None:
+        yield pool
+        return
+    with PowerPointPool() as new_pool:
+        yield new_pool
+
+
+# ---------------- COM CALL ACCOUNTING ----------------
+class CallCounter:
+    """Number of cross-process calls made through CountingProxy objects."""
+
+    def __init__(self):
+        self.calls = 0
+
+
+class CountingProxy:
+    """
+    Wraps a COM object and counts what would each be a round trip to
+    PowerPoint: property reads and writes, method and collection calls,
+    and enumeration steps. Objects obtained through the proxy are wrapped
+    too; plain values (str, numbers) are returned as they are.
+    """
+
+    def __init__(self, target, counter):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_counter", counter)
+
+    def _wrap(self, value):
+        if value is None or isinstance(value, (str, bytes, int, float, bool, tuple)):
+            return value
+        return CountingProxy(value, self._counter)
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if inspect.ismethod(value) or inspect.isfunction(value) or inspect.isbuiltin(value):
+            def method(*args, **kwargs):
+                self._counter.calls += 1
+                return self._wrap(value(*args, **kwargs))
+            return method
+        self._counter.calls += 1
+        return self._wrap(value)
+
+    def __setattr__(self, name, value):
+        self._counter.calls += 1
+        setattr(self._target, name, value)
+
+    def __call__(self, *args, **kwargs):
+        self._counter.calls += 1
+        return self._wrap(self._target(*args, **kwargs))
+
+    def __iter__(self):
+        self._counter.calls += 1  # _NewEnum
+        for item in self._target:
+            self._counter.calls += 1  # IEnumVARIANT.Next
+            yield self._wrap(item)
+
+    def __getitem__(self, index):
+        self._counter.calls += 1
+        return self._wrap(self._target[index])
+
+
+def count_calls(target):
+    """(proxy, counter): use the proxy instead of `target` to count its COM calls."""
+    counter = CallCounter()
+    return CountingProxy(target, counter), counter
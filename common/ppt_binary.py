@@ -0,0 +1,344 @@
+"""
+Pure-Python, read-only text reader for legacy binary .ppt files
+(PowerPoint 97-2003).
+
+A .ppt is an OLE compound file whose "PowerPoint Document" stream is a
+tree of records. The reader follows the "Current User" stream to the last
+UserEditAtom, merges the persist directories of the edit chain, takes the
+slides from the SlideListWithText of the DocumentContainer and walks the
+drawing of each slide: a shape's text is the TextCharsAtom or
+TextBytesAtom of its client textbox, or, for placeholders, the slide-list
+text its OutlineTextRefAtom points at. Shapes inside groups (tables are
+groups too) are read at every depth, in z-order, as Shape.GroupItems
+lists them over COM.
+
+SmartArt is the exception: PowerPoint 2007+ keeps a diagram's text in an
+OOXML copy of the shape (its metroBlob) and only a drawing of it in the
+.ppt records, so a deck with SmartArt raises PptFormatError and is read
+through PowerPoint instead.
+
+    for texts in slide_texts("AD Topic 1.ppt"):
+        ...  # TextFrame.TextRange.Text of each shape with text, in z-order
+
+Texts keep PowerPoint's separators: \\r between paragraphs, \\v for soft
+line breaks. Files the reader cannot handle (not a compound file,
+password-protected, damaged records) raise PptFormatError, so callers can
+fall back to PowerPoint.
+"""
+import struct
+
+CFB_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ENDOFCHAIN = 0xFFFFFFFE
+MAXREGSECT = 0xFFFFFFFA
+HEADER_DIFAT_ENTRIES = 109
+
+ENCRYPTED_TOKEN = 0xF3D1C4DF
+
+# Record types of the PowerPoint Document stream ([MS-PPT], [MS-ODRAW])
+RT_DOCUMENT = 0x03E8
+RT_SLIDE = 0x03EE
+RT_SLIDE_PERSIST_ATOM = 0x03F3
+RT_DRAWING = 0x040C
+RT_OUTLINE_TEXT_REF_ATOM = 0x0F9E
+RT_TEXT_HEADER_ATOM = 0x0F9F
+RT_TEXT_CHARS_ATOM = 0x0FA0
+RT_TEXT_BYTES_ATOM = 0x0FA8
+RT_SLIDE_LIST_WITH_TEXT = 0x0FF0
+RT_USER_EDIT_ATOM = 0x0FF5
+RT_CURRENT_USER_ATOM = 0x0FF6
+RT_PERSIST_DIRECTORY_ATOM = 0x1772
+RT_DG_CONTAINER = 0xF002
+RT_SPGR_CONTAINER = 0xF003
+RT_SP_CONTAINER = 0xF004
+RT_FSP = 0xF00A
+RT_CLIENT_TEXTBOX = 0xF00D
+RT_TERTIARY_OPT = 0xF122
+
+# Shape property holding the OOXML copy of a shape saved by PowerPoint 2007+ (a zip package)
+PID_METRO_BLOB = 0x03A9
+DIAGRAM_PART = b"drs/diagrams/"
+
+FSP_PATRIARCH = 0x4
+FSP_DELETED = 0x8
+
+
+class PptFormatError(ValueError):
+    pass
+
+
+def is_ppt(path):
+    return str(path).lower().endswith(".ppt")
+
+
+def is_compound_file(path):
+    """True if `path` exists and starts with the OLE compound file signature."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(CFB_SIGNATURE)) == CFB_SIGNATURE
+    except OSError:
+        return False
+
+
+# ---------------- COMPOUND FILE ----------------
+class CompoundFile:
+    """The streams of an OLE compound file (version 3 or 4), read from bytes."""
+
+    def __init__(self, data):
+        if data[:8] != CFB_SIGNATURE or len(data) < 512:
+            raise PptFormatError("not an OLE compound file")
+        self.data = data
+        sector_shift, mini_shift = struct.unpack_from("<HH", data, 0x1E)
+        if sector_shift not in (9, 12) or mini_shift != 6:
+            raise PptFormatError(f"unsupported sector sizes (2^{sector_shift}, 2^{mini_shift})")
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_shift
+        (_, fat_sectors, dir_start, _, self.mini_cutoff, minifat_start, _, difat_start, difat_sectors
+         ) = struct.unpack_from("<9I", data, 0x28)
+
+        # The FAT sectors are listed by the header, then by a chain of DIFAT sectors
+        difat = list(struct.unpack_from(f"<{HEADER_DIFAT_ENTRIES}I", data, 0x4C))
+        per_sector = self.sector_size // 4 - 1
+        sector = difat_start
+        for _ in range(difat_sectors):
+            if sector > MAXREGSECT:
+                break
+            entries = struct.unpack_from(f"<{per_sector + 1}I", self._sector(sector))
+            difat.extend(entries[:per_sector])
+            sector = entries[per_sector]
+        self.fat = []
+        for sector in difat[:fat_sectors]:
+            self.fat.extend(struct.unpack(f"<{self.sector_size // 4}I", self._sector(sector)))
+
+        directory = self._chain(dir_start, self.fat, self._sector, self.sector_size)
+        self.entries = {}
+        root = None
+        for offset in range(0, len(directory) - 127, 128):
+            name_length, kind = struct.unpack_from("<HB", directory, offset + 0x40)
+            if kind not in (1, 2, 5):  # storage, stream, root
+                continue
+            name = directory[offset:offset + max(0, name_length - 2)].decode("utf-16-le", "replace")
+            start, size = struct.unpack_from("<II", directory, offset + 0x74)
+            if kind == 5:
+                root = (start, size)
+            elif kind == 2:
+                self.entries.setdefault(name.lower(), (start, size))
+        if root is None:
+            raise PptFormatError("compound file without a root entry")
+
+        # Small streams live in the mini stream, stored in the root entry's chain
+        self.mini_stream = self._chain(root[0], self.fat, self._sector, self.sector_size)[:root[1]]
+        minifat = self._chain(minifat_start, self.fat, self._sector, self.sector_size)
+        self.minifat = list(struct.unpack(f"<{len(minifat) // 4}I", minifat))
+
+    def _sector(self, sector):
+        offset = (sector + 1) * self.sector_size
+        if offset + self.sector_size > len(self.data):
+            raise PptFormatError(f"sector {sector} is past the end of the file")
+        return self.data[offset:offset + self.sector_size]
+
+    def _mini_sector(self, sector):
+        offset = sector * self.mini_sector_size
+        return self.mini_stream[offset:offset + self.mini_sector_size]
+
+    @staticmethod
+    def _chain(start, fat, read, sector_size):
+        parts = []
+        sector = start
+        # A chain never holds more sectors than the table has entries: anything longer loops
+        for _ in range(len(fat) + 1):
+            if sector > MAXREGSECT:
+                return b"".join(parts)
+            if sector >= len(fat):
+                raise PptFormatError(f"sector chain points at sector {sector} outside the table")
+            parts.append(read(sector))
+            sector = fat[sector]
+        raise PptFormatError("sector chain loops")
+
+    def stream(self, name):
+        entry = self.entries.get(name.lower())
+        if entry is None:
+            raise PptFormatError(f"no {name!r} stream")
+        start, size = entry
+        if size < self.mini_cutoff:
+            data = self._chain(start, self.minifat, self._mini_sector, self.mini_sector_size)
+        else:
+            data = self._chain(start, self.fat, self._sector, self.sector_size)
+        return data[:size]
+
+
+# ---------------- RECORDS ----------------
+def records(data, start=0, end=None):
+    """(type, instance, body start, body end) of the records laid end to end in data[start:end]."""
+    end = len(data) if end is None else end
+    position = start
+    while position + 8 <= end:
+        version_instance, record_type, length = struct.unpack_from("<HHI", data, position)
+        body = position + 8
+        yield record_type, version_instance >> 4, body, min(body + length, end)
+        position = body + length
+
+
+def record_at(data, offset, expected_type):
+    """(body start, body end) of the record at `offset`, which must be of `expected_type`."""
+    if offset + 8 > len(data):
+        raise PptFormatError(f"record offset {offset} is past the end of the stream")
+    record_type, _, body, end = next(records(data, offset))
+    if record_type != expected_type:
+        raise PptFormatError(f"expected record 0x{expected_type:04X} at {offset}, found 0x{record_type:04X}")
+    return body, end
+
+
+def child(data, start, end, record_type, instance=None):
+    """(body start, body end) of the first child record of a type (and instance), None if absent."""
+    for found_type, found_instance, body, body_end in records(data, start, end):
+        if found_type == record_type and (instance is None or found_instance == instance):
+            return body, body_end
+    return None
+
+
+def atom_text(data, record_type, body, end):
+    if record_type == RT_TEXT_CHARS_ATOM:
+        return data[body:end].decode("utf-16-le", "replace")
+    # TextBytesAtom: UTF-16 code units with their high byte dropped
+    return data[body:end].decode("latin-1")
+
+
+# ---------------- DOCUMENT ----------------
+def persist_directory(document, current_edit):
+    """({persist id: stream offset}, persist id of the DocumentContainer) of the last saved edit."""
+    offsets = {}
+    document_ref = None
+    seen = set()
+    edit = current_edit
+    while edit not in seen:
+        seen.add(edit)
+        body, _ = record_at(document, edit, RT_USER_EDIT_ATOM)
+        _, _, _, _, last_edit, directory, doc_ref = struct.unpack_from("<IHBBIII", document, body)
+        if document_ref is None:
+            document_ref = doc_ref
+        body, end = record_at(document, directory, RT_PERSIST_DIRECTORY_ATOM)
+        position = body
+        while position + 4 <= end:
+            (word,) = struct.unpack_from("<I", document, position)
+            first, count = word & 0xFFFFF, word >> 20
+            entries = struct.unpack_from(f"<{count}I", document, position + 4)
+            for i, offset in enumerate(entries):
+                offsets.setdefault(first + i, offset)  # later edits override earlier ones
+            position += 4 + 4 * count
+        if not last_edit:
+            break
+        edit = last_edit
+    return offsets, document_ref
+
+
+def slide_list(document, body, end):
+    """[(slide persist id, [placeholder text, ...])] of the slides in presentation order."""
+    slides = []
+    for record_type, _, start, stop in records(document, body, end):
+        if record_type == RT_SLIDE_PERSIST_ATOM:
+            (persist_id,) = struct.unpack_from("<I", document, start)
+            slides.append((persist_id, []))
+        elif not slides:
+            continue
+        elif record_type == RT_TEXT_HEADER_ATOM:
+            slides[-1][1].append("")
+        elif record_type in (RT_TEXT_CHARS_ATOM, RT_TEXT_BYTES_ATOM):
+            texts = slides[-1][1]
+            if not texts:
+                texts.append("")
+            texts[-1] = atom_text(document, record_type, start, stop)
+    return slides
+
+
+def metro_blob(document, body, end):
+    """The OOXML copy of an OfficeArtSpContainer's shape (PowerPoint 2007+), None if it has none."""
+    for record_type, count, start, stop in records(document, body, end):
+        if record_type != RT_TERTIARY_OPT:
+            continue
+        # `count` 6-byte properties, then the data of the complex ones in the same order
+        data = start + 6 * count
+        for i in range(count):
+            opid, size = struct.unpack_from("<HI", document, start + 6 * i)
+            if not opid & 0x8000:  # fComplex
+                continue
+            if opid & 0x3FFF == PID_METRO_BLOB:
+                return document[data:min(data + size, stop)]
+            data += size
+    return None
+
+
+def shape_text(document, body, end, outline):
+    """Text of one OfficeArtSpContainer, None if the shape holds none."""
+    fsp = child(document, body, end, RT_FSP)
+    if fsp is not None and fsp[1] - fsp[0] >= 8:
+        _, flags = struct.unpack_from("<II", document, fsp[0])
+        if flags & (FSP_PATRIARCH | FSP_DELETED):
+            return None
+    textbox = child(document, body, end, RT_CLIENT_TEXTBOX)
+    if textbox is None:
+        return None
+    for record_type, _, start, stop in records(document, *textbox):
+        if record_type in (RT_TEXT_CHARS_ATOM, RT_TEXT_BYTES_ATOM):
+            return atom_text(document, record_type, start, stop)
+        if record_type == RT_OUTLINE_TEXT_REF_ATOM:
+            (index,) = struct.unpack_from("<I", document, start)
+            return outline[index] if index < len(outline) else None
+    return None
+
+
+def group_texts(document, body, end, outline, texts):
+    """Append the texts of the shapes of an OfficeArtSpgrContainer, nested groups included, in z-order."""
+    for record_type, _, start, stop in records(document, body, end):
+        if record_type == RT_SP_CONTAINER:
+            blob = metro_blob(document, start, stop)
+            if blob is not None and DIAGRAM_PART in blob:
+                raise PptFormatError("SmartArt text is only in the OOXML copy of the diagram")
+            text = shape_text(document, start, stop, outline)
+            if text is not None:
+                texts.append(text)
+        elif record_type == RT_SPGR_CONTAINER:
+            group_texts(document, start, stop, outline, texts)
+
+
+def slide_shape_texts(document, offset, outline):
+    """Texts of the shapes of the SlideContainer at `offset`, in z-order."""
+    body, end = record_at(document, offset, RT_SLIDE)
+    texts = []
+    drawing = child(document, body, end, RT_DRAWING)
+    group = drawing and child(document, *drawing, RT_DG_CONTAINER)
+    group = group and child(document, *group, RT_SPGR_CONTAINER)
+    if group:
+        group_texts(document, *group, outline, texts)
+    return texts
+
+
+def read_slide_texts(data):
+    """slide_texts() of a .ppt held in memory."""
+    try:
+        cfb = CompoundFile(data)
+        current_user = cfb.stream("Current User")
+        body, _ = record_at(current_user, 0, RT_CURRENT_USER_ATOM)
+        _, token, current_edit = struct.unpack_from("<III", current_user, body)
+        if token == ENCRYPTED_TOKEN:
+            raise PptFormatError("the presentation is password-protected")
+
+        document = cfb.stream("PowerPoint Document")
+        offsets, document_ref = persist_directory(document, current_edit)
+        if document_ref not in offsets:
+            raise PptFormatError("the persist directory has no DocumentContainer")
+        body, end = record_at(document, offsets[document_ref], RT_DOCUMENT)
+        slides = child(document, body, end, RT_SLIDE_LIST_WITH_TEXT, instance=0)
+        if slides is None:
+            return []
+        return [
+            slide_shape_texts(document, offsets[persist_id], outline) if persist_id in offsets else []
+            for persist_id, outline in slide_list(document, *slides)
+        ]
+    except struct.error as e:
+        raise PptFormatError(f"truncated record: {e}") from e
+
+
+def slide_texts(path):
+    """[[shape text, ...] per slide] of a binary .ppt; see the module docstring."""
+    with open(path, "rb") as f:
+        return read_slide_texts(f.read())
@@ -0,0 +1,225 @@
+"""
+Headless deck generator: clones the slides of a .pptx template directly in
+the zip package, without PowerPoint.
+
+The template follows the ConvertBackToPPTWithExample convention: its first
+slide is used for the first slide of a deck, its last slide for the last
+one and its second slide for everything in between. Each generated slide
+is a copy of the template slide's XML with the title placeholder and the
+content placeholder filled from an AD-Json slide ({"Title": ...,
+"Contents": [...]}), and the copy keeps the template slide's relationships
+(layout, images). presentation.xml, its relationships and
+[Content_Types].xml are rewritten for the new slide list, and the output
+package is written in one pass.
+
+    load_template("Template/base_template.pptx").build(slides, "deck.pptx")
+
+The template is parsed once per process (load_template caches it), so
+building a deck costs a deep copy and a serialization per slide.
+"""
+import os
+import copy
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from xml.sax.saxutils import quoteattr
+
+from common import ooxml
+from common.ooxml import NS, XML_DECLARATION, _q
+
+CONTENT_TYPES_NAME = "[Content_Types].xml"
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+SLIDE_RELATIONSHIP = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+SLIDE_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+
+TITLE_PLACEHOLDERS = ("title", "ctrTitle")
+CONTENT_PLACEHOLDERS = ("body", "subTitle", "obj")
+
+FIRST_SLIDE_ID = 256  # p:sldId ids start here
+
+
+def rels_name(part_name):
+    folder, name = posixpath.split(part_name)
+    return posixpath.join(folder, "_rels", f"{name}.rels")
+
+
+def parse_rels(data):
+    """Relationships of a .rels part as a list of attribute dicts."""
+    if data is None:
+        return []
+    return [dict(rel.attrib) for rel in ET.fromstring(data).findall(_q("rel:Relationship"))]
+
+
+def rels_xml(rels):
+    body = "".join(
+        "<Relationship" + "".join(f" {key}={quoteattr(value)}" for key, value in rel.items()) + "/>"
+        for rel in rels
+    )
+    return XML_DECLARATION + f'<Relationships xmlns="{NS["rel"]}">{body}</Relationships>'.encode("utf-8")
+
+
+def content_types_xml(defaults, overrides):
+    body = "".join(f"<Default Extension={quoteattr(ext)} ContentType={quoteattr(ct)}/>" for ext, ct in defaults)
+    body += "".join(f"<Override PartName={quoteattr(name)} ContentType={quoteattr(ct)}/>" for name, ct in overrides)
+    return XML_DECLARATION + f'<Types xmlns="{CONTENT_TYPES_NS}">{body}</Types>'.encode("utf-8")
+
+
+def _is_notes(rel):
+    return rel.get("Type", "").endswith("/notesSlide")
+
+
+def notes_parts(package, part_name):
+    """Notes slide parts of a slide."""
+    folder = posixpath.dirname(part_name)
+    return [ooxml.resolve_target(folder, rel["Target"])
+            for rel in parse_rels(package.get(rels_name(part_name))) if _is_notes(rel)]
+
+
+def _placeholder_type(shape):
+    ph = shape.find(f"{_q('p:nvSpPr')}/{_q('p:nvPr')}/{_q('p:ph')}")
+    if ph is None:
+        return None
+    return ph.get("type", "body")  # an untyped placeholder is a body (content) placeholder
+
+
+def text_box_positions(sp_tree):
+    """
+    Positions in p:spTree of the (title, content) shapes: the title and
+    body placeholders when the slide has them, otherwise the first and
+    second text boxes like the COM generator. Either may be None.
+    """
+    shapes = [(i, child) for i, child in enumerate(sp_tree)
+              if child.tag == _q("p:sp") and child.find(_q("p:txBody")) is not None]
+    title = next((i for i, sp in shapes if _placeholder_type(sp) in TITLE_PLACEHOLDERS), None)
+    content = next((i for i, sp in shapes if i != title and _placeholder_type(sp) in CONTENT_PLACEHOLDERS), None)
+    others = [i for i, _ in shapes if i not in (title, content)]
+    if title is None and others:
+        title = others.pop(0)
+    if content is None and others:
+        content = others.pop(0)
+    return title, content
+
+
+class TemplateSlide:
+    """One slide of the template, parsed once and cloned for every deck slide based on it."""
+
+    def __init__(self, package, part_name):
+        self.part_name = part_name
+        self.root, self.namespaces = ooxml.parse_part(package[part_name])
+        self.title, self.content = text_box_positions(self._sp_tree(self.root))
+
+        # Notes pages belong to one slide: the copies go without them
+        rels = parse_rels(package.get(rels_name(part_name)))
+        self.rels = rels_xml([rel for rel in rels if not _is_notes(rel)])
+
+    @staticmethod
+    def _sp_tree(root):
+        return root.find(f"{_q('p:cSld')}/{_q('p:spTree')}")
+
+    def render(self, title_text, contents):
+        """XML of a copy of this slide with the title and content filled in."""
+        root = copy.deepcopy(self.root)
+        sp_tree = self._sp_tree(root)
+        for position, text in ((self.title, title_text), (self.content, "\r".join(contents))):
+            if position is not None:
+                ooxml.set_text(sp_tree[position].find(_q("p:txBody")), text)
+        return ooxml.serialize_part(root, self.namespaces)
+
+
+class PptxTemplate:
+    def __init__(self, path):
+        with zipfile.ZipFile(path) as zf:
+            infos = zf.infolist()
+            package = {info.filename: zf.read(info.filename) for info in infos}
+
+        slide_names = ooxml.slide_part_names(package)
+        if not slide_names:
+            raise ValueError(f"{path} has no slides to use as templates")
+        self.first = TemplateSlide(package, slide_names[0])
+        self.master = TemplateSlide(package, slide_names[min(1, len(slide_names) - 1)])
+        self.last = TemplateSlide(package, slide_names[-1])
+        self.slide_folder = posixpath.dirname(slide_names[0])
+
+        # Every template slide (and its notes) is replaced by the generated ones
+        self.presentation_name = ooxml.presentation_part(package)
+        dropped = set()
+        for name in slide_names:
+            for part in [name] + notes_parts(package, name):
+                dropped.update((part, rels_name(part)))
+        rewritten = {CONTENT_TYPES_NAME, self.presentation_name, rels_name(self.presentation_name)}
+        self.parts = [(info, package[info.filename]) for info in infos
+                      if info.filename not in dropped | rewritten]
+
+        self.presentation, self.presentation_namespaces = ooxml.parse_part(package[self.presentation_name])
+        pres_rels = parse_rels(package.get(rels_name(self.presentation_name)))
+        self.presentation_rels = [rel for rel in pres_rels if rel.get("Type") != SLIDE_RELATIONSHIP]
+        used = [int(rel["Id"][3:]) for rel in pres_rels if rel["Id"].startswith("rId") and rel["Id"][3:].isdigit()]
+        self.next_rel_id = max(used, default=0) + 1
+
+        types = ET.fromstring(package[CONTENT_TYPES_NAME])
+        self.defaults = [(item.get("Extension"), item.get("ContentType"))
+                         for item in types.findall(f"{{{CONTENT_TYPES_NS}}}Default")]
+        self.overrides = [(item.get("PartName"), item.get("ContentType"))
+                          for item in types.findall(f"{{{CONTENT_TYPES_NS}}}Override")
+                          if item.get("PartName").lstrip("/") not in dropped]
+
+    def _presentation_xml(self, slide_rel_ids):
+        root = copy.deepcopy(self.presentation)
+        sld_id_lst = root.find(_q("p:sldIdLst"))
+        if sld_id_lst is None:
+            sld_id_lst = ET.Element(_q("p:sldIdLst"))
+            master_list = root.find(_q("p:sldMasterIdLst"))
+            root.insert(list(root).index(master_list) + 1 if master_list is not None else 0, sld_id_lst)
+        sld_id_lst.clear()
+        for i, rel_id in enumerate(slide_rel_ids):
+            ET.SubElement(sld_id_lst, _q("p:sldId"), {"id": str(FIRST_SLIDE_ID + i), _q("r:id"): rel_id})
+
+        # Sections list the template's slide ids, which no longer exist
+        ext_lst = root.find(_q("p:extLst"))
+        if ext_lst is not None:
+            for ext in list(ext_lst):
+                if any(child.tag.endswith("}sectionLst") for child in ext):
+                    ext_lst.remove(ext)
+        return ooxml.serialize_part(root, self.presentation_namespaces)
+
+    def build(self, slides, output_path):
+        """Write a deck with one slide per {"Title", "Contents"} item of `slides`."""
+        slides = list(slides)
+        names = [posixpath.join(self.slide_folder, f"slide{i}.xml") for i in range(1, len(slides) + 1)]
+        rel_ids = [f"rId{self.next_rel_id + i}" for i in range(len(slides))]
+        presentation_folder = posixpath.dirname(self.presentation_name)
+        presentation_rels = self.presentation_rels + [
+            {"Id": rel_id, "Type": SLIDE_RELATIONSHIP, "Target": posixpath.relpath(name, presentation_folder or ".")}
+            for rel_id, name in zip(rel_ids, names)
+        ]
+        overrides = self.overrides + [(f"/{name}", SLIDE_CONTENT_TYPE) for name in names]
+
+        tmp_path = output_path + ".tmp"
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(CONTENT_TYPES_NAME, content_types_xml(self.defaults, overrides))
+            for info, data in self.parts:
+                zf.writestr(info, data)
+            zf.writestr(self.presentation_name, self._presentation_xml(rel_ids))
+            zf.writestr(rels_name(self.presentation_name), rels_xml(presentation_rels))
+            for i, (name, slide_info) in enumerate(zip(names, slides)):
+                if i == 0:
+                    template = self.first
+                elif i == len(slides) - 1:
+                    template = self.last
+                else:
+                    template = self.master
+                zf.writestr(name, template.render(slide_info.get("Title", ""), slide_info.get("Contents", [])))
+                zf.writestr(rels_name(name), template.rels)
+        os.replace(tmp_path, output_path)
+
+
+@lru_cache(maxsize=8)
+def _load_template(path, mtime_ns):
+    return PptxTemplate(path)
+
+
+def load_template(path):
+    """PptxTemplate for `path`, parsed once per process (again if the file changes)."""
+    path = os.path.abspath(path)
+    return _load_template(path, os.stat(path).st_mtime_ns)
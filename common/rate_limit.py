@@ -0,0 +1,345 @@
+"""
+Client-side rate limiting for the translation APIs.
+
+A RateLimiter keeps one service under its quota for every thread (and
+every TranslationCore) of the process that shares it:
+
+- token buckets for requests per minute and tokens per minute; a request
+  waits until both have room, so sustained throughput sits at the quota
+- adaptive backoff: a 429 halves the request rate and pauses all callers
+  for its Retry-After (or 1, 2, 4... seconds when the server gives none);
+  every success wins a twentieth of the quota back
+- a circuit breaker: after `failure_threshold` consecutive failures
+  (errors, timeouts; 429s are handled by the backoff) every caller is held for `cooldown` seconds, then a single probe request
+  decides whether to close the circuit or hold again for twice as long
+
+metrics() reports requests, waits, throttles and trips; the same figures
+go to the run report counters (ratelimit.*.<name>, circuit.trips.<name>).
+
+Worker processes (common.folder_runner) would each get their own limiter
+and multiply the quota by the worker count. Inside share_state() the
+shared limiters keep their buckets, pause and circuit in a JSON file per
+service, read and written under a file lock at every call, so the quota
+and a tripped breaker hold for the whole pool. Limiters of forked workers
+inherit the file, spawned workers find its folder in RATE_LIMIT_STATE_DIR.
+Times are wall-clock for that reason. Metrics stay per process.
+
+    limiter = shared_limiter("gemini-2.5-pro", requests_per_minute=30, tokens_per_minute=250_000)
+    limiter.acquire(tokens=1200)
+    ... request ...
+    limiter.success()     # or limiter.throttled(retry_after) / limiter.failure()
+"""
+import os
+import re
+import json
+import time
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from common import instrumentation
+from common.translation_cache import file_lock
+
+RETRY_AFTER_PATTERNS = (
+    re.compile(r"retry[-_ ]?after\D{0,5}(\d+(?:\.\d+)?)", re.IGNORECASE),
+    re.compile(r"retry_?delay\W+(?:seconds\W+)?(\d+(?:\.\d+)?)", re.IGNORECASE),
+)
+THROTTLE_NAMES = ("Throttled", "TooManyRequests", "ResourceExhausted", "RateLimitError")
+
+# Folder of the state files shared with worker processes (set by share_state())
+STATE_DIR_ENV = "RATE_LIMIT_STATE_DIR"
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class Throttled(Exception):
+    """The service answered 429 (or its SDK's equivalent); `retry_after` in seconds when it said."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Seconds of a Retry-After header value (None if absent or an HTTP date)."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def throttle_info(error):
+    """(is a throttle, retry-after seconds or None) for an exception raised by a client or SDK."""
+    retry_after = getattr(error, "retry_after", None)
+    response = getattr(error, "response", None)
+    if retry_after is None and response is not None:
+        retry_after = parse_retry_after(getattr(response, "headers", {}).get("Retry-After"))
+    status = getattr(error, "code", None) or getattr(response, "status_code", None)
+    message = str(error)
+    throttled = (
+        isinstance(error, Throttled)
+        or type(error).__name__ in THROTTLE_NAMES
+        or status == 429
+        or message.startswith("429") or "HTTP 429" in message or "RESOURCE_EXHAUSTED" in message
+    )
+    if throttled and retry_after is None:
+        for pattern in RETRY_AFTER_PATTERNS:
+            match = pattern.search(message)
+            if match:
+                retry_after = float(match.group(1))
+                break
+    return throttled, retry_after
+
+
+class TokenBucket:
+    """`per_minute` units per minute, holding up to `capacity` (default: one second's worth, at least 1)."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.ceiling = per_minute / 60.0
+        self.rate = self.ceiling
+        self.capacity = capacity or max(1.0, self.rate)
+        self.level = self.capacity
+        self.updated = time.time()
+
+    def reserve(self, amount, now):
+        """Take `amount` (possibly into debt); returns the seconds to wait before using it."""
+        if not self.rate:
+            return 0.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def state(self):
+        return {"rate": self.rate, "level": self.level, "updated": self.updated}
+
+    def load(self, state):
+        self.rate, self.level, self.updated = state["rate"], state["level"], state["updated"]
+
+
+class RateLimiter:
+    """Shared limiter of one service; see the module docstring. Zero limits mean no quota."""
+
+    # Fields kept in the state file while the limiter is shared between processes
+    SHARED = ("state", "open_until", "probing", "probe_until", "paused_until", "throttle_backoff", "failures",
+              "cooldown")
+    # A probe that has not reported by then (its worker was killed) hands the probe to the next caller
+    PROBE_TIMEOUT = 60.0
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, name="api",
+                 failure_threshold=5, cooldown=15.0, max_cooldown=120.0, min_share=0.1, state_path=None):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.min_share = min_share  # the request rate never drops below this share of the quota
+
+        self.state = "closed"  # closed / open / half-open
+        self.open_until = 0.0
+        self.probing = None  # "pid:thread" of the half-open probe request
+        self.probe_until = 0.0
+        self.paused_until = 0.0
+        self.throttle_backoff = 1.0
+        self.failures = 0  # consecutive
+        self.stats = {"requests": 0, "tokens": 0, "waits": 0, "wait_s": 0.0, "throttled": 0,
+                      "failures": 0, "trips": 0}
+        self._lock = threading.Lock()
+        self.state_path = None
+        if state_path:
+            self.attach(state_path)
+
+    # ---------------- sharing between processes ----------------
+    def attach(self, state_path):
+        """Share the state through `state_path`: the file's state wins if it exists, else this one is written."""
+        with self._lock:
+            self.state_path = state_path
+            with self._synced():
+                pass
+
+    def detach(self):
+        """Stop sharing, keeping the last shared state."""
+        with self._lock:
+            if self.state_path:
+                with file_lock(self.state_path + ".lock"):
+                    self._load_state()
+            self.state_path = None
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return  # not written yet (or torn by a killed worker): keep ours
+        self.requests.load(state["requests"])
+        self.tokens.load(state["tokens"])
+        for field in self.SHARED:
+            setattr(self, field, state[field])
+
+    @contextmanager
+    def _synced(self):
+        """Hold the state file's lock around a change of the state (call under self._lock)."""
+        if not self.state_path:
+            yield
+            return
+        with file_lock(self.state_path + ".lock"):
+            self._load_state()
+            yield
+            state = {"requests": self.requests.state(), "tokens": self.tokens.state()}
+            state.update((field, getattr(self, field)) for field in self.SHARED)
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+
+    # ---------------- admission ----------------
+    def _blocked(self, now):
+        """Seconds to wait before the circuit or a pause lets a request through, None if it may go."""
+        if self.state == "open":
+            if now < self.open_until:
+                return self.open_until - now
+            self.state = "half-open"
+            self.probing = None
+        if self.state == "half-open":
+            caller = f"{os.getpid()}:{threading.get_ident()}"
+            if self.probing and self.probing != caller and now < self.probe_until:
+                return 0.05  # the probe request decides
+            self.probing = caller
+            self.probe_until = now + self.PROBE_TIMEOUT
+        if now < self.paused_until:
+            return self.paused_until - now
+        return None
+
+    def acquire(self, tokens=0):
+        """Wait until a request of `tokens` tokens may start."""
+        start = time.monotonic()
+        reserved = False
+        while True:
+            with self._lock, self._synced():
+                now = time.time()
+                wait = self._blocked(now)
+                if wait is None:
+                    if reserved:
+                        break
+                    wait = max(self.requests.reserve(1, now), self.tokens.reserve(tokens, now))
+                    reserved = True
+                    self.stats["requests"] += 1
+                    self.stats["tokens"] += tokens
+                    if not wait:
+                        break
+            time.sleep(wait)
+
+        waited = time.monotonic() - start
+        if waited > 0.001:
+            with self._lock:
+                self.stats["waits"] += 1
+                self.stats["wait_s"] += waited
+            instrumentation.count(f"ratelimit.waits.{self.name}")
+            instrumentation.count(f"ratelimit.wait_ms.{self.name}", round(waited * 1000))
+
+    # ---------------- outcomes ----------------
+    def success(self):
+        with self._lock, self._synced():
+            self.failures = 0
+            self.throttle_backoff = 1.0
+            if self.state != "closed":
+                print(f"{self.name}: circuit closed, requests resume.")
+            self.state = "closed"
+            self.probing = None
+            self.cooldown = self.base_cooldown
+            # Additive increase back towards the quota
+            bucket = self.requests
+            bucket.rate = min(bucket.ceiling, bucket.rate + bucket.ceiling / 20)
+
+    def throttled(self, retry_after=None):
+        """
+        The service said 429: slow down and pause every caller for
+        Retry-After. A 429 is an answer, not an outage: it does not count
+        towards the circuit breaker.
+        """
+        with self._lock, self._synced():
+            now = time.time()
+            pause = retry_after if retry_after is not None else self.throttle_backoff
+            if now >= self.paused_until:
+                # One slowdown per burst of 429s: those of requests already in flight only extend the pause
+                bucket = self.requests
+                bucket.rate = max(bucket.ceiling * self.min_share, bucket.rate / 2)
+                self.throttle_backoff = min(60.0, self.throttle_backoff * 2)
+            self.paused_until = max(self.paused_until, now + pause)
+            self.stats["throttled"] += 1
+            if self.state == "half-open":
+                self.probing = None  # the next caller probes once the pause is over
+        instrumentation.count(f"ratelimit.throttled.{self.name}")
+
+    def failure(self):
+        with self._lock, self._synced():
+            self._failed(time.time())
+
+    def _failed(self, now):
+        self.failures += 1
+        self.stats["failures"] += 1
+        if self.state == "half-open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.open_until = now + self.cooldown
+            self.probing = None
+            self.stats["trips"] += 1
+            print(f"{self.name}: {self.failures} failures in a row, pausing requests for {self.cooldown:g}s.")
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            instrumentation.count(f"circuit.trips.{self.name}")
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats, wait_s=round(self.stats["wait_s"], 3), state=self.state,
+                        requests_per_minute=round(self.requests.rate * 60, 2))
+
+
+def _state_path(folder, name):
+    return os.path.join(folder, re.sub(r"[^\w.-]", "_", name) + ".json")
+
+
+def shared_limiter(name, requests_per_minute=0, tokens_per_minute=0, **kwargs):
+    """The process-wide RateLimiter of a service, created on first use (shared with the pool inside share_state())."""
+    with _limiters_lock:
+        if name not in _limiters:
+            folder = os.getenv(STATE_DIR_ENV)
+            _limiters[name] = RateLimiter(requests_per_minute, tokens_per_minute, name=name,
+                                          state_path=_state_path(folder, name) if folder else None, **kwargs)
+        return _limiters[name]
+
+
+@contextmanager
+def share_state():
+    """
+    Share the limiters of this process with the worker processes started
+    inside the block (see the module docstring). Nested calls share the
+    outer state.
+    """
+    if os.getenv(STATE_DIR_ENV):
+        yield
+        return
+    folder = tempfile.mkdtemp(prefix="rate_limit_")
+    os.environ[STATE_DIR_ENV] = folder
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    for limiter in limiters:
+        limiter.attach(_state_path(folder, limiter.name))
+    try:
+        yield
+    finally:
+        with _limiters_lock:
+            limiters = list(_limiters.values())
+        for limiter in limiters:
+            limiter.detach()
+        del os.environ[STATE_DIR_ENV]
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def metrics():
+    """{name: metrics} of the shared limiters."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.metrics() for limiter in limiters}
@@ -0,0 +1,49 @@
+"""
+Registry of lazily built translation engines.
+
+Scripts register a factory under a name at import time; the expensive
+object (model weights, API client, cache index) is only built the first
+time get() asks for it, once per process, and is then shared by every
+caller. Importing a script for a fully cached deck therefore never loads
+a model.
+"""
+import threading
+
+_FACTORIES = {}
+_INSTANCES = {}
+_LOCK = threading.RLock()  # factories may get() other entries
+
+
+def register(name, factory):
+    """Register (or replace) the factory for `name`; a built instance is dropped."""
+    with _LOCK:
+        _FACTORIES[name] = factory
+        _INSTANCES.pop(name, None)
+
+
+def get(name):
+    """The instance registered as `name`, building it on first use."""
+    try:
+        return _INSTANCES[name]
+    except KeyError:
+        pass
+    with _LOCK:
+        if name not in _INSTANCES:
+            if name not in _FACTORIES:
+                raise KeyError(f"no translator registered as {name!r}")
+            _INSTANCES[name] = _FACTORIES[name]()
+        return _INSTANCES[name]
+
+
+def is_loaded(name):
+    return name in _INSTANCES
+
+
+def names():
+    return sorted(_FACTORIES)
+
+
+def unload(name):
+    """Forget a built instance so the next get() rebuilds it."""
+    with _LOCK:
+        _INSTANCES.pop(name, None)
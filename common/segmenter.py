@@ -0,0 +1,221 @@
+"""
+Paragraph/run segmentation of the text frames of a deck.
+
+The translation scripts used to read TextRange.Text of a whole shape,
+translate it as one string and assign it back, which sent long
+\\r-joined bullet lists as a single unit and flattened every run to the
+formatting of the first character. Here a text frame is split into
+paragraphs, each paragraph into lines (soft \\v breaks) and the stripped
+lines are the segments to translate: short, deduplicated across the deck,
+and shared with the other decks through the caches.
+
+Translations are written back paragraph by paragraph. When a paragraph
+mixes formatting (a bold lead-in, a red keyword, a link), each span of
+runs with the same formatting is a segment of its own and its translation
+goes back into those runs, so the bold, the colour and the link stay on
+the words they were on. Only when the runs do not add up to the
+paragraph's text (a field or a line break between them) is the paragraph
+translated whole, taking the formatting of its first run.
+
+Works on PowerPoint over COM, the OOXML facade and the fake application
+alike; only TextRange.Paragraphs/Runs/Text/Font are used.
+"""
+
+from common.instrumentation import count, span
+
+PARAGRAPH_MARK = "\r"
+LINE_BREAK = "\x0b"
+
+# Font attributes that make two runs look different
+FONT_ATTRIBUTES = ("Bold", "Italic", "Underline", "Size", "Name")
+
+
+def _strip_mark(text):
+    return text[:-1] if text.endswith(PARAGRAPH_MARK) else text
+
+
+def _split_space(line):
+    """(leading whitespace, core, trailing whitespace) of a line."""
+    core = line.strip()
+    if not core:
+        return line, "", ""
+    start = line.index(core)
+    return line[:start], core, line[start + len(core):]
+
+
+def font_key(text_range):
+    """Comparable summary of a range's formatting (None for what cannot be read)."""
+    try:
+        font = text_range.Font
+    except Exception:
+        return None
+    key = []
+    for name in FONT_ATTRIBUTES:
+        try:
+            key.append(getattr(font, name))
+        except Exception:
+            key.append(None)
+    try:
+        key.append(font.Color.RGB)
+    except Exception:
+        key.append(None)
+    return tuple(key)
+
+
+class Paragraph:
+    """One paragraph of a text frame and the slide it is on."""
+
+    def __init__(self, text_range, slide=0):
+        self.range = text_range
+        self.slide = slide
+        self.text = _strip_mark(text_range.Text or "")
+        self._spans = None
+
+    def segments(self):
+        """The stripped, non-empty lines of the paragraph's pieces."""
+        return [line.strip() for piece in self.pieces() for line in piece.split(LINE_BREAK) if line.strip()]
+
+    def pieces(self):
+        """The texts translated on their own: one per formatting span when they align, else the paragraph."""
+        spans = self.aligned_spans()
+        return [text for _, text in spans] if spans else [self.text]
+
+    def translated(self, translations):
+        """
+        The pieces with every segment replaced by its translation
+        (surrounding whitespace and line breaks kept), None if one is missing.
+        """
+        pieces = []
+        for piece in self.pieces():
+            lines = []
+            for line in piece.split(LINE_BREAK):
+                lead, core, trail = _split_space(line)
+                if core:
+                    core = translations.get(core)
+                    if not core:
+                        return None
+                lines.append(lead + core + trail)
+            pieces.append(LINE_BREAK.join(lines))
+        return pieces
+
+    def spans(self):
+        """
+        Consecutive runs grouped by formatting: [(runs, text)]. Runs that
+        look the same (split by spell-check or language tags) form one span.
+        """
+        if self._spans is not None:
+            return self._spans
+        runs = self.range.Runs()
+        if runs.Count < 2:
+            # A single run: no formatting to compare (saves the font reads over COM)
+            self._spans = [([self.range], self.text)]
+            return self._spans
+        spans = []
+        previous = object()
+        for i in range(1, runs.Count + 1):
+            run = self.range.Runs(i)
+            key = font_key(run)
+            text = _strip_mark(run.Text or "")
+            if spans and key == previous:
+                spans[-1] = (spans[-1][0] + [run], spans[-1][1] + text)
+            else:
+                spans.append(([run], text))
+            previous = key
+        self._spans = spans
+        return spans
+
+    def aligned_spans(self):
+        """The spans of a paragraph that mixes formatting, None if it does not or they miss some of its text."""
+        spans = self.spans()
+        if len(spans) < 2 or "".join(text for _, text in spans) != self.text:
+            return None
+        return spans
+
+
+def frame_paragraphs(text_range, slide=0):
+    """Paragraphs of a text frame that have something to translate."""
+    paragraphs = []
+    for i in range(1, text_range.Paragraphs().Count + 1):
+        paragraph = Paragraph(text_range.Paragraphs(i), slide)
+        if paragraph.segments():
+            paragraphs.append(paragraph)
+    return paragraphs
+
+
+def deck_paragraphs(presentation):
+    """[[Paragraph, ...], ...]: the translatable paragraphs of every text frame of a deck."""
+    frames = []
+    for slide in presentation.Slides:
+        index = slide.SlideIndex
+        with span("slide", slide=index):
+            for shape in slide.Shapes:
+                if shape.HasTextFrame and shape.TextFrame.HasText:
+                    paragraphs = frame_paragraphs(shape.TextFrame.TextRange, index)
+                    if paragraphs:
+                        frames.append(paragraphs)
+    return frames
+
+
+def segment_occurrences(frames):
+    """[(segment, slide)]: every segment of the frames, repeats included, in deck order."""
+    return [
+        (segment, paragraph.slide)
+        for paragraphs in frames for paragraph in paragraphs for segment in paragraph.segments()
+    ]
+
+
+def unique_segments(frames):
+    """(segments, slides): each segment once, in deck order, with the slide it first appears on."""
+    slides = {}
+    for paragraphs in frames:
+        for paragraph in paragraphs:
+            for segment in paragraph.segments():
+                slides.setdefault(segment, paragraph.slide)
+    return list(slides), list(slides.values())
+
+
+def _replace(text_range, text):
+    """Assign text to a range, keeping its paragraph mark (COM ranges include it)."""
+    mark = PARAGRAPH_MARK if (text_range.Text or "").endswith(PARAGRAPH_MARK) else ""
+    text_range.Text = text + mark
+
+
+def write_paragraph(paragraph, pieces):
+    """
+    Put the translated pieces of a paragraph in place: each span's
+    translation into its first run, the other runs of the span emptied.
+    A paragraph translated whole is written as one text and takes the
+    formatting of its first run.
+    """
+    spans = paragraph.aligned_spans()
+    if spans is None:
+        _replace(paragraph.range, "".join(pieces))
+        return
+    # Right to left: over COM, writing a run shifts the ranges after it
+    for (runs, _), piece in reversed(list(zip(spans, pieces))):
+        for run in reversed(runs[1:]):
+            _replace(run, "")
+        _replace(runs[0], piece)
+
+
+def apply_translations(frames, translations):
+    """
+    Write {segment: translation} back into the frames of deck_paragraphs().
+    Paragraphs with an untranslated segment keep their original text.
+    Returns the number of such paragraphs.
+    """
+    missing = written = 0
+    with span("write_back") as attrs:
+        for paragraphs in frames:
+            for paragraph in reversed(paragraphs):
+                pieces = paragraph.translated(translations)
+                if pieces is None:
+                    missing += 1
+                    print(f"Warning: no translation for '{paragraph.text.strip()[:50]}', keeping the original text.")
+                elif "".join(pieces) != paragraph.text:
+                    write_paragraph(paragraph, pieces)
+                    written += 1
+        attrs.update(paragraphs=written, missing=missing)
+    count("paragraphs.written", written)
+    count("paragraphs.missing", missing)
+    return missing
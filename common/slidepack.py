@@ -0,0 +1,405 @@
+"""
+Slide pack: a versioned, columnar binary file for the slide text of one
+deck or a whole course library, next to the TXT and JSON stages.
+
+One row per paragraph, five columns:
+
+    slide      uint32  slide number
+    shape      uint32  0 for the title, 1 for the contents (TXT/JSON slots)
+    paragraph  uint32  index of the paragraph in its shape
+    source     str     original text
+    target     str     translated text ("" when not known)
+
+Layout (little-endian, sections 8-byte aligned):
+
+    header     magic b"SLPK", version u16, column count u16, row count u32,
+               metadata length u32
+    metadata   UTF-8 JSON: the decks of the pack (name, row range and how
+               to rebuild each text column as TXT or JSON)
+    directory  per column: name (16 bytes), kind u8, offset u64, size u64
+    columns    uint32 arrays; strings as uint32 end offsets + UTF-8 bytes
+
+SlidePack maps the file and reads columns in place (memoryview over
+mmap), decoding a string only when it is asked for. The TXT reader
+keeps the file's newline, lone \\r paragraph separators, continuation
+lines, multi-line titles and unbulleted rows (recorded in the deck's
+layout), so TXT -> pack -> TXT and JSON -> pack -> JSON give back identical
+files; a TXT that the pack could not rebuild exactly is rejected instead
+of being silently changed.
+"""
+import os
+import re
+import sys
+import json
+import mmap
+import struct
+from array import array
+
+MAGIC = b"SLPK"
+VERSION = 1
+EXTENSION = ".slpk"
+
+HEADER = struct.Struct("<4sHHII")
+DIRECTORY_ENTRY = struct.Struct("<16sB7xQQ")
+
+UINT32, STRING = 0, 1
+COLUMNS = (("slide", UINT32), ("shape", UINT32), ("paragraph", UINT32), ("source", STRING), ("target", STRING))
+TEXT_COLUMNS = ("source", "target")
+
+TITLE_SHAPE = 0
+CONTENT_SHAPE = 1
+
+SLIDE_LINE = re.compile(r"^Slide (\d+):$")
+
+
+class SlidePackError(ValueError):
+    """A file is not a slide pack, or a TXT/JSON file cannot be packed losslessly."""
+
+
+# ---------------- TXT / JSON <-> rows ----------------
+def _uint32_array(values):
+    column = array("I", values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def format_txt(slides, newline="\n", final_newline=True, bare=(), open_slides=()):
+    """
+    TXT text of [(slide number, title, [content rows])], in the save_slide_txt
+    layout. `bare` lists the (slide position, row) pairs written without the
+    "- " bullet and `open_slides` the slide positions without the blank line
+    after them, as recorded by parse_txt.
+    """
+    bare = {tuple(item) for item in bare}
+    open_slides = set(open_slides)
+    lines = []
+    for position, (number, title, contents) in enumerate(slides):
+        lines += [f"Slide {number}:"] + f"Title: {title}".split("\n") + ["Contents:"]
+        for row, text in enumerate(contents):
+            lines.extend((text if (position, row) in bare else "- " + text).split("\n"))
+        if position not in open_slides:
+            lines.append("")  # blank line between slides
+    text = newline.join(lines)
+    return text + newline if final_newline and lines else text
+
+
+def parse_txt(text):
+    """
+    Slides of a TXT written by save_slide_txt (or translated from one) and
+    the layout needed to write it back byte for byte:
+    ([(slide number, title, [content rows])], layout).
+
+    Lines that do not start with "- " continue the previous content row
+    (joined with \n), so multi-line shape text stays one row, including a
+    line starting with "Slide " or "Title:" inside it. Lines between
+    "Title:" and "Contents:" continue the title. Rows with no bullet and
+    slides with no blank line after them are recorded in the layout.
+    """
+    newline = "\r\n" if "\r\n" in text else "\n"
+    final_newline = text.endswith(newline)
+    lines = text[:-len(newline)].split(newline) if final_newline else text.split(newline)
+    if lines == [""]:
+        lines = []
+
+    slides, bare, open_slides = [], [], []
+    i = 0
+    while i < len(lines):
+        match = SLIDE_LINE.match(lines[i])
+        if not match or i + 1 >= len(lines) or not lines[i + 1].startswith("Title:"):
+            raise SlidePackError(f"line {i + 1}: expected a 'Slide N:' line followed by 'Title:'")
+        title_lines = [lines[i + 1][len("Title: "):] if lines[i + 1].startswith("Title: ") else None]
+        if title_lines[0] is None:
+            raise SlidePackError(f"line {i + 2}: expected 'Title: '")
+        i += 2
+        while i < len(lines) and lines[i] != "Contents:":
+            if SLIDE_LINE.match(lines[i]):
+                raise SlidePackError(f"line {i + 1}: slide {match.group(1)} has no 'Contents:' line")
+            title_lines.append(lines[i])
+            i += 1
+        i += 1
+        block = []
+        while i < len(lines) and not SLIDE_LINE.match(lines[i]):
+            block.append(lines[i])
+            i += 1
+        if block and block[-1] == "":
+            block.pop()  # the blank separator line
+        else:
+            open_slides.append(len(slides))
+        contents = []
+        for line in block:
+            if line.startswith("- "):
+                contents.append(line[2:])
+            elif contents:
+                contents[-1] += "\n" + line
+            else:
+                bare.append([len(slides), len(contents)])
+                contents.append(line)
+        slides.append((int(match.group(1)), "\n".join(title_lines), contents))
+
+    layout = {"format": "txt", "newline": newline, "final_newline": final_newline}
+    if bare:
+        layout["bare"] = bare
+    if open_slides:
+        layout["open_slides"] = open_slides
+    if render_slides(slides, layout) != text:
+        raise SlidePackError("the TXT layout cannot be reproduced exactly")
+    return slides, layout
+
+
+def slides_to_rows(slides):
+    """[(slide, shape, paragraph, text)] for [(slide number, title, [content rows])]."""
+    rows = []
+    for number, title, contents in slides:
+        rows.append((number, TITLE_SHAPE, 0, title))
+        rows.extend((number, CONTENT_SHAPE, i, text) for i, text in enumerate(contents))
+    return rows
+
+
+def rows_to_slides(rows):
+    slides = []
+    for number, shape, _, text in rows:
+        if shape == TITLE_SHAPE:
+            slides.append((number, text, []))
+        else:
+            slides[-1][2].append(text)
+    return slides
+
+
+def json_to_slides(data):
+    """Slides of an AD-Json dict ({"Slide N": {"Title", "Contents"}})."""
+    slides = []
+    for key, slide in data.items():
+        match = re.fullmatch(r"Slide (\d+)", key)
+        if not match or set(slide) != {"Title", "Contents"}:
+            raise SlidePackError(f"{key!r}: not an AD-Json slide")
+        slides.append((int(match.group(1)), slide["Title"], list(slide["Contents"])))
+    return slides
+
+
+def slides_to_json(slides):
+    return {f"Slide {number}": {"Title": title, "Contents": contents} for number, title, contents in slides}
+
+
+def format_json(data):
+    """Same bytes as ConvertTxtToJson's save_json."""
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def read_slides(path):
+    """(slides, layout) of a TXT or JSON file; layout says how to write it back."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        text = f.read()
+    if path.lower().endswith(".json"):
+        slides = json_to_slides(json.loads(text))
+        if format_json(slides_to_json(slides)) != text:
+            raise SlidePackError(f"{path}: the JSON layout cannot be reproduced exactly")
+        return slides, {"format": "json"}
+    try:
+        return parse_txt(text)
+    except SlidePackError as e:
+        raise SlidePackError(f"{path}: {e}") from None
+
+
+def render_slides(slides, layout):
+    """The file text of `slides` in a layout from read_slides."""
+    if layout["format"] == "json":
+        return format_json(slides_to_json(slides))
+    return format_txt(slides, layout["newline"], layout["final_newline"],
+                      layout.get("bare", ()), layout.get("open_slides", ()))
+
+
+# ---------------- WRITING ----------------
+def _pad(size):
+    return -size % 8
+
+
+def write_pack(path, decks):
+    """
+    Write decks to a pack. Each deck is a dict with "name", "rows"
+    ([(slide, shape, paragraph, source, target)]) and "layouts"
+    ({text column: layout from read_slides}) for the columns that can be
+    written back as files.
+    """
+    meta_decks, slide, shape, paragraph, texts = [], [], [], [], {name: [] for name in TEXT_COLUMNS}
+    for deck in decks:
+        start = len(slide)
+        for row in deck["rows"]:
+            slide.append(row[0])
+            shape.append(row[1])
+            paragraph.append(row[2])
+            texts["source"].append(row[3])
+            texts["target"].append(row[4])
+        meta_decks.append({"name": deck["name"], "rows": [start, len(slide)], "layouts": deck.get("layouts", {})})
+
+    sections = {"slide": [_uint32_array(slide).tobytes()], "shape": [_uint32_array(shape).tobytes()],
+                "paragraph": [_uint32_array(paragraph).tobytes()]}
+    for name in TEXT_COLUMNS:
+        encoded = [text.encode("utf-8") for text in texts[name]]
+        ends, total = [], 0
+        for data in encoded:
+            total += len(data)
+            ends.append(total)
+        offsets = _uint32_array(ends).tobytes()
+        sections[name] = [offsets, b"\0" * _pad(len(offsets)), b"".join(encoded)]
+
+    meta = json.dumps({"decks": meta_decks}, ensure_ascii=False).encode("utf-8")
+    offset = HEADER.size + len(meta) + _pad(HEADER.size + len(meta)) + DIRECTORY_ENTRY.size * len(COLUMNS)
+    directory, body = [], []
+    for name, kind in COLUMNS:
+        data = b"".join(sections[name])
+        directory.append(DIRECTORY_ENTRY.pack(name.encode("ascii"), kind, offset, len(data)))
+        body += [data, b"\0" * _pad(len(data))]
+        offset += len(data) + _pad(len(data))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(COLUMNS), len(slide), len(meta)))
+        f.write(meta + b"\0" * _pad(HEADER.size + len(meta)))
+        f.writelines(directory)
+        f.writelines(body)
+    os.replace(tmp_path, path)
+
+
+def deck_from_files(name, source_path, target_path=None):
+    """
+    A deck for write_pack from a TXT/JSON file and, optionally, its
+    translation. The target column is only filled when both files have the
+    same slides and paragraphs; otherwise it stays empty (and has no layout).
+    """
+    slides, layout = read_slides(source_path)
+    rows = [row + ("",) for row in slides_to_rows(slides)]
+    layouts = {"source": layout}
+    if target_path:
+        target_slides, target_layout = read_slides(target_path)
+        target_rows = slides_to_rows(target_slides)
+        if [row[:3] for row in target_rows] == [row[:3] for row in rows]:
+            rows = [row[:4] + (target[3],) for row, target in zip(rows, target_rows)]
+            layouts["target"] = target_layout
+    return {"name": name, "rows": rows, "layouts": layouts}
+
+
+def deck_from_slides_data(name, slides_data):
+    """A deck for write_pack from extract_lines_from_ppt() output, rendered like save_slide_txt."""
+    slides = [(slide["slide_number"], slide["title"], list(slide["content"])) for slide in slides_data]
+    rows = [row + ("",) for row in slides_to_rows(slides)]
+    layout = {"format": "txt", "newline": os.linesep, "final_newline": True}
+    return {"name": name, "rows": rows, "layouts": {"source": layout}}
+
+
+# ---------------- READING ----------------
+class StringColumn:
+    """Sequence view of a string column; each item is decoded on access."""
+
+    def __init__(self, ends, data):
+        self._ends = ends
+        self._data = data
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        start = self._ends[index - 1] if index else 0
+        return str(self._data[start:self._ends[index]], "utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class SlidePack:
+    """
+    Read-only, memory-mapped slide pack.
+
+        with SlidePack("library.slpk") as pack:
+            for name in pack.decks:
+                text = pack.render(name)          # the original TXT/JSON
+                sources = pack.column("source")   # lazy, in place
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._views = []
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, column_count, self.row_count, meta_size = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise SlidePackError(f"{path} is not a slide pack")
+            if version > VERSION:
+                raise SlidePackError(f"{path} is a version {version} slide pack, this reader knows up to {VERSION}")
+            meta = json.loads(bytes(self._map[HEADER.size:HEADER.size + meta_size]).decode("utf-8"))
+        except Exception:
+            self.close()
+            raise
+        self.decks = {deck["name"]: deck for deck in meta["decks"]}
+        self._directory = {}
+        position = HEADER.size + meta_size + _pad(HEADER.size + meta_size)
+        for _ in range(column_count):
+            name, kind, offset, size = DIRECTORY_ENTRY.unpack_from(self._map, position)
+            self._directory[name.rstrip(b"\0").decode("ascii")] = (kind, offset, size)
+            position += DIRECTORY_ENTRY.size
+        self._columns = {}
+
+    def _view(self, offset, size, fmt="B"):
+        view = memoryview(self._map)[offset:offset + size]
+        if fmt != "B":
+            if sys.byteorder == "big":
+                swapped = array(fmt, view.tobytes())
+                swapped.byteswap()
+                return swapped
+            view = view.cast(fmt)
+        self._views.append(view)
+        return view
+
+    def column(self, name):
+        """A whole column: a uint32 memoryview or a StringColumn."""
+        if name not in self._columns:
+            kind, offset, size = self._directory[name]
+            if kind == UINT32:
+                self._columns[name] = self._view(offset, size, "I")
+            else:
+                ends = self._view(offset, 4 * self.row_count, "I")
+                start = offset + 4 * self.row_count + _pad(4 * self.row_count)
+                self._columns[name] = StringColumn(ends, self._view(start, offset + size - start))
+        return self._columns[name]
+
+    def rows(self, deck):
+        """[(slide, shape, paragraph, source, target)] of one deck."""
+        start, end = self.decks[deck]["rows"]
+        columns = [self.column(name) for name, _ in COLUMNS]
+        return list(zip(*(column[start:end] for column in columns)))
+
+    def slides(self, deck, column="source"):
+        """[(slide number, title, [content rows])] of a deck, for one text column."""
+        index = TEXT_COLUMNS.index(column) + 3
+        return rows_to_slides([row[:3] + (row[index],) for row in self.rows(deck)])
+
+    def render(self, deck, column="source", layout=None):
+        """The deck's text column as the TXT/JSON file it was packed from (or in `layout`)."""
+        layout = layout or self.decks[deck]["layouts"].get(column)
+        if layout is None:
+            raise SlidePackError(f"{deck}: the {column} column was not packed from a file")
+        return render_slides(self.slides(deck, column), layout)
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._columns = {}
+        if getattr(self, "_map", None) is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # a caller still holds a slice of a column; unmapped once it is freed
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,265 @@
+"""
+Local HTTP stand-ins for the translation services, for offline runs.
+
+    with google_translate_standin() as url:
+        GoogleTranslateDriver(base_url=url).translate_many([...])
+
+Two services are mimicked:
+
+    Google Translate  GET /m?sl=..&tl=..&q=.. answered with the HTML shape
+                      of translate.google.com/m (what deep_translator's
+                      GoogleTranslator and common.google_translate parse)
+    Gemini            POST /v1beta/models/<model>:generateContent, the REST
+                      call behind genai's generate_content; [TXT_nnn]
+                      requests are answered chunk by chunk, a plain prompt
+                      with the text after its last blank line
+
+Both can inject faults to reproduce load behaviour: a fixed latency plus
+jitter per request, a share of 503 answers, and a requests-per-minute cap
+answered with 429 and Retry-After. The servers count what they answered
+(requests, errors, throttled).
+
+Run them for the scripts with
+
+    python -m common.standin_servers --latency 50 --error-rate 0.05 --rate-limit 300
+
+which prints the environment that points the scripts at them
+(GOOGLE_TRANSLATE_URL, GEMINI_API_ENDPOINT) and at a scratch cache.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import signal
+import argparse
+import tempfile
+import threading
+from collections import deque
+from contextlib import contextmanager, ExitStack
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+CHUNK_PATTERN = re.compile(r"(\[TXT_\d+\])(.*?)(?=\[TXT_\d+\]|\Z)", re.DOTALL)
+TARGET_PATTERN = re.compile(r"Translate the following text to (\S+)")
+GENERATE_PATH = re.compile(r"^/v1(?:beta)?/models/([^/:]+):generateContent$")
+
+
+def fake_translation(text, target):
+    """Deterministic 'translation' used by the stand-ins."""
+    return f"[{target}] {text}"
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Common part of the stand-ins: fault injection and the server's counters."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+    disable_nagle_algorithm = True  # headers and body go out as two writes
+
+    def send_body(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_body(self, status, message, headers=()):
+        self.send_body(status, message.encode("utf-8"), "text/plain; charset=utf-8", headers)
+
+    def fault(self):
+        """
+        Count the request, apply latency, then answer it with an injected
+        fault if one is due. Returns True when the request was answered.
+        """
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            delay = server.latency + server.jitter * server.rng.random()
+            fail = server.rng.random() < server.error_rate
+            retry_after = server.throttle(time.monotonic())
+            if retry_after is not None:
+                server.throttled += 1
+            elif fail:
+                server.errors += 1
+        if delay:
+            time.sleep(delay)
+        if retry_after is not None:
+            self.send_error_body(429, "Too Many Requests", [("Retry-After", str(max(1, round(retry_after))))])
+            return True
+        if fail:
+            self.send_error_body(503, "Service Unavailable")
+            return True
+        return False
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GoogleTranslateHandler(StandinHandler):
+    """Answers GET /m?sl=..&tl=..&q=.. with the HTML shape of translate.google.com/m."""
+
+    def do_GET(self):
+        if self.fault():
+            return
+        query = parse_qs(urlparse(self.path).query)
+        text = query.get("q", [""])[0]
+        target = query.get("tl", ["en"])[0]
+        body = (
+            "<html><body><div class=\"result-container\">"
+            f"{escape(self.server.translate(text, target))}"
+            "</div></body></html>"
+        ).encode("utf-8")
+        self.send_body(200, body, "text/html; charset=utf-8")
+
+
+def gemini_reply(prompt, translate):
+    """The model's answer to a prompt: [TXT_nnn] chunks translated one by one, or the prompt's text."""
+    chunks = CHUNK_PATTERN.findall(prompt)
+    if chunks:
+        return "\n\n".join(f"{chunk_id} {translate(text.strip(), 'vi')}" for chunk_id, text in chunks)
+    target = TARGET_PATTERN.search(prompt)
+    return translate(prompt.rsplit("\n\n", 1)[-1].strip(), target.group(1) if target else "vi")
+
+
+class GeminiHandler(StandinHandler):
+    """Answers POST /v1beta/models/<model>:generateContent like the Gemini REST API."""
+
+    STATUSES = {400: "INVALID_ARGUMENT", 404: "NOT_FOUND", 429: "RESOURCE_EXHAUSTED", 503: "UNAVAILABLE"}
+
+    def send_error_body(self, status, message, headers=()):
+        # Google APIs report errors as {"error": {code, message, status}}
+        body = json.dumps({"error": {"code": status, "message": message, "status": self.STATUSES.get(status, "UNKNOWN")}})
+        self.send_body(status, body.encode("utf-8"), "application/json; charset=utf-8", headers)
+
+    def do_POST(self):
+        payload = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not GENERATE_PATH.match(urlparse(self.path).path):
+            self.send_error_body(404, "Not Found")
+            return
+        if self.fault():
+            return
+        try:
+            request = json.loads(payload or b"{}")
+            parts = [part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", [])]
+        except (ValueError, AttributeError):
+            self.send_error_body(400, "Invalid JSON payload")
+            return
+        text = gemini_reply(parts[-1] if parts else "", self.server.translate)
+        body = json.dumps({
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": sum(len(part) for part in parts) // 4,
+                              "candidatesTokenCount": len(text) // 4},
+        }, ensure_ascii=False).encode("utf-8")
+        self.send_body(200, body, "application/json; charset=utf-8")
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, translate=fake_translation, latency=0.0, jitter=0.0,
+                 error_rate=0.0, rate_limit=0, seed=0):
+        super().__init__(address, handler)
+        self.translate = translate
+        self.latency = latency  # seconds added to every request
+        self.jitter = jitter  # up to this many more seconds, at random
+        self.error_rate = error_rate  # share of requests answered 503
+        self.rate_limit = rate_limit  # requests per minute before 429 (0: no limit)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window = deque()  # start times of the requests of the last minute
+        self.requests = self.errors = self.throttled = 0
+
+    def throttle(self, now):
+        """Seconds until a slot frees up if the request is over the rate limit, else None (call under lock)."""
+        if not self.rate_limit:
+            return None
+        while self.window and now - self.window[0] >= 60:
+            self.window.popleft()
+        if len(self.window) >= self.rate_limit:
+            return 60 - (now - self.window[0])
+        self.window.append(now)
+        return None
+
+    def stats(self):
+        return {"requests": self.requests, "errors": self.errors, "throttled": self.throttled}
+
+
+@contextmanager
+def serve(handler, port=0, **attrs):
+    server = StandinServer(("127.0.0.1", port), handler, **attrs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def google_translate_standin(translate=fake_translation, **faults):
+    """Run the Google Translate stand-in; yields its base URL (…/m)."""
+    with serve(GoogleTranslateHandler, translate=translate, **faults) as server:
+        yield f"http://127.0.0.1:{server.server_address[1]}/m"
+
+
+@contextmanager
+def gemini_standin(translate=fake_translation, **faults):
+    """Run the Gemini stand-in; yields its API endpoint (for GEMINI_API_ENDPOINT)."""
+    with serve(GeminiHandler, translate=translate, **faults) as server:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Google Translate and Gemini stand-ins until Ctrl-C.")
+    parser.add_argument("--google-port", type=int, default=0)
+    parser.add_argument("--gemini-port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="ms added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many more ms, at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 503")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per minute per service before 429")
+    parser.add_argument("--dictionary", help="JSON {source: translation} to answer from (others are echoed)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    dictionary = {}
+    if args.dictionary:
+        from common.mock_engines import load_dictionary
+        dictionary = load_dictionary(args.dictionary)
+
+    def translate(text, target):
+        return dictionary.get(text) or fake_translation(text, target)
+
+    faults = {"latency": args.latency / 1000, "jitter": args.jitter / 1000, "error_rate": args.error_rate,
+              "rate_limit": args.rate_limit, "seed": args.seed}
+    with ExitStack() as stack:
+        google = stack.enter_context(serve(GoogleTranslateHandler, args.google_port, translate=translate, **faults))
+        gemini = stack.enter_context(serve(GeminiHandler, args.gemini_port, translate=translate, **faults))
+        scratch = os.path.join(tempfile.gettempdir(), "standin_translation_cache.jsonl")
+        print("# Point the scripts at the stand-ins (and keep their answers out of the real cache):")
+        print(f"export GOOGLE_TRANSLATE_URL=http://127.0.0.1:{google.server_address[1]}/m")
+        print(f"export GEMINI_API_ENDPOINT=http://127.0.0.1:{gemini.server_address[1]}")
+        print("export GEMINI_API_KEY=standin")
+        print(f"export TRANSLATION_CACHE_FILE={scratch}")
+        print("export TRANSLATION_MEMORY=0")
+        sys.stdout.flush()
+        signal.signal(signal.SIGTERM, signal.default_int_handler)  # `kill` stops it like Ctrl-C
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        print(f"\nGoogle Translate: {google.stats()}")
+        print(f"Gemini: {gemini.stats()}")
+
+
+if __name__ == "__main__":
+    main()
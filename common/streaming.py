@@ -0,0 +1,49 @@
+"""
+Building blocks for generator pipelines: loading the stage scripts (which
+all live in files named script.py) and running a stage in the background.
+"""
+import os
+import queue
+import threading
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_DONE = object()
+
+
+def load_stage(relative_path, name=None):
+    """Import a stage script such as "ConvertPPTXToTXT/script.py" by path."""
+    path = os.path.join(ROOT, relative_path)
+    name = name or os.path.dirname(relative_path).strip("./").replace("/", "_").lower() + "_script"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def background(iterable, buffer_size=4):
+    """
+    Consume `iterable` on a worker thread, at most `buffer_size` items
+    ahead of the caller, so upstream stages (translation) keep running while
+    the caller works on earlier items. Errors are re-raised in the caller.
+    """
+    items = queue.Queue(maxsize=buffer_size)
+
+    def produce():
+        try:
+            for item in iterable:
+                items.put((item, None))
+        except BaseException as e:
+            items.put((_DONE, e))
+        else:
+            items.put((_DONE, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item, error = items.get()
+        if item is _DONE:
+            if error is not None:
+                raise error
+            return
+        yield item
@@ -0,0 +1,248 @@
+"""
+Append-only translation cache shared by every engine.
+
+Entries live in one JSON-lines log (translation_cache.jsonl by default) and
+in an in-memory index keyed by (source language, target language, model,
+text), so the NLLB, Gemini and Google paths never overwrite each other.
+A new translation costs one appended line instead of rewriting the whole
+JSON file; lines are written and fsync'ed in batches, a torn last line from
+a crash is ignored on load, and compaction (on close, once superseded lines
+pile up) rewrites the log atomically (temp file + os.replace).
+
+Several processes (folder_runner workers, concurrent runs) may share the
+log. Appends and compaction hold an exclusive lock on <log>.lock, and
+each process first reads the lines the others appended since it last
+looked, so a compaction keeps their entries instead of dropping them.
+"""
+import os
+import json
+import atexit
+import threading
+from contextlib import contextmanager
+
+from common.instrumentation import span
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_CACHE_FILE = os.getenv("TRANSLATION_CACHE_FILE", "translation_cache.jsonl")
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock between processes on the file `path` (created if missing)."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after ~10 s; keep waiting
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class TranslationCache:
+    def __init__(self, path=DEFAULT_CACHE_FILE, flush_every=32, compact_ratio=2.0):
+        self.path = os.path.abspath(path)
+        self.flush_every = flush_every
+        self.compact_ratio = compact_ratio
+        self.index = {}
+        self.imported = set()
+        self._pending = []
+        self._pending_keys = set()  # entries put here and not written yet
+        self._log_lines = 0
+        self._offset = 0  # bytes of the log read into the index so far
+        self._file_id = None  # (device, inode) of the log file read
+        self._lock = threading.RLock()
+        self._lock_path = self.path + ".lock"
+        with span("cache_load", file=self.path):
+            self._read_tail()
+        atexit.register(self.close)
+
+    # ---------------- LOAD ----------------
+    def _read_tail(self):
+        """Merge the complete lines appended to the log since the last read (by any process)."""
+        if not os.path.exists(self.path):
+            self._offset = 0
+            return
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if (st.st_dev, st.st_ino) != self._file_id or st.st_size < self._offset:
+                # Another process compacted the log into a new file: read it all again
+                self._file_id = (st.st_dev, st.st_ino)
+                self._offset = self._log_lines = 0
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # a line still being written is read next time
+        for line in data[:end].decode("utf-8", "replace").splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn line from an interrupted write
+            self._log_lines += 1
+            if "import" in record:
+                self.imported.add(record["import"])
+            else:
+                key = (record["s"], record["t"], record["m"], record["k"])
+                if key not in self._pending_keys:  # our unwritten value is the newer one
+                    self.index[key] = record["v"]
+        self._offset += end
+
+    def import_json(self, json_path, src, tgt, model, pairs=None):
+        """
+        One-time migration of a legacy {text: translation} JSON cache; the
+        import is recorded in the log so it is not repeated on later runs.
+        `pairs` can turn the legacy mapping into (text, translation) pairs
+        when its keys are not plain segments.
+        """
+        json_path = os.path.abspath(json_path)
+        with self._lock:
+            if json_path in self.imported or not os.path.exists(json_path):
+                return 0
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    legacy = json.load(f)
+            except json.JSONDecodeError:
+                print(f"⚠️ Legacy cache {json_path} is corrupt, skipping import.")
+                legacy = {}
+            count = 0
+            for text, translation in (pairs(legacy) if pairs else legacy.items()):
+                if (src, tgt, model, text) not in self.index:
+                    self.put(text, translation, src, tgt, model)
+                    count += 1
+            self.imported.add(json_path)
+            self._append({"import": json_path})
+            self.flush()
+            return count
+
+    # ---------------- READ / WRITE ----------------
+    def get(self, text, src, tgt, model, default=None):
+        return self.index.get((src, tgt, model, text), default)
+
+    def put(self, text, translation, src, tgt, model):
+        key = (src, tgt, model, text)
+        with self._lock:
+            if self.index.get(key) == translation:
+                return
+            self.index[key] = translation
+            self._pending_keys.add(key)
+            self._append({"s": src, "t": tgt, "m": model, "k": text, "v": translation})
+
+    def _append(self, record):
+        self._pending.append(json.dumps(record, ensure_ascii=False) + "\n")
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self, fsync=True):
+        """Write pending lines with a single append and fsync them."""
+        with self._lock:
+            if not self._pending:
+                return
+            data = "".join(self._pending).encode("utf-8")
+            with span("cache_flush", lines=len(self._pending)), file_lock(self._lock_path):
+                self._read_tail()
+                fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    size = os.fstat(fd).st_size
+                    if size > self._offset:
+                        data = b"\n" + data  # end a torn line first, so ours stay whole
+                    os.write(fd, data)
+                    if fsync:
+                        os.fsync(fd)
+                finally:
+                    os.close(fd)
+                self._offset = size + len(data)
+            self._log_lines += len(self._pending)
+            self._pending = []
+            self._pending_keys = set()
+
+    def compact(self):
+        """
+        Rewrite the log with one line per live entry, atomically, including
+        the entries other processes appended since this one last read it.
+        """
+        with self._lock, file_lock(self._lock_path):
+            self._read_tail()
+            records = [{"import": path} for path in sorted(self.imported)]
+            records += [{"s": s, "t": t, "m": m, "k": k, "v": v} for (s, t, m, k), v in self.index.items()]
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._log_lines = len(records)
+            st = os.stat(self.path)
+            self._file_id, self._offset = (st.st_dev, st.st_ino), st.st_size
+            self._pending = []
+            self._pending_keys = set()
+
+    def close(self):
+        """Flush, and compact once superseded lines outweigh live entries."""
+        self.flush()
+        if self._log_lines > self.compact_ratio * max(len(self.index), 1) + self.flush_every:
+            self.compact()
+
+    def view(self, src, tgt, model):
+        return CacheView(self, src, tgt, model)
+
+
+class CacheView:
+    """Dict-like window on the store for one (src, tgt, model) combination."""
+
+    def __init__(self, store, src, tgt, model):
+        self.store = store
+        self.src = src
+        self.tgt = tgt
+        self.model = model
+
+    def __contains__(self, text):
+        return (self.src, self.tgt, self.model, text) in self.store.index
+
+    def __getitem__(self, text):
+        value = self.store.get(text, self.src, self.tgt, self.model)
+        if value is None:
+            raise KeyError(text)
+        return value
+
+    def __setitem__(self, text, translation):
+        self.store.put(text, translation, self.src, self.tgt, self.model)
+
+    def get(self, text, default=None):
+        return self.store.get(text, self.src, self.tgt, self.model, default)
+
+    def __len__(self):
+        return sum(1 for key in self.store.index if key[:3] == (self.src, self.tgt, self.model))
+
+    def import_json(self, json_path):
+        return self.store.import_json(json_path, self.src, self.tgt, self.model)
+
+    def flush(self):
+        self.store.flush()
+
+
+def open_cache(path=DEFAULT_CACHE_FILE, **kwargs):
+    """Return the process-wide store for `path`, opening it on first use."""
+    path = os.path.abspath(path)
+    with _STORES_LOCK:
+        if path not in _STORES:
+            _STORES[path] = TranslationCache(path, **kwargs)
+        return _STORES[path]
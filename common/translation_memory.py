@@ -0,0 +1,359 @@
+"""
+Translation memory: reuse translations of near-duplicate segments.
+
+The course decks repeat boilerplate with small variations ("Topic 1:
+Coverage" / "Topic 2: Coverage", agenda lines, study-task headings) that
+the exact-match caches miss. The memory answers such segments without a
+model or API call, in three steps:
+
+1. exact       the segment itself is known
+2. placeholder the segment matches a known one once numbers and topic
+               names are replaced by placeholders ("Topic {N0}: {T0}");
+               the new values are substituted into the stored translation
+               (topic names through their own exact translation)
+3. fuzzy       a MinHash/LSH index over character trigrams finds
+               candidates, and the closest one is reused when its
+               similarity reaches `threshold`
+
+The fuzzy step is off unless TRANSLATION_MEMORY_FUZZY=1: a character ratio
+cannot tell "must submit" from "must not submit", so its hits are printed
+for review when it is on.
+
+Each engine model gets its own memory, built from that model's entries in
+the shared cache store (which holds the model's imported legacy cache too),
+so a Gemini run never reuses NLLB or Google output. The bundled English /
+Vietnamese TXT folders are no engine's output: they are only added with
+TRANSLATION_MEMORY_REFERENCE=1. A memory is built once per process, when
+its engine first has cache misses. Set TRANSLATION_MEMORY=0 to disable it.
+"""
+import os
+import re
+import zlib
+import random
+import difflib
+import unicodedata
+from collections import Counter, defaultdict
+
+from common import instrumentation, registry
+from common.manifest import split_txt_slides, translatable_text
+from common.translation_cache import open_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENABLED = os.getenv("TRANSLATION_MEMORY", "1") != "0"
+FUZZY = os.getenv("TRANSLATION_MEMORY_FUZZY", "0") == "1"
+REFERENCE = os.getenv("TRANSLATION_MEMORY_REFERENCE", "0") == "1"
+FUZZY_THRESHOLD = 0.92
+
+# Language codes used by the engines for the same target
+TARGET_ALIASES = {"vi": {"vi", "vie_Latn"}}
+
+# Script every letter of a translation must use; the memory spreads a bad
+# translation to many segments, so e.g. mis-forced NLLB output is left out
+TARGET_SCRIPTS = {"vi": "LATIN"}
+
+# (English TXT folder, Vietnamese TXT folder) aligned slide by slide, the
+# reference translation of the decks (see TRANSLATION_MEMORY_REFERENCE)
+FOLDER_PAIRS = [
+    ("ConvertEngToVN/AD-ppt-vn", "ConvertEngToVN/AD-ppt-vn-2"),
+]
+
+NUMBER_PATTERN = re.compile(r"(?<![\w.])\d+(?:[.,]\d+)*(?![\w])")
+TOPIC_NAME_PATTERN = re.compile(r"^Topic\s+\d+\s*:\s*(.+)$")
+PLACEHOLDER_PATTERN = re.compile(r"\{([NT])(\d+)\}")
+
+NUM_PERM = 32
+BANDS = 8  # 4 rows per band: candidates from roughly 0.6 trigram Jaccard up
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def normalize(text):
+    return " ".join(text.split())
+
+
+def shingles(text, n=3):
+    text = f" {normalize(text).lower()} "
+    return {text[i:i + n] for i in range(max(1, len(text) - n + 1))}
+
+
+def minhash(text):
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(text)]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def band_keys(signature):
+    rows = NUM_PERM // BANDS
+    return [(band, tuple(signature[band * rows:(band + 1) * rows])) for band in range(BANDS)]
+
+
+class Match:
+    def __init__(self, translation, kind, score, source):
+        self.translation = translation
+        self.kind = kind
+        self.score = score
+        self.source = source
+
+    @property
+    def needs_review(self):
+        # Only exact and placeholder matches are known to say the same thing
+        return self.kind == "fuzzy"
+
+    def __repr__(self):
+        return f"Match({self.kind}, {self.score:.2f}, {self.source!r} -> {self.translation!r})"
+
+
+class TranslationMemory:
+    def __init__(self, threshold=FUZZY_THRESHOLD, terms=(), fuzzy=False):
+        self.threshold = threshold
+        self.fuzzy = fuzzy
+        self.exact = {}
+        self.stats = Counter()
+        self._indexed = False
+        self.terms = set()
+        self.add_terms(terms)
+
+    # ---------------- building ----------------
+    def add(self, source, translation):
+        source, translation = normalize(source), normalize(translation)
+        if source and translation and translation != source:
+            self.exact.setdefault(source, translation)
+            self._indexed = False
+
+    def add_terms(self, terms):
+        self.terms.update(normalize(term) for term in terms if term and term.strip())
+        self._term_order = sorted(self.terms, key=len, reverse=True)  # longest name wins
+        self._indexed = False
+
+    def __len__(self):
+        return len(self.exact)
+
+    def mask(self, text):
+        """
+        Replace topic names by {T0}, {T1}... and numbers by {N0}, {N1}...
+        (one placeholder per distinct value). Returns (masked, terms, numbers).
+        """
+        terms = []
+        for term in self._term_order:
+            if term in text:
+                pattern = rf"(?<!\w){re.escape(term)}(?!\w)"
+                if re.search(pattern, text):
+                    text = re.sub(pattern, f"{{T{len(terms)}}}", text, count=1)
+                    terms.append(term)
+
+        numbers = []
+
+        def number(match):
+            value = match.group(0)
+            if value not in numbers:
+                numbers.append(value)
+            return f"{{N{numbers.index(value)}}}"
+
+        return NUMBER_PATTERN.sub(number, text), terms, numbers
+
+    def _template(self, source, translation):
+        """The translation with the source's placeholders in it, or None if they cannot all be found."""
+        masked, terms, numbers = self.mask(source)
+        if not terms and not numbers:
+            return masked, None
+        template = translation
+        for i, term in enumerate(terms):
+            term_translation = term if term in template else self.exact.get(term)
+            if not term_translation or term_translation not in template:
+                return masked, None
+            template = template.replace(term_translation, f"{{T{i}}}", 1)
+        for i, value in enumerate(numbers):
+            pattern = rf"(?<![\w.]){re.escape(value)}(?![\w])"
+            if not re.search(pattern, template):
+                return masked, None
+            template = re.sub(pattern, f"{{N{i}}}", template)
+        return masked, template
+
+    def _index(self):
+        self._templates = {}
+        self._entries = []
+        self._buckets = defaultdict(list)
+        for source, translation in self.exact.items():
+            masked, template = self._template(source, translation)
+            if template is not None:
+                self._templates.setdefault(masked, (source, template))
+            position = len(self._entries)
+            self._entries.append((source, translation))
+            for key in band_keys(minhash(source)):
+                self._buckets[key].append(position)
+        self._indexed = True
+
+    # ---------------- lookup ----------------
+    def _fill(self, template, terms, numbers):
+        values = {}
+        for i, term in enumerate(terms):
+            term_translation = self.exact.get(term)
+            if term_translation is None:
+                return None
+            values[f"T{i}"] = term_translation
+        for i, value in enumerate(numbers):
+            values[f"N{i}"] = value
+        try:
+            return PLACEHOLDER_PATTERN.sub(lambda m: values[m.group(1) + m.group(2)], template)
+        except KeyError:
+            return None
+
+    def lookup(self, text):
+        """Best Match for `text`, or None."""
+        if not self._indexed:
+            self._index()
+        text = normalize(text)
+        if not text:
+            return None
+
+        if text in self.exact:
+            self.stats["exact"] += 1
+            return Match(self.exact[text], "exact", 1.0, text)
+
+        masked, terms, numbers = self.mask(text)
+        if masked in self._templates:
+            source, template = self._templates[masked]
+            filled = self._fill(template, terms, numbers)
+            if filled is not None:
+                self.stats["placeholder"] += 1
+                return Match(filled, "placeholder", 1.0, source)
+
+        if not self.fuzzy:
+            self.stats["miss"] += 1
+            return None
+
+        best, best_score = None, 0.0
+        lowered = text.lower()
+        candidates = {position for key in band_keys(minhash(text)) for position in self._buckets.get(key, ())}
+        for position in candidates:
+            source, translation = self._entries[position]
+            score = difflib.SequenceMatcher(None, lowered, source.lower()).ratio()
+            if score <= best_score or score < self.threshold:
+                continue
+            translation = self._adapt(source, translation, terms, numbers)
+            if translation is not None:
+                best, best_score = (source, translation), score
+
+        if best:
+            self.stats["fuzzy"] += 1
+            return Match(best[1], "fuzzy", best_score, best[0])
+
+        self.stats["miss"] += 1
+        return None
+
+    def _adapt(self, source, translation, terms, numbers):
+        """
+        A near match's translation with the query's numbers and topic names,
+        None if they differ and cannot be substituted safely.
+        """
+        _, source_terms, source_numbers = self.mask(source)
+        if source_terms == terms and source_numbers == numbers:
+            return translation
+        if len(source_terms) != len(terms) or len(source_numbers) != len(numbers):
+            return None
+        _, template = self._template(source, translation)
+        return self._fill(template, terms, numbers) if template is not None else None
+
+    def matches(self, texts):
+        """{text: Match} for every text the memory can answer."""
+        hits = {}
+        for text in texts:
+            match = self.lookup(text)
+            if match is not None:
+                hits[text] = match
+        return hits
+
+    def reuse(self, texts):
+        """{text: translation} for every text the memory can answer."""
+        return {text: match.translation for text, match in self.matches(texts).items()}
+
+
+# ---------------- default memory ----------------
+def _read_txt(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f]
+
+
+def in_script(text, script):
+    return all(unicodedata.name(ch, "").startswith(script) for ch in text if ch.isalpha())
+
+
+def folder_pairs(source_folder, target_folder):
+    """(source, translation) lines of two TXT folders, aligned slide by slide."""
+    if not (os.path.isdir(source_folder) and os.path.isdir(target_folder)):
+        return
+    for file in sorted(os.listdir(source_folder)):
+        target_path = os.path.join(target_folder, file)
+        if not file.lower().endswith(".txt") or not os.path.exists(target_path):
+            continue
+        source_slides = split_txt_slides(_read_txt(os.path.join(source_folder, file)))
+        target_slides = split_txt_slides(_read_txt(target_path))
+        for source_lines, target_lines in zip(source_slides, target_slides):
+            if len(source_lines) != len(target_lines):
+                continue
+            for source_line, target_line in zip(source_lines, target_lines):
+                yield translatable_text(source_line), translatable_text(target_line)
+
+
+def topic_names(exact):
+    """
+    Names of "Topic N: <name>" segments that are also translated on their
+    own (title slides put them on a separate line), which separates topic
+    names from recurring headings like "Topic 1: Agenda".
+    """
+    names = set()
+    for source in exact:
+        match = TOPIC_NAME_PATTERN.match(source)
+        if match and match.group(1) in exact:
+            names.add(match.group(1))
+    return names
+
+
+def build_memory(target_lang, model, store=None, root=ROOT, reference=REFERENCE, fuzzy=FUZZY):
+    """The memory of one engine model: its cache entries for `target_lang`, plus the reference folders if asked."""
+    targets = TARGET_ALIASES.get(target_lang, {target_lang})
+    script = TARGET_SCRIPTS.get(target_lang)
+    memory = TranslationMemory(fuzzy=fuzzy)
+
+    def add(source, translation):
+        if not script or in_script(translation, script):
+            memory.add(source, translation)
+
+    store = store or open_cache()
+    for (_, tgt, entry_model, text), translation in list(store.index.items()):
+        if tgt in targets and entry_model == model:
+            add(text, translation)
+
+    if reference and target_lang == "vi":
+        for source_folder, target_folder in FOLDER_PAIRS:
+            for source, translation in folder_pairs(os.path.join(root, source_folder), os.path.join(root, target_folder)):
+                add(source, translation)
+
+    memory.add_terms(topic_names(memory.exact))
+    return memory
+
+
+def reuse(texts, target_lang, model):
+    """
+    Translations the memory of `model` can provide for `texts` ({} when
+    disabled). The memory is built on the first call of the process;
+    fuzzy hits are printed for review.
+    """
+    texts = [text for text in texts if text and text.strip()]
+    if not ENABLED or not texts:
+        return {}
+    name = f"translation-memory:{target_lang}:{model}"
+    if name not in registry.names():
+        registry.register(name, lambda: build_memory(target_lang, model))
+    if not registry.is_loaded(name):
+        with instrumentation.span("memory_build", target=target_lang, model=model):
+            registry.get(name)
+    matches = registry.get(name).matches(texts)
+    review = [(text, match) for text, match in matches.items() if match.needs_review]
+    for text, match in review:
+        print(f"⚠️ Translation memory: review '{text[:50]}', reused the translation of "
+              f"'{match.source[:50]}' (fuzzy {match.score:.2f})")
+    instrumentation.count("memory.lookups", len(texts))
+    instrumentation.count("memory.hits", len(matches))
+    instrumentation.count("memory.review", len(review))
+    return {text: match.translation for text, match in matches.items()}
@@ -0,0 +1,291 @@
+"""
+One engine interface for every translator, and the core that drives it.
+
+An engine only knows how to translate one batch of segments:
+
+    class MyEngine(Translator):
+        name = "my-model"
+        capabilities = Capabilities(max_batch_size=32, concurrency=4)
+
+        def translate_batch(self, segments, src, tgt):
+            return [...]  # aligned with segments, None where nothing came back
+
+Everything around the call lives in TranslationCore, the same for every
+engine: stripping and deduplicating the segments, the shared cache, the
+translation memory, packing the misses into batches within the engine's
+limits (batch size, token budget, a slide's segments kept together),
+sending the batches concurrently through the engine's rate limiter
+(which learns from every 429 and failure), retrying failed batches and
+missing segments, and the run-report counters. An engine error with
+`retryable = False` is not retried. During a checkpointed run (see
+common.checkpoint) the core also answers from the run's checkpoint and
+journals every translation it did not get from the cache.
+
+    core = TranslationCore(MyEngine(), "en", "vi", cache=open_cache().view("en", "vi", "my-model"))
+    translations = core.translate(segments)   # {segment: translation}
+"""
+import os
+import math
+import time
+from itertools import groupby
+from concurrent.futures import ThreadPoolExecutor
+
+from common import checkpoint, instrumentation, translation_memory
+from common.instrumentation import span
+from common.rate_limit import throttle_info
+
+# "echo" or a JSON dictionary: every core runs a mock engine instead (see common.mock_engines)
+MOCK_TRANSLATOR = os.getenv("MOCK_TRANSLATOR")
+
+# Extra rounds allowed for batches that were only throttled
+THROTTLE_ROUNDS = 10
+
+
+class Capabilities:
+    """What one translate_batch() call accepts, and how hard the core may drive the engine."""
+
+    def __init__(self, max_batch_size=1, max_tokens_per_batch=None, concurrency=1,
+                 keep_slides=False, retries=2, backoff=1.0):
+        self.max_batch_size = max_batch_size  # segments per call
+        self.max_tokens_per_batch = max_tokens_per_batch  # token budget per call (None: no limit)
+        self.concurrency = concurrency  # calls in flight at once
+        self.keep_slides = keep_slides  # keep a slide's segments in one call (context for the model)
+        self.retries = retries  # rounds re-sending failed batches and missing segments
+        self.backoff = backoff  # seconds before retry round n, times n (engines without a rate limiter)
+
+
+def estimate_tokens(text):
+    """Rough token count of a segment (~4 characters per token, plus some framing)."""
+    return len(text) // 4 + 4
+
+
+class Translator:
+    """
+    Base of the engines. Subclasses set `name` (the model key of the cache
+    and of the run-report counters) and `capabilities`, and implement
+    translate_batch(). They do not cache, deduplicate or retry.
+    """
+    name = "translator"
+    capabilities = Capabilities()
+    rate_limiter = None  # common.rate_limit.RateLimiter of the service, told the outcome of every batch
+
+    def available(self):
+        """False when the engine cannot run at all (no API key, no client): nothing is sent."""
+        return True
+
+    def token_lengths(self, segments):
+        return [estimate_tokens(segment) for segment in segments]
+
+    def translate_batch(self, segments, src, tgt):
+        """Translations aligned with `segments` (None where none came back). May raise."""
+        raise NotImplementedError
+
+
+# ---------------- BATCHING ----------------
+def length_buckets(lengths, max_tokens_per_batch, max_batch_size=math.inf):
+    """
+    Group indices into batches of similar token length so little padding is
+    wasted: sort by length, then grow each batch while
+    (batch size x longest member) stays under the token budget.
+    """
+    batches = []
+    batch = []
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        longest = lengths[i]  # ascending order: the newcomer is the longest
+        if batch and ((len(batch) + 1) * longest > max_tokens_per_batch or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def slide_batches(slides, lengths, max_tokens_per_batch, max_batch_size=math.inf):
+    """
+    Group indices into batches under the token budget, in order, keeping
+    the segments of a slide in the same batch when they fit; only a slide
+    larger than the budget is split.
+    """
+    batches = []
+    batch = []
+    batch_tokens = 0
+
+    def fits(size, tokens):
+        return len(batch) + size <= max_batch_size and batch_tokens + tokens <= max_tokens_per_batch
+
+    for _, items in groupby(range(len(slides)), key=lambda i: slides[i]):
+        items = list(items)
+        slide_tokens = sum(lengths[i] for i in items)
+        if batch and not fits(len(items), slide_tokens):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        for i in items:
+            if batch and not fits(1, lengths[i]):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(i)
+            batch_tokens += lengths[i]
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# ---------------- CORE ----------------
+class TranslationCore:
+    """
+    Drives a Translator for one language pair. `cache` is a CacheView (or
+    any mapping with get/__setitem__/flush) for the engine's model, None
+    for no caching. The translation memory of the engine's model (that of
+    `cache`, else the engine name) is asked for `memory_lang` (default:
+    `tgt`) unless `use_memory` is False.
+    """
+
+    def __init__(self, translator, src, tgt, cache=None, use_memory=True, memory_lang=None):
+        if MOCK_TRANSLATOR:
+            from common.mock_engines import impersonate
+            translator = impersonate(translator, MOCK_TRANSLATOR)
+            if not os.getenv("TRANSLATION_CACHE_FILE"):
+                cache = None  # mock output stays out of the real cache
+        self.translator = translator
+        self.src = src
+        self.tgt = tgt
+        self.cache = cache
+        self.use_memory = use_memory
+        self.memory_lang = memory_lang or tgt
+        # The model the cache entries are written under, shared by engines of the same service
+        self.memory_model = getattr(cache, "model", None) or translator.name
+
+    def translate(self, texts, slides=None):
+        """
+        {segment: translation} for the distinct stripped segments of `texts`
+        that could be translated; the others are left out. `slides` gives
+        the slide of each text, for engines that keep slides together.
+        """
+        name = self.translator.name
+        segments = {}
+        for i, text in enumerate(texts):
+            key = (text or "").strip()
+            if key:
+                segments.setdefault(key, slides[i] if slides else 0)
+
+        journal = checkpoint.active()
+        results = {}
+        pending = []
+        for key in segments:
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is None and journal is not None:
+                cached = journal.get(name, self.tgt, key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending.append(key)
+        instrumentation.cache_lookups(name, len(results), len(pending))
+
+        # Near-duplicates of known segments come from the translation memory
+        if pending and self.use_memory:
+            hits = translation_memory.reuse(pending, self.memory_lang, self.memory_model)
+            if hits:
+                print(f"Translation memory: {len(hits)}/{len(pending)} segments reused")
+                results.update(hits)
+                if journal is not None:
+                    journal.record_translations(name, self.tgt, hits)
+                pending = [key for key in pending if key not in hits]
+
+        if pending and not self.translator.available():
+            print(f"Warning: {name} is not available, {len(pending)} segments left untranslated.")
+            return results
+
+        capabilities = self.translator.capabilities
+        limiter = self.translator.rate_limiter
+        attempt = rounds = 0
+        rejected = set()
+        while pending and attempt <= capabilities.retries and rounds <= capabilities.retries + THROTTLE_ROUNDS:
+            if rounds:
+                instrumentation.count(f"retries.{name}", len(pending))
+                print(f"{len(pending)} segments untranslated by {name}, sending them again (round {rounds + 1})...")
+                if limiter is None:
+                    time.sleep(capabilities.backoff * attempt)
+            rounds += 1
+
+            throttled = set()
+            translated_now = {}
+            batches = self.batches(pending, [segments[key] for key in pending])
+            workers = max(1, min(capabilities.concurrency, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for batch, translated, outcome in executor.map(instrumentation.bind(self.send), batches):
+                    if outcome == "throttled":
+                        throttled.update(batch)
+                    elif outcome == "rejected":
+                        rejected.update(batch)
+                    for key, translation in zip(batch, translated):
+                        if translation:
+                            results[key] = translation
+                            translated_now[key] = translation
+                            if self.cache is not None:
+                                self.cache[key] = translation
+
+            if self.cache is not None:
+                self.cache.flush()
+            if journal is not None:
+                journal.record_translations(name, self.tgt, translated_now)
+                journal.flush()
+            pending = [key for key in pending if key not in results and key not in rejected]
+            # Batches turned away with a 429 wait in the rate limiter and go
+            # again without using up the retries meant for errors
+            if limiter is None or not throttled.issuperset(pending):
+                attempt += 1
+        return results
+
+    def translate_list(self, texts, slides=None):
+        """Translations aligned with `texts`: "" for blank texts, None where nothing came back."""
+        results = self.translate(texts, slides)
+        return [results.get(text.strip()) if text and text.strip() else "" for text in texts]
+
+    def batches(self, segments, slides):
+        """[(segments, tokens)]: `segments` packed within the engine's limits."""
+        capabilities = self.translator.capabilities
+        max_tokens = capabilities.max_tokens_per_batch
+        lengths = self.translator.token_lengths(segments) if max_tokens else [0] * len(segments)
+        if capabilities.keep_slides:
+            groups = slide_batches(slides, lengths, max_tokens or math.inf, capabilities.max_batch_size)
+        elif max_tokens:
+            groups = length_buckets(lengths, max_tokens, capabilities.max_batch_size)
+        else:
+            size = capabilities.max_batch_size
+            groups = [range(i, min(i + size, len(segments))) for i in range(0, len(segments), size)]
+        return [([segments[i] for i in group], sum(lengths[i] for i in group) or None) for group in groups]
+
+    def send(self, batch):
+        """
+        (segments, translations, outcome) of one batch; outcome is "ok",
+        "throttled" (429), "failed" or "rejected" (an error the engine marks
+        as not worth retrying), with no translations unless "ok".
+        """
+        segments, tokens = batch
+        name = self.translator.name
+        limiter = self.translator.rate_limiter
+        if limiter is not None:
+            if tokens is None and limiter.tokens_per_minute:
+                tokens = sum(self.translator.token_lengths(segments))
+            with span("rate_limit"):
+                limiter.acquire(tokens or 0)
+        instrumentation.sent(name, segments, tokens=tokens)
+        try:
+            with span("batch", engine=name, segments=len(segments), tokens=tokens):
+                translated = self.translator.translate_batch(segments, self.src, self.tgt)
+        except Exception as e:
+            is_throttle, retry_after = throttle_info(e)
+            if is_throttle:
+                instrumentation.count(f"throttled.{name}")
+                if limiter is not None:
+                    limiter.throttled(retry_after)
+                return segments, [], "throttled"
+            if limiter is not None:
+                limiter.failure()
+            instrumentation.count(f"errors.{name}")
+            print(f"Warning: {name} failed on a batch of {len(segments)} segments: {e}")
+            return segments, [], "failed" if getattr(e, "retryable", True) else "rejected"
+        if limiter is not None:
+            limiter.success()
+        return segments, translated, "ok"
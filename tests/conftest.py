@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The stage scripts import `common` from the repository root, so do the tests
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def offline_core(monkeypatch):
+    """Run the engines under test themselves: no MOCK_TRANSLATOR swap, no run checkpoint."""
+    from common import checkpoint, translators
+
+    monkeypatch.setattr(translators, "MOCK_TRANSLATOR", None)
+    monkeypatch.setattr(checkpoint, "_active", None)
@@ -0,0 +1,164 @@
+"""
+The offline engines (common.mock_engines) and the HTTP stand-ins
+(common.standin_servers) driven through TranslationCore, faults included.
+"""
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from common import mock_engines
+from common.google_translate import GoogleTranslateDriver
+from common.mock_engines import DictionaryEngine, impersonate
+from common.rate_limit import RateLimiter, Throttled
+from common.standin_servers import (CHUNK_PATTERN, GeminiHandler, GoogleTranslateHandler, fake_translation,
+                                    gemini_standin, serve)
+from common.translation_cache import TranslationCache
+from common.translators import Capabilities, TranslationCore, Translator
+
+
+def core(engine, cache=None, tgt="vi"):
+    return TranslationCore(engine, "en", tgt, cache=cache, use_memory=False)
+
+
+# ---------------- mock engines ----------------
+def test_dictionary_engine_answers_and_echoes():
+    engine = DictionaryEngine({"Agenda": "Chương trình"})
+    results = core(engine).translate(["Agenda", " Agenda ", "Coverage", ""])
+    assert results == {"Agenda": "Chương trình", "Coverage": fake_translation("Coverage", "vi")}
+
+
+def test_missing_translations_are_left_out():
+    engine = DictionaryEngine({"Agenda": "Chương trình"}, echo=False)
+    engine.capabilities = Capabilities(retries=0)
+    assert core(engine).translate_list(["Agenda", "Coverage", "  "]) == ["Chương trình", None, ""]
+
+
+def test_injected_failures_are_retried():
+    engine = DictionaryEngine(error_rate=0.5, seed=3)
+    engine.capabilities = Capabilities(max_batch_size=2, retries=20, backoff=0)
+    texts = [f"Topic {i}: Coverage" for i in range(12)]
+    results = core(engine).translate(texts)
+    assert results == {text: fake_translation(text, "vi") for text in texts}
+    assert engine.batches > 6  # some batches failed and went again
+
+
+def test_failed_segments_stay_out_of_the_cache(tmp_path):
+    store = TranslationCache(str(tmp_path / "cache.jsonl"))
+    view = store.view("en", "vi", "mock-dictionary")
+    engine = DictionaryEngine(error_rate=1.0)
+    engine.capabilities = Capabilities(retries=1, backoff=0)
+    assert core(engine, cache=view).translate(["Agenda"]) == {}
+    assert "Agenda" not in view
+
+
+def test_cache_hits_skip_the_engine(tmp_path):
+    store = TranslationCache(str(tmp_path / "cache.jsonl"))
+    view = store.view("en", "vi", "mock-dictionary")
+    view["Agenda"] = "Chương trình"
+    engine = DictionaryEngine()
+    assert core(engine, cache=view).translate(["Agenda"]) == {"Agenda": "Chương trình"}
+    assert engine.batches == 0
+
+
+def test_impersonate_keeps_the_engine_limits(monkeypatch):
+    class Flaky(Translator):
+        name = "flaky-service"
+        capabilities = Capabilities(max_batch_size=3, retries=0)
+
+        def translate_batch(self, segments, src, tgt):
+            raise AssertionError("the real engine must not be called")
+
+    monkeypatch.setattr(mock_engines, "_engines", {})
+    engine = impersonate(Flaky(), "echo")
+    assert engine.name == "flaky-service"
+    assert engine.capabilities.max_batch_size == 3
+    assert core(engine).translate(["a", "b"]) == {"a": "[vi] a", "b": "[vi] b"}
+
+
+# ---------------- Google Translate stand-in ----------------
+def driver(url, **kwargs):
+    google = GoogleTranslateDriver(source="en", target="vi", base_url=url, backoff=0, use_memory=False, **kwargs)
+    google.rate_limiter = RateLimiter(name="google-standin-test")  # keep the process-wide breaker out of it
+    return google
+
+
+def test_google_driver_against_the_standin():
+    texts = ["Agenda", "Topic 1: Coverage", "Agenda", "Tom & Jerry <b>"]
+    with serve(GoogleTranslateHandler) as server:
+        url = f"http://127.0.0.1:{server.server_address[1]}/m"
+        with driver(url) as google:
+            results = google.translate_many(texts)
+    assert results == {text: fake_translation(text, "vi") for text in set(texts)}
+    assert server.stats()["requests"] == 3  # each distinct text sent once
+
+
+def test_google_driver_retries_503():
+    texts = [f"Line {i}" for i in range(20)]
+    with serve(GoogleTranslateHandler, error_rate=0.2, seed=1) as server:
+        url = f"http://127.0.0.1:{server.server_address[1]}/m"
+        with driver(url, retries=6, max_workers=2) as google:
+            results = google.translate_many(texts)
+    assert server.errors > 0
+    assert results == {text: fake_translation(text, "vi") for text in texts}
+
+
+def test_google_standin_throttles_with_retry_after():
+    with serve(GoogleTranslateHandler, rate_limit=1) as server:
+        url = f"http://127.0.0.1:{server.server_address[1]}/m"
+        with driver(url) as google:
+            assert google.translate("Agenda") == "[vi] Agenda"
+            with pytest.raises(Throttled) as raised:
+                google.translate("Coverage")
+    assert raised.value.retry_after > 0
+    assert server.stats() == {"requests": 2, "errors": 0, "throttled": 1}
+
+
+# ---------------- Gemini stand-in ----------------
+class GeminiRestEngine(Translator):
+    """The generateContent REST call the Gemini scripts make through genai, [TXT_nnn] chunks per batch."""
+    name = "gemini-standin"
+    capabilities = Capabilities(max_batch_size=4, retries=6, backoff=0)
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+
+    def translate_batch(self, segments, src, tgt):
+        prompt = "\n\n".join(f"[TXT_{i:03d}] {segment}" for i, segment in enumerate(segments, start=1))
+        body = json.dumps({"contents": [{"role": "user", "parts": [{"text": prompt}]}]}).encode("utf-8")
+        request = urllib.request.Request(f"{self.endpoint}/v1beta/models/gemini-test:generateContent", data=body,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            reply = json.load(response)
+        text = reply["candidates"][0]["content"]["parts"][0]["text"]
+        chunks = {chunk_id: chunk.strip() for chunk_id, chunk in CHUNK_PATTERN.findall(text)}
+        return [chunks.get(f"[TXT_{i:03d}]") for i in range(1, len(segments) + 1)]
+
+
+def test_gemini_standin_answers_chunk_by_chunk():
+    texts = [f"Study task {i}" for i in range(10)]
+    with gemini_standin() as endpoint:
+        results = core(GeminiRestEngine(endpoint)).translate(texts)
+    assert results == {text: fake_translation(text, "vi") for text in texts}
+
+
+def test_gemini_standin_faults_are_retried():
+    texts = [f"Study task {i}" for i in range(10)]
+    with serve(GeminiHandler, error_rate=0.3, seed=2) as server:
+        endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+        results = core(GeminiRestEngine(endpoint)).translate(texts)
+    assert server.errors > 0
+    assert results == {text: fake_translation(text, "vi") for text in texts}
+
+
+def test_gemini_standin_reports_errors_like_the_api():
+    with serve(GeminiHandler, rate_limit=1) as server:
+        endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+        engine = GeminiRestEngine(endpoint)
+        assert engine.translate_batch(["Agenda"], "en", "vi") == ["[vi] Agenda"]
+        with pytest.raises(urllib.error.HTTPError) as raised:
+            engine.translate_batch(["Agenda"], "en", "vi")
+    assert raised.value.code == 429
+    assert int(raised.value.headers["Retry-After"]) >= 1
+    assert json.load(raised.value)["error"]["status"] == "RESOURCE_EXHAUSTED"
@@ -0,0 +1,66 @@
+"""
+PowerPointPool (common.powerpoint) driven with the fake COM application:
+leases that raise, and sessions that crash and are replaced.
+"""
+import pytest
+
+from common.fake_powerpoint import FakeApplication, FakeComError
+from common.powerpoint import PowerPointPool
+
+DECKS = {f"Topic {i}.ppt": [["Agenda", "Coverage"], [f"Topic {i}"]] for i in range(1, 6)}
+
+
+def pool(crash_after=None):
+    return PowerPointPool(factory=lambda: FakeApplication(DECKS, crash_after=crash_after))
+
+
+def read_deck(sessions, name, shape_error=None):
+    """Slide texts of a deck, read on a leased session the way the mass_* stages do."""
+    with sessions.lease() as app:
+        presentation = app.Presentations.Open(name, WithWindow=False)
+        texts = [slide.texts() for slide in presentation.Slides]
+        if shape_error:
+            raise shape_error
+        presentation.Close()
+    return texts
+
+
+def test_a_session_is_reused_across_decks():
+    with pool() as sessions:
+        for name in DECKS:
+            assert read_deck(sessions, name)[0] == ["Agenda", "Coverage"]
+        assert sessions.launches == 1 and sessions.discarded == 0
+
+
+def test_a_deck_that_raises_leaves_no_presentation_open():
+    with pool() as sessions:
+        with pytest.raises(ValueError):
+            read_deck(sessions, "Topic 1.ppt", ValueError("unreadable shape"))
+
+        with sessions.lease() as app:
+            assert app.Presentations.Count == 0  # the same, still healthy session, without Topic 1
+        assert sessions.launches == 1 and sessions.discarded == 0
+
+
+def test_presentations_open_before_the_lease_stay_open():
+    app = FakeApplication(DECKS)
+    own = app.Presentations.Open("Topic 5.ppt")
+    with PowerPointPool(factory=lambda: app) as sessions:
+        with sessions.lease() as leased:
+            leased.Presentations.Open("Topic 1.ppt")  # never closed by the deck
+        assert app.Presentations.open == [own]
+
+
+def test_a_crashed_session_is_discarded_and_replaced():
+    with pool(crash_after=2) as sessions:
+        texts = {}
+        for name in DECKS:
+            try:
+                texts[name] = read_deck(sessions, name)
+            except FakeComError:
+                texts[name] = None
+        # Every session opens two decks, then the RPC server goes away on the third
+        assert [name for name, found in texts.items() if found is None] == ["Topic 3.ppt"]
+        assert sessions.discarded == 1 and sessions.launches == 2
+        with sessions.lease() as app:
+            assert not app.crashed and app.opens == 2
@@ -0,0 +1,40 @@
+"""
+Native .ppt reading (common.ppt_binary) of the AD-ppt decks against the
+text the PowerPoint extractor wrote to AD-txt.
+"""
+import os
+
+import pytest
+
+from common import ppt_binary
+from common.streaming import load_stage
+
+STAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ConvertPPTXToTXT")
+
+
+def extract(name):
+    script = load_stage("ConvertPPTXToTXT/script.py")
+    slides = script.extract_lines_from_binary_ppt(os.path.join(STAGE, "AD-ppt", name))
+    return "".join(script.format_slide_txt(slide) for slide in slides).splitlines()
+
+
+def reference(name):
+    with open(os.path.join(STAGE, "AD-txt", os.path.splitext(name)[0] + ".txt"), encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+@pytest.mark.parametrize("name", ["AD Topic 4.ppt", "AD Topic 5.PPT", "AD Topic 6.ppt", "AD Topic 9.ppt"])
+def test_decks_read_like_powerpoint(name):
+    assert extract(name) == reference(name)
+
+
+def test_grouped_shapes_are_read():
+    # "Process Quality" and "Solution" are in a group nested in another group
+    lines = extract("AD Topic 7.ppt")
+    assert "- Process Quality" in lines and "- Solution" in lines
+    assert set(reference("AD Topic 7.ppt")) <= set(lines)
+
+
+def test_smartart_is_left_to_powerpoint():
+    with pytest.raises(ppt_binary.PptFormatError):
+        extract("AD Topic 2.ppt")
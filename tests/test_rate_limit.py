@@ -0,0 +1,68 @@
+"""
+RateLimiter state shared between processes: two limiters on one state file
+stand for the same service in two workers of common.folder_runner.
+"""
+import os
+import time
+import threading
+
+from common import rate_limit
+from common.rate_limit import RateLimiter
+
+
+def pair(tmp_path, **kwargs):
+    path = str(tmp_path / "svc.json")
+    return RateLimiter(name="svc", state_path=path, **kwargs), RateLimiter(name="svc", state_path=path, **kwargs)
+
+
+def test_workers_share_one_quota(tmp_path):
+    first, second = pair(tmp_path, requests_per_minute=600)  # 10 a second, bursts of 10
+    start = time.monotonic()
+    for _ in range(10):
+        first.acquire()
+    for _ in range(5):
+        second.acquire()  # the burst is spent: 5 more at 10 a second
+    assert 0.4 < time.monotonic() - start < 1.5
+
+
+def test_a_tripped_breaker_holds_every_worker(tmp_path):
+    first, second = pair(tmp_path, failure_threshold=2, cooldown=60)
+    first.failure()
+    second.failure()  # the second consecutive failure of the service
+    now = time.time()
+    assert second._blocked(now) > 50
+    with first._lock, first._synced():
+        assert first._blocked(now) > 50
+
+
+def test_a_probe_that_never_reports_expires(tmp_path, monkeypatch):
+    first, second = pair(tmp_path, failure_threshold=1, cooldown=0.01)
+    first.failure()
+    time.sleep(0.02)
+    first.acquire()  # the half-open probe, whose worker dies before reporting
+    monkeypatch.setattr(RateLimiter, "PROBE_TIMEOUT", 0.05)
+    with first._lock, first._synced():
+        first.probe_until = time.time() + RateLimiter.PROBE_TIMEOUT
+    start = time.monotonic()
+    worker = threading.Thread(target=second.acquire, daemon=True)  # another caller than the probe's
+    worker.start()
+    worker.join(5)
+    assert not worker.is_alive() and time.monotonic() - start < 1
+    second.success()
+    with first._lock, first._synced():
+        assert first.state == "closed"
+
+
+def test_share_state_attaches_and_cleans_up(monkeypatch):
+    monkeypatch.delenv(rate_limit.STATE_DIR_ENV, raising=False)
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    before = rate_limit.shared_limiter("svc-before")
+    with rate_limit.share_state():
+        folder = os.environ[rate_limit.STATE_DIR_ENV]
+        during = rate_limit.shared_limiter("svc/during")
+        assert before.state_path and during.state_path and os.path.dirname(during.state_path) == folder
+        during.failure()
+    assert rate_limit.STATE_DIR_ENV not in os.environ
+    assert not os.path.exists(folder)
+    assert before.state_path is during.state_path is None
+    assert during.metrics()["failures"] == 1
@@ -0,0 +1,65 @@
+"""
+Paragraph segmentation and write-back (common.segmenter) on the OOXML
+facade: mixed formatting is translated span by span and stays on its runs.
+"""
+import xml.etree.ElementTree as ET
+
+from common import ooxml
+from common.segmenter import apply_translations, frame_paragraphs
+
+A = ooxml.NS["a"]
+
+
+class Slide:
+    dirty = False
+
+
+def text_range(*paragraphs):
+    body = ET.fromstring(f'<p:txBody xmlns:a="{A}" xmlns:p="{ooxml.NS["p"]}">{"".join(paragraphs)}</p:txBody>')
+    return ooxml.TextRange(body, Slide()), body
+
+
+def run(text, bold=False):
+    props = ' b="1"' if bold else ""
+    return f'<a:r><a:rPr lang="en-US"{props}/><a:t>{text}</a:t></a:r>'
+
+
+def runs(body):
+    """[(text, bold)] of every run of the text body."""
+    return [(r.find(f"{{{A}}}t").text, r.find(f"{{{A}}}rPr").get("b") == "1") for r in body.iter(f"{{{A}}}r")]
+
+
+TRANSLATIONS = {"Note:": "Lưu ý:", "submit the form": "nộp biểu mẫu", "by Friday": "trước thứ Sáu",
+                "Note: submit the form": "Lưu ý: nộp biểu mẫu"}
+
+
+def test_mixed_formatting_is_translated_span_by_span():
+    frame, body = text_range(f'<a:p>{run("Note:", bold=True)}{run(" submit the form")}{run(" by Friday", bold=True)}</a:p>')
+    paragraphs = frame_paragraphs(frame)
+    assert paragraphs[0].segments() == ["Note:", "submit the form", "by Friday"]
+    assert apply_translations([paragraphs], TRANSLATIONS) == 0
+    assert runs(body) == [("Lưu ý:", True), (" nộp biểu mẫu", False), (" trước thứ Sáu", True)]
+
+
+def test_runs_with_the_same_formatting_are_one_segment():
+    frame, body = text_range(f'<a:p>{run("Note: submit")}{run(" the form")}</a:p>')
+    paragraphs = frame_paragraphs(frame)
+    assert paragraphs[0].segments() == ["Note: submit the form"]
+    apply_translations([paragraphs], TRANSLATIONS)
+    assert ooxml.get_text(body) == "Lưu ý: nộp biểu mẫu"
+
+
+def test_unaligned_runs_fall_back_to_the_first_run():
+    # The line break is in the paragraph's text but in none of its runs
+    frame, body = text_range(f'<a:p>{run("Note:", bold=True)}<a:br/>{run("submit the form")}</a:p>')
+    paragraphs = frame_paragraphs(frame)
+    assert paragraphs[0].segments() == ["Note:", "submit the form"]
+    assert apply_translations([paragraphs], TRANSLATIONS) == 0
+    assert ooxml.get_text(body) == "Lưu ý:\x0bnộp biểu mẫu"
+    assert runs(body) == [("Lưu ý:", True), ("nộp biểu mẫu", True)]
+
+
+def test_a_missing_span_keeps_the_paragraph():
+    frame, body = text_range(f'<a:p>{run("Note:", bold=True)}{run(" send it")}</a:p>')
+    assert apply_translations([frame_paragraphs(frame)], TRANSLATIONS) == 1
+    assert runs(body) == [("Note:", True), (" send it", False)]
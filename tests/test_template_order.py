@@ -0,0 +1,34 @@
+"""
+Slide order of decks built from a template on the fake COM application
+(ConvertBackToPPTWithExample/action_script.py), bulk and streaming.
+"""
+import pytest
+
+from common.fake_powerpoint import FakeApplication
+from common.powerpoint import PowerPointPool
+from common.streaming import load_stage
+
+action_script = load_stage("ConvertBackToPPTWithExample/action_script.py")
+
+TEMPLATES = {
+    "three.ppt": [["First", "first body"], ["Master", "master body"], ["Last", "last body"]],
+    # Title and content: the last slide is also the master
+    "two.ppt": [["First", "first body"], ["Master", "master body"]],
+}
+SLIDES = [{"Title": f"Slide {i}", "Contents": [f"Line {i}"]} for i in range(1, 7)]
+
+
+def build(template, slides):
+    app = FakeApplication(TEMPLATES)
+    with PowerPointPool(factory=lambda: app) as pool:
+        action_script.build_slides_from_template(template, slides, "out.ppt", pool=pool)
+    return app.saved["out.ppt"]
+
+
+@pytest.mark.parametrize("template", sorted(TEMPLATES))
+@pytest.mark.parametrize("streaming", [False, True])
+@pytest.mark.parametrize("count", [1, 2, 6])
+def test_slides_come_out_in_order(template, streaming, count):
+    slides = SLIDES[:count]
+    saved = build(template, iter(slides) if streaming else slides)
+    assert saved == [[slide["Title"], slide["Contents"][0]] for slide in slides]